@@ -0,0 +1,193 @@
+import atexit
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+from storage_codec import (
+    CODEC_LZMA, CODEC_NONE, CODEC_ZLIB, CODECS, SAMPLE_SIZE, choose_codec, compressor, decompress_file
+)
+
+HASH_ALGORITHM = "sha256"
+CHUNK_SIZE = 1024 * 1024  # حجم الكتلة عند قراءة الملفات (1 ميجابايت)
+SHARD_DEPTH = 2  # عدد مستويات المجلدات الفرعية (ab/cd/abcd...)
+SHARD_WIDTH = 2  # عدد أحرف الملخص في اسم كل مجلد فرعي
+TEMP_DIR_NAME = ".tmp"
+OPEN_DIR_NAME = "open"  # داخل TEMP_DIR_NAME: النسخ المفكوكة المؤقتة للملفات المفتوحة ببرنامج النظام
+# امتداد الملف المخزن حسب طريقة ضغطه (حتى يعرف من اسم الملف كيف يقرأ)
+CODEC_SUFFIXES = {CODEC_NONE: "", CODEC_ZLIB: ".zz", CODEC_LZMA: ".xz"}
+
+
+class AttachmentStore:
+    """
+    مخزن ملفات قائم على المحتوى: يحفظ كل ملف مرة واحدة فقط باسم ملخصه (SHA-256)
+    داخل مجلدات فرعية موزعة (مثل ab/cd/abcd...)، فالملف نفسه المرفق بعدة مستندات
+    لا يخزن إلا مرة واحدة.
+    عدد المراجع لكل ملف هو عدد صفوف جدول المرفقات التي تشير إلى ملخصه؛ لذلك يجب أن
+    تتم إضافة الصفوف وحذفها وحذف الملفات تحت القفل self.lock حتى لا يحذف ملف أثناء
+    إضافة مرجع جديد إليه.
+    عند تفعيل compress تضغط الملفات التي يجدي ضغطها (zlib أو lzma حسب عينة من كل ملف)؛
+    الملخص دائمًا للمحتوى الأصلي، فلا تتأثر إزالة التكرار بطريقة الضغط.
+    النسخ التي ينشئها materialize لفتح الملفات تحفظ داخل المخزن نفسه (.tmp/open)، وتحذف
+    عند حذف الملف المخزن وعند إغلاق التطبيق.
+    """
+
+    def __init__(self, root_dir, compress=True):
+        self.root_dir = root_dir
+        self.compress = compress
+        self.temp_dir = os.path.join(root_dir, TEMP_DIR_NAME)
+        self.open_dir = os.path.join(self.temp_dir, OPEN_DIR_NAME)
+        self.lock = threading.RLock()
+        # {مسار النسخة: (st_mtime_ns, st_size) عند كتابتها} لمعرفة ما إذا عدلت أو استبدلت بعد ذلك
+        self._materialized = {}
+        os.makedirs(self.temp_dir, exist_ok=True)
+        atexit.register(self.clear_materialized)
+
+    def blob_path(self, digest, codec=CODEC_NONE):
+        """يعيد مسار الملف المخزن لهذا الملخص وطريقة الضغط."""
+        shards = [digest[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH] for i in range(SHARD_DEPTH)]
+        return os.path.join(self.root_dir, *shards, digest + CODEC_SUFFIXES[codec])
+
+    def find(self, digest):
+        """يعيد (المسار، طريقة الضغط) للملف المخزن بهذا الملخص، أو (None, None)."""
+        for codec in CODECS:
+            path = self.blob_path(digest, codec)
+            if os.path.exists(path):
+                return path, codec
+        return None, None
+
+    def exists(self, digest):
+        return self.find(digest)[0] is not None
+
+    def stage(self, source_path):
+        """
+        يقرأ الملف مرة واحدة: يحسب ملخصه ويكتبه (مضغوطًا إذا كان ذلك مجديًا) في الوقت نفسه
+        إلى ملف مؤقت داخل المخزن (على نفس القرص، فيكون نقله لاحقًا عملية إعادة تسمية فقط).
+        يعيد (temp_path, digest, size, codec, stored_size).
+        لا يحتاج إلى القفل، لذا يمكن تنفيذه لعدة ملفات بالتوازي.
+        """
+        hasher = hashlib.new(HASH_ALGORITHM)
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.temp_dir)
+        try:
+            with open(source_path, "rb") as src, os.fdopen(fd, "wb") as dst:
+                chunk = src.read(max(CHUNK_SIZE, SAMPLE_SIZE))
+                codec = choose_codec(chunk[:SAMPLE_SIZE], source_path) if self.compress else CODEC_NONE
+                encoder = compressor(codec)
+                while chunk:
+                    hasher.update(chunk)
+                    dst.write(encoder.compress(chunk))
+                    size += len(chunk)
+                    chunk = src.read(CHUNK_SIZE)
+                dst.write(encoder.flush())
+                stored_size = dst.tell()
+        except BaseException:
+            self.discard(temp_path)
+            raise
+        return temp_path, hasher.hexdigest(), size, codec, stored_size
+
+    def commit(self, temp_path, digest, codec=CODEC_NONE):
+        """
+        ينقل ملفًا مؤقتًا (من stage) إلى مكانه الدائم، أو يحذفه إذا كان المحتوى نفسه مخزنًا مسبقًا
+        (ولو بطريقة ضغط أخرى). يجب استدعاؤه تحت self.lock مع إضافة صف المرفق.
+        يعيد (True إذا تم تخزين ملف جديد، طريقة ضغط الملف المخزن فعليًا، حجمه على القرص).
+        """
+        existing, existing_codec = self.find(digest)
+        if existing is not None:
+            self.discard(temp_path)
+            return False, existing_codec, os.path.getsize(existing)
+        destination = self.blob_path(digest, codec)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        os.replace(temp_path, destination)
+        return True, codec, os.path.getsize(destination)
+
+    def discard(self, temp_path):
+        """يحذف ملفًا مؤقتًا لم يعد مطلوبًا."""
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+
+    def remove(self, digest):
+        """
+        يحذف الملف المخزن (يستدعى تحت self.lock بعد التأكد من عدم وجود مراجع له).
+        يعيد عدد البايتات المحررة.
+        """
+        path, _ = self.find(digest)
+        if path is None:
+            return 0
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return 0
+        self._remove_materialized(digest)
+        # إزالة مجلدات التوزيع الفارغة
+        parent = os.path.dirname(path)
+        for _ in range(SHARD_DEPTH):
+            try:
+                os.rmdir(parent)
+            except OSError:
+                break
+            parent = os.path.dirname(parent)
+        return size
+
+    def materialize(self, digest, file_name, target_dir=None):
+        """
+        ينسخ الملف المخزن (مع فك ضغطه على دفعات) إلى مجلد مؤقت باسمه الأصلي لفتحه ببرنامج
+        النظام (الملفات المخزنة بلا امتداد، ويجب ألا يتم تعديلها مباشرة).
+        النسخة السابقة يعاد استخدامها فقط إذا لم يتغير وقت تعديلها ولا حجمها منذ أن كتبها
+        هذا المخزن (فالنسخة التي عدلها المستخدم في برنامج آخر يعاد إنشاؤها).
+        يعيد مسار النسخة.
+        """
+        source, codec = self.find(digest)
+        if source is None:
+            raise FileNotFoundError(digest)
+        directory = os.path.join(target_dir or self.open_dir, digest)
+        os.makedirs(directory, exist_ok=True)
+        target = os.path.join(directory, os.path.basename(file_name) or digest)
+        written = self._materialized.get(target)
+        if written is not None:
+            try:
+                stat = os.stat(target)
+            except FileNotFoundError:
+                stat = None
+            if stat is not None and (stat.st_mtime_ns, stat.st_size) == written:
+                return target
+        # الكتابة إلى ملف مؤقت ثم إعادة التسمية حتى لا تفتح نسخة غير مكتملة
+        fd, temp_path = tempfile.mkstemp(dir=directory)
+        os.close(fd)
+        try:
+            if codec == CODEC_NONE:
+                shutil.copyfile(source, temp_path)
+            else:
+                decompress_file(source, temp_path, codec)
+            os.replace(temp_path, target)
+        except BaseException:
+            self.discard(temp_path)
+            raise
+        stat = os.stat(target)
+        self._materialized[target] = (stat.st_mtime_ns, stat.st_size)
+        return target
+
+    def _remove_materialized(self, digest):
+        """يحذف النسخ المؤقتة لملف مخزن (عند حذفه من المخزن)."""
+        directory = os.path.join(self.open_dir, digest)
+        for path in [path for path in self._materialized if os.path.dirname(path) == directory]:
+            self._materialized.pop(path, None)
+        shutil.rmtree(directory, ignore_errors=True)
+
+    def clear_materialized(self):
+        """
+        يحذف النسخ المؤقتة التي أنشأتها هذه العملية (عند إغلاق التطبيق)، دون المساس بنسخ
+        عملية أخرى تستخدم المخزن نفسه. الملفات التي ما زالت مفتوحة في برنامج آخر ولا يمكن
+        حذفها (على Windows) تترك كما هي.
+        """
+        materialized, self._materialized = self._materialized, {}
+        for path in materialized:
+            try:
+                os.remove(path)
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass
@@ -0,0 +1,101 @@
+import atexit
+import threading
+import time
+from datetime import datetime
+
+# حدود تفريغ قائمة الانتظار إلى قاعدة البيانات
+DEFAULT_MAX_BATCH = 50  # عدد الأحداث التي تؤدي إلى تفريغ فوري
+DEFAULT_MAX_DELAY = 2.0  # أقصى مدة (بالثواني) يبقى فيها حدث في الذاكرة قبل كتابته
+DEFAULT_MAX_RETRIES = 3  # عدد محاولات الكتابة الفاشلة المتتالية قبل التخلي عن الأحداث المعلقة
+
+
+class AuditWriter:
+    """
+    كاتب مؤجل لسجل التدقيق: يجمع الأحداث في الذاكرة ثم يكتبها دفعة واحدة
+    باستخدام executemany داخل معاملة واحدة.
+    يتم التفريغ عند بلوغ حجم معين أو مرور مدة معينة، وعند إغلاق التطبيق،
+    وقبل أي قراءة لسجل التدقيق.
+    التفريغ المؤقت يتم في خيط خلفي واحد طويل العمر (اتصال واحد بقاعدة البيانات طوال عمر التطبيق)
+    بدلاً من خيط جديد واتصال جديد لكل تفريغ.
+    عند فشل الكتابة تعاد الأحداث إلى قائمة الانتظار وتعاد المحاولة بعد المدة نفسها،
+    وبعد max_retries محاولات فاشلة متتالية تحذف الأحداث المعلقة مع طباعة عددها.
+    """
+
+    def __init__(self, connection_factory, max_batch=DEFAULT_MAX_BATCH, max_delay=DEFAULT_MAX_DELAY,
+                 max_retries=DEFAULT_MAX_RETRIES):
+        self._connection_factory = connection_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._failures = 0
+        self._dropped = 0
+        self._thread = None
+        atexit.register(self.flush)
+
+    def log(self, action, details=""):
+        """يضيف حدثًا إلى قائمة الانتظار مع وقت حدوثه الفعلي."""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            self._pending.append((timestamp, action, details))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._wakeup.notify()
+
+    def _run(self):
+        """حلقة خيط التفريغ: تنتظر أول حدث، ثم تفرغ عند امتلاء الدفعة أو انقضاء max_delay."""
+        retrying = False
+        while True:
+            with self._lock:
+                while not self._pending:
+                    self._wakeup.wait()
+                deadline = time.monotonic() + self.max_delay
+                # بعد فشل الكتابة ننتظر المدة كاملة حتى لو امتلأت الدفعة
+                while self._pending and (retrying or len(self._pending) < self.max_batch):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._wakeup.wait(remaining)
+            self.flush()
+            retrying = self._failures > 0
+
+    def flush(self):
+        """يكتب جميع الأحداث المعلقة في معاملة واحدة. يعيد عدد الأحداث المكتوبة."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                with self._connection_factory() as conn:
+                    conn.executemany("INSERT INTO audit_log (timestamp, action, details) VALUES (?, ?, ?)", batch)
+            except Exception as e:
+                with self._lock:
+                    self._failures += 1
+                    if self._failures < self.max_retries:
+                        # إعادة الأحداث إلى قائمة الانتظار لمحاولة لاحقة
+                        self._pending[:0] = batch
+                        print(f"خطأ عند كتابة سجل التدقيق (المحاولة {self._failures} من {self.max_retries}): {e}")
+                    else:
+                        self._failures = 0
+                        self._dropped += len(batch)
+                        print(f"تعذرت كتابة سجل التدقيق بعد {self.max_retries} محاولات، "
+                              f"تم تجاهل {len(batch)} حدث: {e}")
+                return 0
+            self._failures = 0
+            return len(batch)
+
+    def pending_count(self):
+        """يعيد عدد الأحداث التي لم تكتب بعد."""
+        with self._lock:
+            return len(self._pending)
+
+    def dropped_count(self):
+        """يعيد عدد الأحداث التي حذفت بعد استنفاد محاولات الكتابة."""
+        with self._lock:
+            return self._dropped
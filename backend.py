@@ -1,15 +1,29 @@
 import os
 import sqlite3
-from datetime import datetime, timedelta
-import pandas as pd
+from datetime import date, datetime, timedelta
+
+from attachment_store import AttachmentStore
+from audit_writer import AuditWriter
+from db_connection import get_connection
+from instrumentation import instrument_functions
+from lookup_cache import LookupCache
+from records import Attachment, AuditEvent, Document, Employee, Salary, display_date
+from storage_codec import CODEC_NONE
+from text_normalize import normalize_arabic, search_text
+from thumbnail_cache import ThumbnailCache, is_image_file
 
 # إعداد المسارات
 script_dir = os.path.dirname(os.path.abspath(__file__))
-DB_NAME = os.path.join(script_dir, 'document_management.db')
-ATTACHMENTS_DIR = os.path.join(script_dir, 'attachments')
+# يمكن تغيير المسارات بمتغيرات البيئة (مثلاً لتشغيل القياسات على قاعدة بيانات مولدة)
+DB_NAME = os.environ.get("DOCUMENT_MANAGER_DB") or os.path.join(script_dir, 'document_management.db')
+ATTACHMENTS_DIR = os.environ.get("DOCUMENT_MANAGER_ATTACHMENTS_DIR") or os.path.join(script_dir, 'attachments')
 
-if not os.path.exists(ATTACHMENTS_DIR):
-    os.makedirs(ATTACHMENTS_DIR)
+# مخزن المرفقات (كل محتوى يخزن مرة واحدة باسم ملخصه)
+attachment_store = AttachmentStore(ATTACHMENTS_DIR)
+# الصور المصغرة للمرفقات (مفتاحها ملخص المحتوى)
+thumbnail_cache = ThumbnailCache(os.path.join(ATTACHMENTS_DIR, ".thumbnails"))
+# قوائم الفئات والأقسام وأسماء الموظفين للقوائم المنسدلة؛ تلغى عند تعديل جداولها
+lookup_cache = LookupCache()
 
 # --- دوال تحويل التاريخ ---
 def convert_date_to_db_format(date_str_ddmmyyyy):
@@ -29,19 +43,14 @@ def convert_date_from_db_format(date_str_yyyymmdd):
     يحول تنسيق التاريخ من YYYY-MM-DD (من قاعدة البيانات) إلى DD-MM-YYYY للعرض.
     يعيد سلسلة فارغة إذا كان التاريخ فارغًا أو غير صحيح.
     """
-    if not date_str_yyyymmdd:
-        return ""
-    try:
-        return datetime.strptime(date_str_yyyymmdd, "%Y-%m-%d").strftime("%d-%m-%Y")
-    except ValueError:
-        return ""
+    return display_date(date_str_yyyymmdd)
 
 # --- إنشاء قاعدة البيانات ---
 def create_database():
     """
     يقوم بإنشاء جداول قاعدة البيانات إذا لم تكن موجودة، ويضيف الفهارس لتحسين الأداء.
     """
-    with sqlite3.connect(DB_NAME) as conn:
+    with get_connection(DB_NAME) as conn:
         cursor = conn.cursor()
 
         # جدول المستندات
@@ -101,6 +110,31 @@ def create_database():
             )
         ''')
 
+        # جدول المرفقات: content_hash يشير إلى الملف في مخزن المرفقات،
+        # و file_path للمرفقات القديمة التي حفظت قبل المخزن القائم على المحتوى
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS attachments (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                document_id INTEGER NOT NULL,
+                file_name TEXT NOT NULL,
+                file_path TEXT,
+                upload_date TEXT,
+                content_hash TEXT,
+                file_size INTEGER,
+                codec TEXT,
+                stored_size INTEGER,
+                FOREIGN KEY(document_id) REFERENCES documents(id)
+            )
+        ''')
+        _ensure_column(cursor, "attachments", "upload_date", "TEXT")
+        _ensure_column(cursor, "attachments", "content_hash", "TEXT")
+        _ensure_column(cursor, "attachments", "file_size", "INTEGER")
+        _ensure_column(cursor, "attachments", "codec", "TEXT")
+        _ensure_column(cursor, "attachments", "stored_size", "INTEGER")
+        # نص البحث الموحد (normalize_arabic) محسوب مسبقًا لكل مستند وموظف
+        _ensure_column(cursor, "documents", "search_text", "TEXT")
+        _ensure_column(cursor, "employees", "search_text", "TEXT")
+
         # إنشاء الفهارس لتحسين أداء الاستعلامات
         # فهرسة على الأعمدة المستخدمة بشكل متكرر في شروط WHERE و JOIN
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_employee_id ON documents (employee_id)")
@@ -110,22 +144,297 @@ def create_database():
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_employees_name ON employees (name)") # للبحث عن الموظفين بالاسم
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_employees_department ON employees (department)") # للبحث عن الموظفين بالقسم
 
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_salaries_employee_id ON salaries (employee_id)")
+        # فهرس مركب: يخدم البحث برقم الموظف وحده (بادئة الفهرس) وبرقم الموظف مع نطاق تاريخ الدفع معًا،
+        # لذا يحل محل الفهرس السابق على employee_id وحده
+        cursor.execute("DROP INDEX IF EXISTS idx_salaries_employee_id")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_salaries_employee_payment_date ON salaries (employee_id, payment_date)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_salaries_payment_date ON salaries (payment_date)") # مهم للبحث عن الرواتب حسب التاريخ
 
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_attachments_document_id ON attachments (document_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_attachments_content_hash ON attachments (content_hash)") # لعد مراجع كل ملف مخزن
+
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_audit_log_timestamp ON audit_log (timestamp)") # لعرض سجل التدقيق على صفحات مرتبة حسب الوقت
+
+        # فهارس تدعم الفرز من قاعدة البيانات عند النقر على عناوين الأعمدة
+        # (الأعمدة التي تقبل NULL تفرز عبر IFNULL لذا يفهرس التعبير نفسه)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_name ON documents (name)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_category ON documents (category)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_issue_date_sort ON documents (IFNULL(issue_date, ''))")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_expiry_date_sort ON documents (IFNULL(expiry_date, ''))")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_employees_start_date_sort ON employees (IFNULL(start_date, ''))")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_salaries_net_salary ON salaries (net_salary)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_salaries_basic_salary ON salaries (basic_salary)")
+
+        _backfill_search_text(cursor, "documents", DOCUMENT_SEARCH_FIELDS)
+        _backfill_search_text(cursor, "employees", EMPLOYEE_SEARCH_FIELDS)
+        _create_documents_fts(cursor)
+        _create_search_trigram(cursor, "documents")
+        _create_search_trigram(cursor, "employees")
+
         conn.commit()
 
+def _ensure_column(cursor, table, column, definition):
+    """يضيف عمودًا إلى جدول موجود مسبقًا إذا لم يكن موجودًا (ترقية قواعد البيانات القديمة)."""
+    columns = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+# --- فهرس البحث النصي الكامل (FTS5) ---
+# فهرس الكلمات للمستندات على نص البحث الموحد search_text (بحث بالبادئة للكلمات القصيرة)
+FTS_ENABLED = False
+
+def _create_documents_fts(cursor):
+    """
+    ينشئ جدول FTS5 افتراضيًا على عمود search_text في جدول المستندات (نص موحد بـ normalize_arabic)،
+    مع مشغلات (triggers) تبقيه متزامنًا؛ يستخدم للبحث بالبادئة عن الكلمات الأقصر من 3 أحرف.
+    الجدول القديم المبني على الأعمدة الأصلية (دون توحيد) يحذف ويعاد بناؤه.
+    إذا لم تكن FTS5 متاحة في نسخة SQLite، يستمر البحث باستخدام LIKE.
+    """
+    global FTS_ENABLED
+    try:
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(documents_fts)")]
+        rebuild = columns != ["search_text"]
+        if columns and rebuild:
+            cursor.execute("DROP TABLE documents_fts")
+            for suffix in ("_ai", "_ad", "_au"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS documents_fts{suffix}")
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+                search_text, content='documents', content_rowid='id', prefix='2 3'
+            )
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS documents_fts_ai AFTER INSERT ON documents BEGIN
+                INSERT INTO documents_fts(rowid, search_text) VALUES (new.id, new.search_text);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS documents_fts_ad AFTER DELETE ON documents BEGIN
+                INSERT INTO documents_fts(documents_fts, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS documents_fts_au AFTER UPDATE OF search_text ON documents BEGIN
+                INSERT INTO documents_fts(documents_fts, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+                INSERT INTO documents_fts(rowid, search_text) VALUES (new.id, new.search_text);
+            END
+        """)
+        if rebuild:
+            # فهرسة المستندات الموجودة مسبقًا عند إنشاء الجدول لأول مرة
+            cursor.execute("INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')")
+        FTS_ENABLED = True
+    except sqlite3.OperationalError as e:
+        print(f"تعذر إنشاء فهرس البحث النصي (FTS5)، سيتم استخدام البحث العادي: {e}")
+        FTS_ENABLED = False
+
+def _build_fts_query(keyword):
+    """
+    يحول نص البحث إلى استعلام FTS5: كل كلمة تصبح عبارة بين علامتي تنصيص مع بحث بالبادئة (*)،
+    ويجب أن تتطابق جميع الكلمات.
+    """
+    terms = []
+    for term in keyword.split():
+        term = term.replace('"', '""')
+        terms.append(f'"{term}"*')
+    return " ".join(terms)
+
+# --- البحث الموحد بالمقاطع الثلاثية (trigram) ---
+# الحقول التي يجمعها عمود search_text في كل جدول
+DOCUMENT_SEARCH_FIELDS = ("name", "number", "type", "category", "notes")
+EMPLOYEE_SEARCH_FIELDS = ("name", "position", "department")
+TRIGRAM_MIN_LENGTH = 3  # مقطع الفهرس ثلاثة أحرف؛ الكلمات الأقصر لا يمكن البحث عنها فيه
+SEARCH_BACKFILL_BATCH = 10000
+TRIGRAM_ENABLED = False
+
+def _backfill_search_text(cursor, table, fields):
+    """يحسب search_text للصفوف التي لا تملكه (قواعد البيانات القديمة أو الصفوف المضافة خارج التطبيق)."""
+    while True:
+        rows = cursor.execute(
+            f"SELECT id, {', '.join(fields)} FROM {table} WHERE search_text IS NULL LIMIT ?", (SEARCH_BACKFILL_BATCH,)
+        ).fetchall()
+        if not rows:
+            return
+        cursor.executemany(f"UPDATE {table} SET search_text = ? WHERE id = ?",
+                           [(search_text(*row[1:]), row[0]) for row in rows])
+
+def _create_search_trigram(cursor, table):
+    """
+    ينشئ جدول FTS5 بمحلل trigram على عمود search_text (الجدول {table}_search) مع مشغلات تبقيه متزامنًا،
+    فيصبح البحث عن أي جزء من النص (3 أحرف فأكثر) بحثًا في الفهرس بدلاً من LIKE على جميع الصفوف.
+    يتطلب SQLite 3.34 أو أحدث؛ وإلا يستمر البحث باستخدام LIKE على search_text.
+    """
+    global TRIGRAM_ENABLED
+    index = f"{table}_search"
+    try:
+        exists = cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (index,)).fetchone()
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5(
+                search_text, content='{table}', content_rowid='id', tokenize='trigram'
+            )
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO {index}(rowid, search_text) VALUES (new.id, new.search_text);
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO {index}({index}, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_au AFTER UPDATE OF search_text ON {table} BEGIN
+                INSERT INTO {index}({index}, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+                INSERT INTO {index}(rowid, search_text) VALUES (new.id, new.search_text);
+            END
+        """)
+        if not exists:
+            cursor.execute(f"INSERT INTO {index}({index}) VALUES ('rebuild')")
+        TRIGRAM_ENABLED = True
+    except sqlite3.OperationalError as e:
+        print(f"تعذر إنشاء فهرس البحث بالمقاطع الثلاثية ({index})، سيتم استخدام البحث العادي: {e}")
+        TRIGRAM_ENABLED = False
+
+def _build_trigram_query(terms):
+    """كل كلمة (موحدة مسبقًا) تصبح عبارة بين علامتي تنصيص تطابق أي جزء من النص، ويجب أن تتطابق جميعها."""
+    return " ".join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+def _with_search_text(batch, columns, fields):
+    """يضيف قيمة search_text في نهاية قيم كل صف من دفعة [(مرجع الصف، القيم بترتيب columns)]."""
+    indexes = [columns.index(field) for field in fields]
+    return [(source, tuple(values) + (search_text(*(values[i] for i in indexes)),)) for source, values in batch]
+
+# --- ترقيم الصفحات بالمفاتيح (Keyset Pagination) ---
+PAGE_SIZE = 200  # عدد الصفوف الافتراضي في الصفحة الواحدة
+
+def _fetch_keyset_page(columns, from_where_sql, params, sort_expr, id_expr, after=None, limit=PAGE_SIZE, descending=False,
+                       record=None):
+    """
+    يجلب صفحة واحدة مرتبة حسب (sort_expr, id_expr) تبدأ بعد المؤشر after.
+    بدلاً من OFFSET الذي يقرأ ويتجاهل كل الصفوف السابقة، يتم الاستمرار مباشرة
+    من آخر مفتاح تم عرضه، فتبقى تكلفة كل صفحة ثابتة مهما كان موقعها.
+    from_where_sql يجب أن ينتهي بشرط WHERE يمكن إضافة AND إليه.
+    record: صنف من records.py تنشأ منه الصفوف مباشرة (بدلاً من tuple).
+    يعيد (rows, next_cursor) حيث next_cursor هو None عند الوصول إلى النهاية.
+    """
+    op = "<" if descending else ">"
+    direction = "DESC" if descending else "ASC"
+    params = list(params)
+    query = f"SELECT {columns}, {sort_expr} AS _sort_key, {id_expr} AS _row_key {from_where_sql}"
+    if after is not None:
+        # الشرط الأول يسمح باستخدام الفهرس كنطاق، والثاني (row value) يحدد الموضع بدقة
+        query += f" AND {sort_expr} {op}= ? AND ({sort_expr}, {id_expr}) {op} (?, ?)"
+        params.extend([after[0], after[0], after[1]])
+    query += f" ORDER BY {sort_expr} {direction}, {id_expr} {direction} LIMIT ?"
+    params.append(limit)
+
+    with get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
+        if record is not None:
+            # السجل ينشأ من الأعمدة دون مفتاحي الترقيم؛ ويحفظ آخر صف خام فقط لحساب المؤشر التالي
+            last_row = None
+
+            def factory(cursor, row):
+                nonlocal last_row
+                last_row = row
+                return record(*row[:-2])
+
+            cursor.row_factory = factory
+            rows = cursor.execute(query, params).fetchall()
+            return rows, last_row[-2:] if len(rows) == limit else None
+        cursor.execute(query, params)
+        raw_rows = cursor.fetchall()
+
+    rows = [row[:-2] for row in raw_rows]
+    next_cursor = raw_rows[-1][-2:] if len(raw_rows) == limit else None
+    return rows, next_cursor
+
+# --- القراءة المتدفقة (Streaming) ---
+FETCH_BATCH_SIZE = 1000  # عدد الصفوف المقروءة من المؤشر في كل دفعة
+
+def _iter_query(query, params=(), batch_size=FETCH_BATCH_SIZE):
+    """
+    مولد يقرأ نتائج الاستعلام على دفعات باستخدام fetchmany،
+    فلا يحتفظ في الذاكرة إلا بدفعة واحدة بدلاً من الجدول بالكامل.
+    """
+    with get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+
+def _iter_keyset(columns, from_where_sql, params, sort_expr, id_expr, after=None, batch_size=FETCH_BATCH_SIZE,
+                 descending=False, record=None):
+    """
+    مولد يقرأ الجدول بالكامل كصفحات متتالية من _fetch_keyset_page بحجم batch_size.
+    على عكس _iter_query، لا يبقى مؤشر مفتوح بين الدفعات، فيمكن للمستدعي الكتابة في قاعدة البيانات
+    أثناء المرور على الصفوف، واستئناف القراءة لاحقًا من آخر مؤشر (after).
+    """
+    while True:
+        rows, after = _fetch_keyset_page(columns, from_where_sql, params, sort_expr, id_expr, after, batch_size,
+                                         descending, record)
+        yield from rows
+        if after is None:
+            return
+
+def _id_cursor(after_id):
+    """مؤشر ترقيم المفاتيح لجدول مرتب حسب المعرف وحده."""
+    return None if after_id is None else (after_id, after_id)
+
+SQL_IN_CHUNK = 500  # أقصى عدد قيم في شرط IN واحد (حد المتغيرات في SQLite)
+
+def _chunks(values, size=SQL_IN_CHUNK):
+    """يقسم قائمة إلى دفعات لاستخدامها في شروط IN."""
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def _like_contains(text):
+    """نمط LIKE يطابق النص كجزء من القيمة، مع معاملة % و _ و \\ كأحرف عادية (يستخدم مع ESCAPE '\\')."""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def _placeholders(values):
+    """يعيد علامات المتغيرات (?, ?, ...) لشرط IN."""
+    return ", ".join("?" * len(values))
+
+AUDIT_DETAILS_LIMIT = 20  # أقصى عدد عناصر تذكر بالاسم في تفاصيل حدث تدقيق لعملية جماعية
+
+def _describe_rows(descriptions, limit=AUDIT_DETAILS_LIMIT):
+    """يختصر قائمة أوصاف العناصر المتأثرة بعملية جماعية لتفاصيل سجل التدقيق."""
+    descriptions = list(descriptions)
+    text = "، ".join(descriptions[:limit])
+    if len(descriptions) > limit:
+        text += f" و {len(descriptions) - limit} أخرى"
+    return text
+
+def _sort_expression(sort_columns, sort_by):
+    """
+    يحول اسم عمود الفرز إلى تعبير SQL من قائمة مسموح بها (لمنع حقن SQL).
+    الأعمدة التي قد تحتوي NULL تستخدم IFNULL حتى تعمل مقارنات المؤشر بشكل صحيح.
+    """
+    try:
+        return sort_columns[sort_by]
+    except KeyError:
+        raise ValueError(f"عمود فرز غير مدعوم: {sort_by}")
+
 # --- دوال إدارة المستندات ---
 def add_document(name, number, doc_type, category, issue_date, expiry_date, status, employee_id, notes):
     """يضيف مستندًا جديدًا إلى قاعدة البيانات."""
-    with sqlite3.connect(DB_NAME) as conn:
+    with get_connection(DB_NAME) as conn:
         cursor = conn.cursor()
         try:
             cursor.execute('''
-                INSERT INTO documents (name, number, type, category, issue_date, expiry_date, status, employee_id, notes)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (name, number, doc_type, category, issue_date, expiry_date, status, employee_id, notes))
+                INSERT INTO documents (name, number, type, category, issue_date, expiry_date, status, employee_id, notes,
+                                       search_text)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (name, number, doc_type, category, issue_date, expiry_date, status, employee_id, notes,
+                  search_text(name, number, doc_type, category, notes)))
             conn.commit()
+            lookup_cache.invalidate("documents")
             log_audit_event(f"تمت إضافة مستند جديد: {name} (رقم: {number})")
             return True
         except sqlite3.IntegrityError:
@@ -134,18 +443,111 @@ def add_document(name, number, doc_type, category, issue_date, expiry_date, stat
             print(f"خطأ عند إضافة مستند: {e}")
             return False
 
+# --- الإضافة الجماعية (الاستيراد) ---
+def _insert_unique_bulk(conn, table, columns, unique_column, batches):
+    """
+    يضيف دفعات من الصفوف في معاملة واحدة باستخدام executemany، ويرفض الصفوف التي تكرر قيمة
+    العمود الفريد (موجودة في الجدول أو مكررة في الدفعات نفسها) بدلاً من إيقاف العملية.
+    batches: دفعات من [(مرجع الصف في الملف, قيم الأعمدة)]. يعيد (عدد المضاف، [(مرجع الصف، السبب)]).
+    """
+    unique_index = columns.index(unique_column)
+    insert_sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({_placeholders(columns)})"
+    inserted = 0
+    rejected = []
+    try:
+        for batch in batches:
+            keys = {values[unique_index] for _, values in batch if values[unique_index] is not None}
+            # الاستعلام داخل نفس المعاملة يرى الصفوف المضافة من الدفعات السابقة أيضًا
+            existing = set()
+            for chunk in _chunks(keys):
+                existing.update(row[0] for row in conn.execute(
+                    f"SELECT {unique_column} FROM {table} WHERE {unique_column} IN ({_placeholders(chunk)})", chunk
+                ))
+            accepted = []
+            for source, values in batch:
+                key = values[unique_index]
+                if key is not None and key in existing:
+                    rejected.append((source, f"قيمة مكررة في العمود {unique_column}: {key}"))
+                    continue
+                existing.add(key)
+                accepted.append(values)
+            conn.executemany(insert_sql, accepted)
+            inserted += len(accepted)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return inserted, rejected
+
+def _resolve_employee_references(conn, batch, employee_index):
+    """
+    يحول عمود الموظف في دفعة مستندات إلى معرف: رقم المعرف كما هو، أو اسم الموظف
+    (أول موظف بهذا الاسم). القيم غير المعروفة تصبح NULL.
+    """
+    names = {values[employee_index] for _, values in batch
+             if isinstance(values[employee_index], str) and not values[employee_index].isdigit()}
+    ids_by_name = {}
+    for chunk in _chunks(names):
+        ids_by_name.update(conn.execute(
+            f"SELECT name, MIN(id) FROM employees WHERE name IN ({_placeholders(chunk)}) GROUP BY name", chunk
+        ))
+    resolved = []
+    for source, values in batch:
+        reference = values[employee_index]
+        if isinstance(reference, str):
+            reference = int(reference) if reference.isdigit() else ids_by_name.get(reference)
+        resolved.append((source, values[:employee_index] + (reference,) + values[employee_index + 1:]))
+    return resolved
+
+DOCUMENT_IMPORT_COLUMNS = ("name", "number", "type", "category", "issue_date", "expiry_date", "status", "employee_id", "notes")
+EMPLOYEE_IMPORT_COLUMNS = ("name", "position", "department", "start_date", "phone", "email", "address", "notes")
+
+def add_documents_bulk(batches):
+    """
+    يضيف المستندات من دفعات [(مرجع الصف، القيم بترتيب DOCUMENT_IMPORT_COLUMNS)] في معاملة واحدة.
+    عمود الموظف يقبل المعرف أو اسم الموظف. المستندات ذات الأرقام المكررة ترفض.
+    يعيد (عدد المستندات المضافة، [(مرجع الصف، سبب الرفض)]).
+    """
+    conn = get_connection(DB_NAME)
+    employee_index = DOCUMENT_IMPORT_COLUMNS.index("employee_id")
+    batches = (_with_search_text(_resolve_employee_references(conn, batch, employee_index),
+                                 DOCUMENT_IMPORT_COLUMNS, DOCUMENT_SEARCH_FIELDS) for batch in batches)
+    inserted, rejected = _insert_unique_bulk(conn, "documents", DOCUMENT_IMPORT_COLUMNS + ("search_text",), "number",
+                                             batches)
+    if inserted:
+        lookup_cache.invalidate("documents")
+        log_audit_event("استيراد مستندات", f"تم استيراد {inserted} مستند/ات ورفض {len(rejected)}")
+    return inserted, rejected
+
+def add_employees_bulk(batches):
+    """
+    يضيف الموظفين من دفعات [(مرجع الصف، القيم بترتيب EMPLOYEE_IMPORT_COLUMNS)] في معاملة واحدة.
+    الموظفون ذوو البريد الإلكتروني المكرر يرفضون. يعيد (عدد الموظفين المضافين، [(مرجع الصف، سبب الرفض)]).
+    """
+    conn = get_connection(DB_NAME)
+    batches = (_with_search_text(batch, EMPLOYEE_IMPORT_COLUMNS, EMPLOYEE_SEARCH_FIELDS) for batch in batches)
+    inserted, rejected = _insert_unique_bulk(conn, "employees", EMPLOYEE_IMPORT_COLUMNS + ("search_text",), "email",
+                                             batches)
+    if inserted:
+        lookup_cache.invalidate("employees")
+        log_audit_event("استيراد موظفين", f"تم استيراد {inserted} موظف/ين ورفض {len(rejected)}")
+    return inserted, rejected
+
 def update_document(doc_id, name, number, doc_type, category, issue_date, expiry_date, status, employee_id, notes):
     """يقوم بتحديث مستند موجود في قاعدة البيانات."""
-    with sqlite3.connect(DB_NAME) as conn:
+    with get_connection(DB_NAME) as conn:
         cursor = conn.cursor()
         try:
             cursor.execute('''
                 UPDATE documents
-                SET name=?, number=?, type=?, category=?, issue_date=?, expiry_date=?, status=?, employee_id=?, notes=?
+                SET name=?, number=?, type=?, category=?, issue_date=?, expiry_date=?, status=?, employee_id=?, notes=?,
+                    search_text=?
                 WHERE id=?
-            ''', (name, number, doc_type, category, issue_date, expiry_date, status, employee_id, notes, doc_id))
+            ''', (name, number, doc_type, category, issue_date, expiry_date, status, employee_id, notes,
+                  search_text(name, number, doc_type, category, notes), doc_id))
             conn.commit()
             if cursor.rowcount > 0:
+                lookup_cache.invalidate("documents")
                 log_audit_event(f"تم تحديث المستند ID: {doc_id} (رقم: {number})")
                 return True
             return False
@@ -157,41 +559,238 @@ def update_document(doc_id, name, number, doc_type, category, issue_date, expiry
 
 def delete_document(doc_id):
     """يحذف مستندًا من قاعدة البيانات ويحذف المرفقات المرتبطة به."""
-    with sqlite3.connect(DB_NAME) as conn:
+    return delete_documents([doc_id]) > 0
+
+def delete_documents(doc_ids):
+    """
+    يحذف عدة مستندات ومرفقاتها في معاملة واحدة (شروط IN على دفعات بدلاً من استعلام لكل صف)،
+    مع حدث تدقيق واحد، ثم يحذف ملفات المرفقات التي لم يعد لها مراجع بعد الحفظ.
+    يعيد عدد المستندات المحذوفة.
+    """
+    doc_ids = list(doc_ids)
+    with attachment_store.lock:
+        conn = get_connection(DB_NAME)
         cursor = conn.cursor()
         try:
-            doc_info = cursor.execute("SELECT name, number FROM documents WHERE id = ?", (doc_id,)).fetchone()
-            if doc_info:
-                doc_name, doc_number = doc_info
-                # حذف المرفقات أولاً
-                attachments = get_attachments_for_document(doc_id)
-                for att in attachments:
-                    delete_attachment(att[0]) # att[0] هو attachment_id
-
-                cursor.execute("DELETE FROM documents WHERE id=?", (doc_id,))
-                conn.commit()
-                if cursor.rowcount > 0:
-                    log_audit_event(f"تم حذف المستند ID: {doc_id} (الاسم: {doc_name}, الرقم: {doc_number}) وجميع مرفقاته.")
-                    return True
-            return False
+            described = []
+            released = []
+            deleted = 0
+            for chunk in _chunks(doc_ids):
+                placeholders = _placeholders(chunk)
+                described.extend(cursor.execute(
+                    f"SELECT id, name, number FROM documents WHERE id IN ({placeholders})", chunk
+                ))
+                released.extend(_delete_attachment_rows(cursor, f"document_id IN ({placeholders})", chunk))
+                cursor.execute(f"DELETE FROM documents WHERE id IN ({placeholders})", chunk)
+                deleted += cursor.rowcount
+            conn.commit()
         except Exception as e:
-            print(f"خطأ عند حذف مستند: {e}")
-            return False
+            conn.rollback()
+            print(f"خطأ عند حذف المستندات: {e}")
+            return 0
+        _release_attachment_files(cursor, released)
+    if deleted:
+        lookup_cache.invalidate("documents")
+        log_audit_event(
+            "حذف مستندات",
+            f"تم حذف {deleted} مستند/ات وجميع مرفقاتها: "
+            + _describe_rows(f"ID {doc_id} ({name}, {number})" for doc_id, name, number in described)
+        )
+    return deleted
+
+# أعمدة المستند بترتيب حقول records.Document (يتطلب LEFT JOIN employees e لاسم الموظف)
+DOCUMENT_COLUMNS = "d.id, d.name, d.number, d.type, d.category, d.issue_date, d.expiry_date, d.status, d.notes, e.name"
+
+def iter_documents(after_id=None, batch_size=FETCH_BATCH_SIZE):
+    """
+    مولد لجميع المستندات (سجلات Document) مرتبة حسب المعرف، يقرأ batch_size صفًا في كل استعلام.
+    after_id: يبدأ بعد هذا المعرف (لاستئناف القراءة).
+    """
+    yield from _iter_keyset(
+        DOCUMENT_COLUMNS, "FROM documents d LEFT JOIN employees e ON d.employee_id = e.id WHERE 1=1", [],
+        "d.id", "d.id", _id_cursor(after_id), batch_size, record=Document
+    )
 
 def fetch_all_documents():
-    """يجلب جميع المستندات من قاعدة البيانات."""
-    with sqlite3.connect(DB_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT d.id, d.name, d.number, d.type, d.category, d.issue_date, d.expiry_date, d.status, e.name, d.notes
+    """يجلب جميع المستندات من قاعدة البيانات (يفضل iter_documents للجداول الكبيرة)."""
+    return list(iter_documents())
+
+# --- حالة صلاحية المستندات ---
+NEAR_EXPIRY_DAYS = 90  # عدد الأيام التي يعتبر خلالها المستند "قرب الانتهاء"
+EXPIRY_STATUSES = ("valid", "near", "expired")
+
+def _expiry_bounds(today=None):
+    """يعيد (اليوم، حد قرب الانتهاء) كنصوص YYYY-MM-DD محسوبة مرة واحدة لكل استعلام."""
+    today = today or date.today()
+    return today.isoformat(), (today + timedelta(days=NEAR_EXPIRY_DAYS)).isoformat()
+
+def _expiry_status_predicate(status, today=None):
+    """
+    يحول حالة الصلاحية إلى شرط نطاق على expiry_date (يستخدم idx_documents_expiry_date).
+    المستندات بلا تاريخ انتهاء تعتبر صالحة. يعيد (sql, params).
+    """
+    today_str, near_str = _expiry_bounds(today)
+    if status == "expired":
+        return "d.expiry_date > '' AND d.expiry_date < ?", [today_str]
+    if status == "near":
+        return "d.expiry_date >= ? AND d.expiry_date <= ?", [today_str, near_str]
+    if status == "valid":
+        return "(d.expiry_date IS NULL OR d.expiry_date = '' OR d.expiry_date > ?)", [near_str]
+    raise ValueError(f"حالة صلاحية غير معروفة: {status}")
+
+def _expiry_columns_sql(today=None):
+    """
+    أعمدة محسوبة في الاستعلام: حالة الصلاحية وعدد الأيام المتبقية حتى الانتهاء
+    (سالب للمستندات المنتهية، NULL عند عدم وجود تاريخ). القيم مولدة من date وليست من المستخدم.
+    """
+    today_str, near_str = _expiry_bounds(today)
+    status = (
+        f"CASE WHEN d.expiry_date IS NULL OR d.expiry_date = '' THEN 'valid' "
+        f"WHEN d.expiry_date < '{today_str}' THEN 'expired' "
+        f"WHEN d.expiry_date <= '{near_str}' THEN 'near' ELSE 'valid' END"
+    )
+    days = f"CAST(julianday(NULLIF(d.expiry_date, '')) - julianday('{today_str}') AS INTEGER)"
+    return status, days
+
+def format_remaining_days(days):
+    """ينسق عدد الأيام المتبقية (كما يحسبه الاستعلام) كنص للعرض."""
+    if days is None:
+        return "غير محدد"
+    if days > 0:
+        return f"متبقي {days} يوم"
+    if days == 0:
+        return "ينتهي اليوم"
+    return f"منقضي {abs(days)} يوم"
+
+def _document_search_sql(keyword="", category=None, status=None, today=None):
+    """
+    يبني جزء FROM/WHERE لاستعلام البحث في المستندات.
+    الكلمات توحد بـ normalize_arabic (الألف والياء والتشكيل وحالة الأحرف) في جميع الحالات:
+    الكلمات ذات 3 أحرف فأكثر يبحث عنها كجزء من النص في فهرس المقاطع الثلاثية، والأقصر منها
+    كبادئة كلمة في فهرس FTS5 لنص البحث الموحد، ويجب أن تتطابق جميع الكلمات.
+    يعيد (sql, params, rank_expr) حيث rank_expr هو تعبير bm25 عند استخدام FTS5 أو None.
+    """
+    terms = normalize_arabic(keyword).split()
+    trigram_terms, word_terms = [], []
+    for term in terms:
+        (trigram_terms if TRIGRAM_ENABLED and len(term) >= TRIGRAM_MIN_LENGTH else word_terms).append(term)
+    params = []
+    rank_expr = None
+    if trigram_terms and (FTS_ENABLED or not word_terms):
+        sql = """
+            FROM documents_search
+            JOIN documents d ON d.id = documents_search.rowid
+            LEFT JOIN employees e ON d.employee_id = e.id
+            WHERE documents_search MATCH ?
+        """
+        params.append(_build_trigram_query(trigram_terms))
+        rank_expr = "bm25(documents_search)"
+        if word_terms:
+            sql += " AND d.id IN (SELECT rowid FROM documents_fts WHERE documents_fts MATCH ?)"
+            params.append(_build_fts_query(" ".join(word_terms)))
+    elif word_terms and FTS_ENABLED:
+        sql = """
+            FROM documents_fts
+            JOIN documents d ON d.id = documents_fts.rowid
+            LEFT JOIN employees e ON d.employee_id = e.id
+            WHERE documents_fts MATCH ?
+        """
+        params.append(_build_fts_query(" ".join(word_terms)))
+        rank_expr = "bm25(documents_fts)"
+    else:
+        sql = """
             FROM documents d
             LEFT JOIN employees e ON d.employee_id = e.id
-        ''')
+            WHERE 1=1
+        """
+        # البحث الاحتياطي عند عدم توفر FTS5
+        for term in terms:
+            sql += " AND d.search_text LIKE ? ESCAPE '\\'"
+            params.append(_like_contains(term))
+
+    if category:
+        sql += " AND d.category = ?"
+        params.append(category)
+    if status:
+        predicate, status_params = _expiry_status_predicate(status, today)
+        sql += f" AND {predicate}"
+        params.extend(status_params)
+    return sql, params, rank_expr
+
+def search_documents_fts(keyword="", category=None, limit=None, status=None):
+    """
+    يبحث في المستندات باستخدام فهرس FTS5 ويرتب النتائج حسب الصلة (bm25).
+    يدعم البحث بأي جزء من الكلمة (3 أحرف فأكثر) دون اعتبار للهمزات والتشكيل.
+    يعيد قائمة سجلات Document.
+    """
+    sql, params, rank_expr = _document_search_sql(keyword, category, status)
+    query = f"SELECT {DOCUMENT_COLUMNS} {sql}"
+    query += f" ORDER BY {rank_expr}, d.id" if rank_expr else " ORDER BY d.id"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    with get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = Document.row_factory
+        cursor.execute(query, params)
         return cursor.fetchall()
 
+# أعمدة الفرز المتاحة للمستندات (القيم محفوظة بأنواعها الحقيقية، والتواريخ بتنسيق YYYY-MM-DD)
+DOCUMENT_SORT_COLUMNS = {
+    "id": "d.id",
+    "name": "d.name",
+    "number": "d.number",
+    "issue_date": "IFNULL(d.issue_date, '')",
+    "expiry_date": "IFNULL(d.expiry_date, '')",
+    "type": "d.type",
+    "category": "d.category",
+    "notes": "IFNULL(d.notes, '')",
+}
+
+def search_documents_page(keyword="", category=None, after=None, limit=PAGE_SIZE, sort_by=None, descending=False,
+                          status=None, today=None):
+    """
+    صفحة واحدة من نتائج البحث في المستندات باستخدام ترقيم المفاتيح (keyset pagination).
+    إذا لم يحدد sort_by، ترتب النتائج حسب الصلة عند البحث بكلمة، وإلا حسب المعرف.
+    status: "valid" أو "near" أو "expired" لتصفية المستندات حسب الصلاحية داخل SQL.
+    يعيد (rows, next_cursor)، والصفوف سجلات Document مع حالة الصلاحية (expiry_status).
+    """
+    today = today or date.today()
+    sql, params, rank_expr = _document_search_sql(keyword, category, status, today)
+    status_expr, _ = _expiry_columns_sql(today)
+    columns = f"{DOCUMENT_COLUMNS}, {status_expr} AS expiry_status"
+    if sort_by:
+        sort_expr = _sort_expression(DOCUMENT_SORT_COLUMNS, sort_by)
+    else:
+        sort_expr, descending = rank_expr or "d.id", False
+    return _fetch_keyset_page(columns, sql, params, sort_expr, "d.id", after, limit, descending, record=Document)
+
+EXPIRY_SORT_COLUMNS = {
+    "id": "d.id",
+    "name": "d.name",
+    "number": "d.number",
+    "expiry_date": "d.expiry_date",
+    "days_remaining": "d.expiry_date",
+}
+
+def fetch_expiry_page(after=None, limit=PAGE_SIZE, sort_by="expiry_date", descending=False, today=None):
+    """
+    صفحة من المستندات التي لها تاريخ انتهاء مع عدد الأيام المتبقية محسوبًا في الاستعلام
+    نسبة إلى تاريخ "اليوم" واحد. يعيد (rows, next_cursor) والصفوف سجلات Document
+    مع expiry_status و days_remaining.
+    """
+    status_expr, days_expr = _expiry_columns_sql(today)
+    return _fetch_keyset_page(
+        f"{DOCUMENT_COLUMNS}, {status_expr} AS expiry_status, {days_expr} AS days_remaining",
+        "FROM documents d LEFT JOIN employees e ON d.employee_id = e.id WHERE d.expiry_date > ''", [],
+        _sort_expression(EXPIRY_SORT_COLUMNS, sort_by or "expiry_date"), "d.id", after, limit, descending,
+        record=Document
+    )
+
 def fetch_all_documents_for_export():
     """يجلب جميع المستندات مع أسماء الموظفين لتصديرها."""
-    with sqlite3.connect(DB_NAME) as conn:
+    with get_connection(DB_NAME) as conn:
         cursor = conn.cursor()
         cursor.execute('''
             SELECT d.name, d.number, d.type, d.category, d.issue_date, d.expiry_date, d.status, e.name AS employee_name, d.notes
@@ -201,103 +800,333 @@ def fetch_all_documents_for_export():
         ''')
         return cursor.fetchall()
 
+def iter_documents_for_export(batch_size=FETCH_BATCH_SIZE):
+    """
+    مولد لصفوف تصدير المستندات (بنفس أعمدة fetch_all_documents_for_export) مع تنسيق التواريخ للعرض.
+    يستخدم للتصدير المتدفق دون تحميل كل الصفوف في الذاكرة.
+    """
+    query = '''
+        SELECT d.name, d.number, d.type, d.category, d.issue_date, d.expiry_date, d.status, e.name AS employee_name, d.notes
+        FROM documents d
+        LEFT JOIN employees e ON d.employee_id = e.id
+        ORDER BY d.id
+    '''
+    for name, number, doc_type, category, issue_date, expiry_date, status, employee_name, notes in _iter_query(query, batch_size=batch_size):
+        yield (name, number, doc_type, category, convert_date_from_db_format(issue_date),
+               convert_date_from_db_format(expiry_date), status, employee_name, notes)
+
+@lookup_cache.cached("documents")
 def get_all_categories():
-    """يجلب جميع الفئات الفريدة للمستندات."""
-    with sqlite3.connect(DB_NAME) as conn:
+    """يجلب جميع الفئات الفريدة للمستندات (من الذاكرة المؤقتة ما لم يتغير جدول المستندات)."""
+    with get_connection(DB_NAME) as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT DISTINCT category FROM documents WHERE category IS NOT NULL AND category != ''")
         categories = [row[0] for row in cursor.fetchall()]
         return sorted(categories)
 
-def calculate_remaining_time(expiry_date_str_db):
+def calculate_remaining_time(expiry_date_str_db, today=None):
     """
     يحسب الوقت المتبقي (أو المنقضي) من تاريخ انتهاء الصلاحية.
     يفترض أن تاريخ انتهاء الصلاحية بتنسيق YYYY-MM-DD.
+    للقوائم الطويلة استخدم fetch_expiry_page الذي يحسب الأيام داخل الاستعلام.
     """
     if not expiry_date_str_db:
         return "غير محدد"
     try:
-        expiry_date = datetime.strptime(expiry_date_str_db, "%Y-%m-%d")
-        today = datetime.now()
-        remaining = expiry_date - today
-        
-        if remaining.days > 0:
-            return f"متبقي {remaining.days} يوم"
-        elif remaining.days == 0:
-            return "ينتهي اليوم"
-        else:
-            return f"منقضي {abs(remaining.days)} يوم"
+        expiry_date = datetime.strptime(expiry_date_str_db, "%Y-%m-%d").date()
+        return format_remaining_days((expiry_date - (today or date.today())).days)
     except ValueError:
         return "تاريخ غير صالح"
 
 # --- دوال إدارة المرفقات ---
 def add_attachment(document_id, file_path, file_name):
     """
-    يضيف مرفقًا لمستند معين. يتم حفظ الملف فعليًا في مجلد المرفقات.
+    يضيف مرفقًا لمستند معين. يقرأ الملف مرة واحدة لحساب ملخصه ونسخه (مضغوطًا إذا كان ذلك مجديًا)
+    إلى مخزن المرفقات؛ إذا كان المحتوى نفسه مخزنًا مسبقًا (لمستند آخر مثلاً) يضاف مرجع جديد فقط
+    دون نسخة ثانية.
     """
     try:
-        # التأكد من وجود مجلد المرفقات
-        if not os.path.exists(ATTACHMENTS_DIR):
-            os.makedirs(ATTACHMENTS_DIR)
+        temp_path, content_hash, file_size, codec, stored_size = attachment_store.stage(file_path)
+    except Exception as e:
+        print(f"خطأ عند قراءة ملف المرفق: {e}")
+        return False
 
-        # إنشاء مسار فريد للملف داخل مجلد المرفقات
-        unique_file_name = f"{document_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}_{file_name}"
-        destination_path = os.path.join(ATTACHMENTS_DIR, unique_file_name)
+    upload_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with attachment_store.lock:
+        try:
+            stored_new, codec, stored_size = attachment_store.commit(temp_path, content_hash, codec)
+        except Exception as e:
+            attachment_store.discard(temp_path)
+            print(f"خطأ عند حفظ ملف المرفق: {e}")
+            return False
+        try:
+            with get_connection(DB_NAME) as conn:
+                conn.execute('''
+                    INSERT INTO attachments (document_id, file_name, upload_date, content_hash, file_size, codec, stored_size)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (document_id, file_name, upload_date, content_hash, file_size, codec, stored_size))
+        except Exception as e:
+            if stored_new:
+                attachment_store.remove(content_hash)
+            print(f"خطأ عند إضافة مرفق: {e}")
+            return False
 
-        # نسخ الملف إلى مجلد المرفقات
-        import shutil
-        shutil.copy(file_path, destination_path)
+    saved = file_size - stored_size if stored_new else file_size
+    log_audit_event(f"تمت إضافة مرفق '{file_name}' للمستند ID: {document_id}", f"تم توفير {saved} بايت ({codec})")
+    return True
 
-        with sqlite3.connect(DB_NAME) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO attachments (document_id, file_name, file_path)
-                VALUES (?, ?, ?)
-            ''', (document_id, file_name, destination_path))
-            conn.commit()
-            log_audit_event(f"تمت إضافة مرفق '{file_name}' للمستند ID: {document_id}")
-            return True
-    except Exception as e:
-        print(f"خطأ عند إضافة مرفق: {e}")
-        return False
+def _attachment_location(content_hash, file_path):
+    """يعيد مسار ملف المرفق (في المخزن أو المسار القديم)."""
+    if content_hash:
+        return attachment_store.find(content_hash)[0] or attachment_store.blob_path(content_hash)
+    return file_path
 
 def get_attachments_for_document(document_id):
-    """يجلب جميع المرفقات لمستند معين."""
-    with sqlite3.connect(DB_NAME) as conn:
+    """يجلب جميع المرفقات لمستند معين كسجلات Attachment (المسار في المخزن أو المسار القديم)."""
+    with get_connection(DB_NAME) as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT id, file_name, file_path FROM attachments WHERE document_id=?", (document_id,))
+        cursor.row_factory = lambda cursor, row: Attachment(
+            row[0], row[1], _attachment_location(row[2], row[3]), row[4] or ""
+        )
+        cursor.execute(
+            "SELECT id, file_name, content_hash, file_path, upload_date FROM attachments WHERE document_id=?",
+            (document_id,)
+        )
         return cursor.fetchall()
 
+def get_attachment_open_path(attachment_id):
+    """
+    يعيد مسارًا يمكن فتحه ببرنامج النظام: الملفات المخزنة تنسخ إلى مجلد مؤقت باسمها الأصلي
+    (حتى يتعرف النظام على الامتداد ولا يتم تعديل الملف المخزن). يعيد None إذا لم يوجد الملف.
+    """
+    with get_connection(DB_NAME) as conn:
+        row = conn.execute(
+            "SELECT file_name, content_hash, file_path FROM attachments WHERE id=?", (attachment_id,)
+        ).fetchone()
+    if not row:
+        return None
+    file_name, content_hash, file_path = row
+    if content_hash:
+        if not attachment_store.exists(content_hash):
+            return None
+        return attachment_store.materialize(content_hash, file_name)
+    return file_path if file_path and os.path.exists(file_path) else None
+
+def get_attachment_thumbnails(attachment_ids):
+    """
+    يعيد {معرف المرفق: مسار الصورة المصغرة} لمرفقات الصور، وينشئ الصور المصغرة الناقصة
+    (يستدعى في خيط عامل). الصورة التي سبق عرضها لا يعاد فك ترميزها.
+    """
+    rows = []
+    with get_connection(DB_NAME) as conn:
+        for chunk in _chunks(attachment_ids):
+            placeholders = _placeholders(chunk)
+            rows.extend(conn.execute(
+                f"SELECT id, file_name, content_hash FROM attachments "
+                f"WHERE id IN ({placeholders}) AND content_hash IS NOT NULL",
+                chunk
+            ))
+
+    thumbnails = {}
+    for attachment_id, file_name, content_hash in rows:
+        if not is_image_file(file_name):
+            continue
+        path = thumbnail_cache.get(content_hash)
+        if path is None:
+            blob_path, codec = attachment_store.find(content_hash)
+            if blob_path is None:
+                continue
+            if codec != CODEC_NONE:
+                # الصور المضغوطة في المخزن (مثل TIFF/BMP) يفك ضغطها أولاً
+                blob_path = attachment_store.materialize(content_hash, file_name)
+            path = thumbnail_cache.get_or_create(content_hash, blob_path)
+        if path:
+            thumbnails[attachment_id] = path
+    return thumbnails
+
+def _delete_attachment_rows(cursor, where_sql, params):
+    """يحذف صفوف المرفقات المطابقة (دون حفظ) ويعيد [(content_hash, file_path)] للملفات التي قد تتحرر."""
+    released = cursor.execute(f"SELECT content_hash, file_path FROM attachments WHERE {where_sql}", params).fetchall()
+    cursor.execute(f"DELETE FROM attachments WHERE {where_sql}", params)
+    return released
+
+def _release_attachment_files(cursor, released):
+    """
+    بعد حفظ حذف الصفوف: يحذف الملفات المخزنة التي لم يعد أي مرفق يشير إليها،
+    والملفات القديمة (غير المخزنة بالمحتوى). يجب استدعاؤه تحت attachment_store.lock.
+    الحذف تم حفظه مسبقًا، لذا لا ترفع أخطاء الملفات (مثل ملف مقفل أو مفتوح في برنامج آخر على Windows)
+    بل تطبع ويستمر حذف باقي الملفات.
+    """
+    hashes = {h for h, _ in released if h}
+    still_referenced = set()
+    try:
+        for chunk in _chunks(hashes):
+            still_referenced.update(row[0] for row in cursor.execute(
+                f"SELECT DISTINCT content_hash FROM attachments WHERE content_hash IN ({_placeholders(chunk)})", chunk
+            ))
+    except sqlite3.Error as e:
+        print(f"خطأ عند التحقق من مراجع ملفات المرفقات، لن تحذف ملفاتها: {e}")
+        hashes = set()
+    for content_hash in hashes - still_referenced:
+        try:
+            attachment_store.remove(content_hash)
+            thumbnail_cache.remove(content_hash)
+        except OSError as e:
+            print(f"خطأ عند حذف ملف المرفق {content_hash}: {e}")
+    for content_hash, file_path in released:
+        if not content_hash and file_path:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+
 def delete_attachment(attachment_id):
-    """يحذف مرفقًا من قاعدة البيانات ومن نظام الملفات."""
-    with sqlite3.connect(DB_NAME) as conn:
+    """يحذف مرفقًا من قاعدة البيانات، ويحذف ملفه فقط إذا لم يعد مرفق آخر يشير إليه."""
+    return delete_attachments([attachment_id]) > 0
+
+def delete_attachments(attachment_ids):
+    """
+    يحذف عدة مرفقات في معاملة واحدة مع حدث تدقيق واحد، ثم يحذف دفعة واحدة الملفات
+    التي لم يعد لها مراجع. يعيد عدد المرفقات المحذوفة.
+    """
+    attachment_ids = list(attachment_ids)
+    with attachment_store.lock:
+        conn = get_connection(DB_NAME)
         cursor = conn.cursor()
-        file_info = cursor.execute("SELECT file_name, file_path FROM attachments WHERE id=?", (attachment_id,)).fetchone()
-        if file_info:
-            file_name, file_path = file_info
-            try:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                cursor.execute("DELETE FROM attachments WHERE id=?", (attachment_id,))
-                conn.commit()
-                log_audit_event(f"تم حذف مرفق ID: {attachment_id} (الاسم: {file_name})")
-                return True
-            except Exception as e:
-                print(f"خطأ عند حذف المرفق: {e}")
-                return False
-        return False
+        try:
+            described = []
+            released = []
+            for chunk in _chunks(attachment_ids):
+                placeholders = _placeholders(chunk)
+                described.extend(cursor.execute(
+                    f"SELECT id, file_name FROM attachments WHERE id IN ({placeholders})", chunk
+                ))
+                released.extend(_delete_attachment_rows(cursor, f"id IN ({placeholders})", chunk))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"خطأ عند حذف المرفقات: {e}")
+            return 0
+        _release_attachment_files(cursor, released)
+    if released:
+        log_audit_event(
+            "حذف مرفقات",
+            f"تم حذف {len(released)} مرفق/ات: "
+            + _describe_rows(f"ID {att_id} ({file_name})" for att_id, file_name in described)
+        )
+    return len(released)
+
+def get_document_ids_by_numbers(numbers):
+    """يعيد قاموس {رقم المستند: المعرف} للأرقام الموجودة، باستعلام واحد لكل دفعة من الأرقام."""
+    result = {}
+    with get_connection(DB_NAME) as conn:
+        for chunk in _chunks(set(numbers)):
+            placeholders = _placeholders(chunk)
+            result.update(conn.execute(f"SELECT number, id FROM documents WHERE number IN ({placeholders})", chunk))
+    return result
+
+def add_attachments_bulk(rows):
+    """
+    يضيف مرفقات ملفاتها موجودة مسبقًا في مخزن المرفقات، في معاملة واحدة مع حدث تدقيق واحد.
+    rows: [(document_id, file_name, content_hash, file_size)]؛ طريقة الضغط والحجم المخزن تؤخذ من المخزن.
+    المرفق الموجود مسبقًا بنفس المستند والاسم والمحتوى لا يضاف مرة أخرى (لإمكانية استئناف الاستيراد).
+    يعيد (عدد المرفقات المضافة، الصفوف التي لم يعد ملفها موجودًا في المخزن).
+    """
+    upload_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with attachment_store.lock:
+        present, missing = [], []
+        for document_id, file_name, content_hash, file_size in rows:
+            blob_path, codec = attachment_store.find(content_hash)
+            if blob_path is None:
+                missing.append((document_id, file_name, content_hash, file_size))
+            else:
+                present.append((document_id, file_name, content_hash, file_size, codec, os.path.getsize(blob_path)))
+        with get_connection(DB_NAME) as conn:
+            before = conn.total_changes
+            conn.executemany('''
+                INSERT INTO attachments (document_id, file_name, upload_date, content_hash, file_size, codec, stored_size)
+                SELECT ?1, ?2, ?7, ?3, ?4, ?5, ?6
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM attachments WHERE document_id = ?1 AND file_name = ?2 AND content_hash = ?3
+                )
+            ''', [row + (upload_date,) for row in present])
+            inserted = conn.total_changes - before
+    if inserted:
+        log_audit_event("استيراد مرفقات", f"تمت إضافة {inserted} مرفق/ات دفعة واحدة")
+    return inserted, missing
+
+def get_attachment_storage_stats():
+    """
+    يعيد إحصائيات مخزن المرفقات بالبايت: الحجم الأصلي لجميع المرفقات، وحجم الملفات الفريدة قبل الضغط،
+    والحجم الفعلي على القرص، والتوفير الناتج عن إزالة التكرار وعن الضغط.
+    """
+    with get_connection(DB_NAME) as conn:
+        logical, unique, stored, blobs = conn.execute('''
+            SELECT IFNULL(SUM(total_size), 0), IFNULL(SUM(file_size), 0), IFNULL(SUM(stored_size), 0), COUNT(*)
+            FROM (
+                SELECT SUM(file_size) AS total_size, MAX(file_size) AS file_size,
+                       MAX(IFNULL(stored_size, file_size)) AS stored_size
+                FROM attachments
+                WHERE content_hash IS NOT NULL
+                GROUP BY content_hash
+            )
+        ''').fetchone()
+    return {
+        "attachments_bytes": logical,
+        "unique_bytes": unique,
+        "stored_bytes": stored,
+        "unique_files": blobs,
+        "dedup_saved": logical - unique,
+        "compression_saved": unique - stored,
+    }
+
+def migrate_legacy_attachments():
+    """
+    ينقل المرفقات القديمة (المحفوظة بنسخة مستقلة لكل مرفق) إلى مخزن المرفقات القائم على المحتوى،
+    فتحذف النسخ المكررة من القرص. يعيد (عدد المرفقات المنقولة، عدد البايتات المحررة).
+    """
+    with get_connection(DB_NAME) as conn:
+        legacy = conn.execute(
+            "SELECT id, file_path FROM attachments WHERE content_hash IS NULL AND file_path IS NOT NULL"
+        ).fetchall()
+
+    migrated = 0
+    freed = 0
+    for attachment_id, file_path in legacy:
+        if not os.path.exists(file_path):
+            continue
+        try:
+            temp_path, content_hash, file_size, codec, stored_size = attachment_store.stage(file_path)
+            with attachment_store.lock:
+                stored_new, codec, stored_size = attachment_store.commit(temp_path, content_hash, codec)
+                with get_connection(DB_NAME) as conn:
+                    conn.execute(
+                        "UPDATE attachments SET content_hash=?, file_size=?, codec=?, stored_size=?, file_path=NULL "
+                        "WHERE id=?",
+                        (content_hash, file_size, codec, stored_size, attachment_id)
+                    )
+            os.remove(file_path)
+            migrated += 1
+            freed += file_size - stored_size if stored_new else file_size
+        except Exception as e:
+            print(f"خطأ عند نقل المرفق ID {attachment_id} إلى المخزن: {e}")
+    if migrated:
+        log_audit_event("نقل المرفقات", f"تم نقل {migrated} مرفق/ات إلى مخزن المرفقات وتحرير {freed} بايت")
+    return migrated, freed
 
 # --- دوال إدارة الموظفين ---
 def add_employee(name, position, department, start_date, phone, email, address, notes):
     """يضيف موظفًا جديدًا إلى قاعدة البيانات."""
-    with sqlite3.connect(DB_NAME) as conn:
+    with get_connection(DB_NAME) as conn:
         cursor = conn.cursor()
         try:
             cursor.execute('''
-                INSERT INTO employees (name, position, department, start_date, phone, email, address, notes)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (name, position, department, start_date, phone, email, address, notes))
+                INSERT INTO employees (name, position, department, start_date, phone, email, address, notes, search_text)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (name, position, department, start_date, phone, email, address, notes,
+                  search_text(name, position, department)))
             conn.commit()
+            lookup_cache.invalidate("employees")
             log_audit_event(f"تمت إضافة موظف جديد: {name}")
             return True
         except sqlite3.IntegrityError:
@@ -308,16 +1137,18 @@ def add_employee(name, position, department, start_date, phone, email, address,
 
 def update_employee(emp_id, name, position, department, start_date, phone, email, address, notes):
     """يقوم بتحديث بيانات موظف موجود."""
-    with sqlite3.connect(DB_NAME) as conn:
+    with get_connection(DB_NAME) as conn:
         cursor = conn.cursor()
         try:
             cursor.execute('''
                 UPDATE employees
-                SET name=?, position=?, department=?, start_date=?, phone=?, email=?, address=?, notes=?
+                SET name=?, position=?, department=?, start_date=?, phone=?, email=?, address=?, notes=?, search_text=?
                 WHERE id=?
-            ''', (name, position, department, start_date, phone, email, address, notes, emp_id))
+            ''', (name, position, department, start_date, phone, email, address, notes,
+                  search_text(name, position, department), emp_id))
             conn.commit()
             if cursor.rowcount > 0:
+                lookup_cache.invalidate("employees")
                 log_audit_event(f"تم تحديث بيانات الموظف ID: {emp_id} (الاسم: {name})")
                 return True
             return False
@@ -329,43 +1160,89 @@ def update_employee(emp_id, name, position, department, start_date, phone, email
 
 def delete_employee(emp_id):
     """يحذف موظفًا من قاعدة البيانات ويزيل ارتباط المستندات والرواتب به."""
-    with sqlite3.connect(DB_NAME) as conn:
-        cursor = conn.cursor()
-        try:
-            emp_name = cursor.execute("SELECT name FROM employees WHERE id = ?", (emp_id,)).fetchone()
-            if emp_name:
-                # تحديث المستندات المرتبطة بهذا الموظف لتعيين employee_id إلى NULL
-                cursor.execute("UPDATE documents SET employee_id = NULL WHERE employee_id = ?", (emp_id,))
-                # حذف جميع سجلات الرواتب المرتبطة بهذا الموظف
-                cursor.execute("DELETE FROM salaries WHERE employee_id = ?", (emp_id,))
-                # حذف الموظف نفسه
-                cursor.execute("DELETE FROM employees WHERE id=?", (emp_id,))
-                conn.commit()
-                if cursor.rowcount > 0:
-                    log_audit_event(f"تم حذف الموظف ID: {emp_id} (الاسم: {emp_name[0]}) وحذف رواتبه وتعديل مستنداته.")
-                    return True
-            return False
-        except Exception as e:
-            print(f"خطأ عند حذف موظف: {e}")
-            return False
+    return delete_employees([emp_id]) > 0
+
+def delete_employees(emp_ids):
+    """
+    يحذف عدة موظفين في معاملة واحدة: يزيل ربط مستنداتهم ويحذف رواتبهم ثم يحذفهم،
+    بثلاث عبارات لكل دفعة من المعرفات بدلاً من ثلاث عبارات لكل موظف، مع حدث تدقيق واحد.
+    يعيد عدد الموظفين المحذوفين.
+    """
+    emp_ids = list(emp_ids)
+    conn = get_connection(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        described = []
+        deleted = 0
+        for chunk in _chunks(emp_ids):
+            placeholders = _placeholders(chunk)
+            described.extend(cursor.execute(f"SELECT id, name FROM employees WHERE id IN ({placeholders})", chunk))
+            # تحديث المستندات المرتبطة بهؤلاء الموظفين لتعيين employee_id إلى NULL
+            cursor.execute(f"UPDATE documents SET employee_id = NULL WHERE employee_id IN ({placeholders})", chunk)
+            # حذف جميع سجلات الرواتب المرتبطة بهم
+            cursor.execute(f"DELETE FROM salaries WHERE employee_id IN ({placeholders})", chunk)
+            cursor.execute(f"DELETE FROM employees WHERE id IN ({placeholders})", chunk)
+            deleted += cursor.rowcount
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"خطأ عند حذف الموظفين: {e}")
+        return 0
+    if deleted:
+        lookup_cache.invalidate("employees", "documents")
+        log_audit_event(
+            "حذف موظفين",
+            f"تم حذف {deleted} موظف/ين وحذف رواتبهم وتعديل مستنداتهم: "
+            + _describe_rows(f"ID {emp_id} ({name})" for emp_id, name in described)
+        )
+    return deleted
+
+# أعمدة الموظف بترتيب حقول records.Employee
+EMPLOYEE_COLUMNS = "id, name, position, department, start_date, phone, email, address, notes"
+
+def iter_employees(after_id=None, batch_size=FETCH_BATCH_SIZE):
+    """
+    مولد لجميع الموظفين (سجلات Employee) مرتبين حسب المعرف، يقرأ batch_size صفًا في كل استعلام.
+    after_id: يبدأ بعد هذا المعرف.
+    """
+    yield from _iter_keyset(EMPLOYEE_COLUMNS, "FROM employees WHERE 1=1", [], "id", "id", _id_cursor(after_id),
+                            batch_size, record=Employee)
 
 def fetch_all_employees():
-    """يجلب جميع الموظفين من قاعدة البيانات."""
-    with sqlite3.connect(DB_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM employees")
-        return cursor.fetchall()
+    """يجلب جميع الموظفين من قاعدة البيانات (يفضل iter_employees للجداول الكبيرة)."""
+    return list(iter_employees())
+
+EMPLOYEE_SORT_COLUMNS = {
+    "id": "id",
+    "name": "name",
+    "position": "IFNULL(position, '')",
+    "department": "IFNULL(department, '')",
+    "phone": "IFNULL(phone, '')",
+    "start_date": "IFNULL(start_date, '')",
+}
+
+def fetch_employees_page(after=None, limit=PAGE_SIZE, sort_by="id", descending=False):
+    """
+    صفحة واحدة من الموظفين بترقيم المفاتيح، مرتبة حسب العمود sort_by.
+    يعيد (rows, next_cursor) والصفوف سجلات Employee.
+    """
+    return _fetch_keyset_page(
+        EMPLOYEE_COLUMNS, "FROM employees WHERE 1=1", [], _sort_expression(EMPLOYEE_SORT_COLUMNS, sort_by or "id"),
+        "id", after, limit, descending, record=Employee
+    )
 
+@lookup_cache.cached("employees")
 def fetch_employee_id_name():
-    """يجلب معرفات وأسماء جميع الموظفين."""
-    with sqlite3.connect(DB_NAME) as conn:
+    """يجلب معرفات وأسماء جميع الموظفين (من الذاكرة المؤقتة ما لم يتغير جدول الموظفين)."""
+    with get_connection(DB_NAME) as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT id, name FROM employees")
         return cursor.fetchall()
 
+@lookup_cache.cached("employees")
 def get_all_departments():
-    """يجلب جميع الأقسام الفريدة للموظفين."""
-    with sqlite3.connect(DB_NAME) as conn:
+    """يجلب جميع الأقسام الفريدة للموظفين (من الذاكرة المؤقتة ما لم يتغير جدول الموظفين)."""
+    with get_connection(DB_NAME) as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT DISTINCT department FROM employees WHERE department IS NOT NULL AND department != ''")
         departments = [row[0] for row in cursor.fetchall()]
@@ -381,7 +1258,7 @@ def calculate_net_salary(basic_salary, allowances, deductions):
 
 def add_salary(employee_id, basic_salary, allowances, deductions, net_salary, payment_method, payment_date):
     """يضيف سجل راتب جديد إلى قاعدة البيانات."""
-    with sqlite3.connect(DB_NAME) as conn:
+    with get_connection(DB_NAME) as conn:
         cursor = conn.cursor()
         try:
             cursor.execute('''
@@ -397,7 +1274,7 @@ def add_salary(employee_id, basic_salary, allowances, deductions, net_salary, pa
 
 def update_salary(salary_id, employee_id, basic_salary, allowances, deductions, net_salary, payment_method, payment_date):
     """يقوم بتحديث سجل راتب موجود."""
-    with sqlite3.connect(DB_NAME) as conn:
+    with get_connection(DB_NAME) as conn:
         cursor = conn.cursor()
         try:
             cursor.execute('''
@@ -416,7 +1293,7 @@ def update_salary(salary_id, employee_id, basic_salary, allowances, deductions,
 
 def delete_salary(salary_id):
     """يحذف سجل راتب من قاعدة البيانات."""
-    with sqlite3.connect(DB_NAME) as conn:
+    with get_connection(DB_NAME) as conn:
         cursor = conn.cursor()
         try:
             salary_info = cursor.execute("SELECT employee_id, payment_date FROM salaries WHERE id = ?", (salary_id,)).fetchone()
@@ -432,52 +1309,143 @@ def delete_salary(salary_id):
             print(f"خطأ عند حذف راتب: {e}")
             return False
 
+def iter_salaries(after=None, batch_size=FETCH_BATCH_SIZE):
+    """
+    مولد لجميع سجلات الرواتب (سجلات Salary، الأحدث أولاً) مع أسماء الموظفين والأقسام، يقرأ batch_size صفًا
+    في كل استعلام. الراتب السنوي وتاريخ العرض حقول مشتقة في السجل تحسب عند الحاجة فقط.
+    after: مؤشر (payment_date, id) بنفس صيغة query_salaries_page.
+    """
+    yield from _iter_keyset(
+        SALARY_SEARCH_COLUMNS, "FROM salaries s JOIN employees e ON s.employee_id = e.id WHERE 1=1", [],
+        "s.payment_date", "s.id", after, batch_size, descending=True, record=Salary
+    )
+
 def fetch_all_salaries():
-    """يجلب جميع سجلات الرواتب مع أسماء الموظفين والأقسام."""
-    with sqlite3.connect(DB_NAME) as conn:
+    """يجلب جميع سجلات الرواتب مع أسماء الموظفين والأقسام (يفضل iter_salaries للجداول الكبيرة)."""
+    return list(iter_salaries())
+
+def _date_range(year, month=None):
+    """
+    يعيد حدود نطاق نصف مفتوح [البداية، النهاية) بتنسيق YYYY-MM-DD لسنة أو لشهر محدد،
+    بحيث يمكن لـ SQLite استخدام الفهرس على عمود التاريخ.
+    """
+    year = int(year)
+    if month is None:
+        return f"{year:04d}-01-01", f"{year + 1:04d}-01-01"
+    month = int(month)
+    if month == 12:
+        return f"{year:04d}-12-01", f"{year + 1:04d}-01-01"
+    return f"{year:04d}-{month:02d}-01", f"{year:04d}-{month + 1:02d}-01"
+
+def _salary_search_sql(keyword=None, department=None, year=None, month=None):
+    """يبني جزء FROM/WHERE لاستعلام البحث في الرواتب. يعيد (sql, params)."""
+    sql = """
+        FROM salaries s
+        JOIN employees e ON s.employee_id = e.id
+        WHERE 1=1
+    """
+    params = []
+
+    if keyword:
+        # الاسم والقسم يبحث عنهما في نص البحث الموحد للموظف (عبر فهرس المقاطع الثلاثية إن أمكن)
+        normalized = normalize_arabic(keyword)
+        if TRIGRAM_ENABLED and len(normalized) >= TRIGRAM_MIN_LENGTH:
+            employee_match = "e.id IN (SELECT rowid FROM employees_search WHERE employees_search MATCH ?)"
+            params.append(_build_trigram_query([normalized]))
+        else:
+            employee_match = "e.search_text LIKE ? ESCAPE '\\'"
+            params.append(_like_contains(normalized))
+        like = _like_contains(keyword)
+        sql += f""" AND ({employee_match}
+                        OR CAST(s.basic_salary AS TEXT) LIKE ? ESCAPE '\\'
+                        OR CAST(s.net_salary AS TEXT) LIKE ? ESCAPE '\\')"""
+        params.extend([like] * 2)
+
+    if department:
+        sql += " AND e.department = ?"
+        params.append(department)
+
+    if year:
+        start, end = _date_range(year, month)
+        sql += " AND s.payment_date >= ? AND s.payment_date < ?"
+        params.extend([start, end])
+    elif month:
+        # شهر بدون سنة: لا يمكن التعبير عنه كنطاق واحد
+        sql += " AND substr(s.payment_date, 6, 2) = ?"
+        params.append(f"{int(month):02d}")
+    return sql, params
+
+# أعمدة الراتب بترتيب حقول records.Salary
+SALARY_SEARCH_COLUMNS = """s.id, e.name, e.department, s.basic_salary, s.allowances, s.deductions, s.net_salary,
+               s.payment_method, s.payment_date, s.employee_id"""
+
+def query_salaries(keyword=None, department=None, year=None, month=None, limit=None, offset=0):
+    """
+    يبحث في سجلات الرواتب مع تطبيق جميع عوامل التصفية داخل SQL بدلاً من Python.
+    تستخدم تصفية السنة/الشهر نطاقًا على payment_date (فهرس idx_salaries_payment_date)
+    وتصفية القسم تستخدم idx_employees_department.
+    يعيد قائمة سجلات Salary.
+    """
+    sql, params = _salary_search_sql(keyword, department, year, month)
+    query = f"SELECT {SALARY_SEARCH_COLUMNS} {sql} ORDER BY s.payment_date DESC, s.id DESC"
+    if limit:
+        query += " LIMIT ? OFFSET ?"
+        params.extend([limit, offset or 0])
+
+    with get_connection(DB_NAME) as conn:
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT s.id, e.name, e.department, s.basic_salary, s.allowances, s.deductions, s.net_salary, s.payment_method, s.payment_date
-            FROM salaries s
-            JOIN employees e ON s.employee_id = e.id
-            ORDER BY s.payment_date DESC
-        ''')
-        rows = cursor.fetchall()
-    
-    # حساب الراتب السنوي الأساسي وتنسيق التاريخ للعرض
-    processed_rows = []
-    for row in rows:
-        salary_id, emp_name, department, basic_salary, allowances, deductions, net_salary, payment_method, payment_date_db = row
-        annual_basic_salary = basic_salary * 12
-        payment_date_ddmmyyyy = convert_date_from_db_format(payment_date_db)
-        processed_rows.append((salary_id, emp_name, department, basic_salary, annual_basic_salary, allowances, deductions, net_salary, payment_method, payment_date_ddmmyyyy))
-    return processed_rows
+        cursor.row_factory = Salary.row_factory
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+# الأعمدة الرقمية تفرز كأرقام (REAL) وليس كنصوص العرض المنسقة
+SALARY_SORT_COLUMNS = {
+    "id": "s.id",
+    "employee_name": "e.name",
+    "department": "IFNULL(e.department, '')",
+    "basic_salary": "s.basic_salary",
+    "allowances": "IFNULL(s.allowances, 0)",
+    "deductions": "IFNULL(s.deductions, 0)",
+    "net_salary": "s.net_salary",
+    "payment_method": "IFNULL(s.payment_method, '')",
+    "payment_date": "s.payment_date",
+}
+
+def query_salaries_page(keyword=None, department=None, year=None, month=None, after=None, limit=PAGE_SIZE,
+                        sort_by=None, descending=True):
+    """
+    صفحة واحدة من نتائج query_salaries بترقيم المفاتيح. الترتيب الافتراضي: الأحدث أولاً.
+    يعيد (rows, next_cursor) والصفوف سجلات Salary.
+    """
+    sql, params = _salary_search_sql(keyword, department, year, month)
+    sort_expr = _sort_expression(SALARY_SORT_COLUMNS, sort_by or "payment_date")
+    return _fetch_keyset_page(SALARY_SEARCH_COLUMNS, sql, params, sort_expr, "s.id", after, limit, descending,
+                              record=Salary)
 
 def fetch_all_salaries_for_export():
-    """يجلب جميع سجلات الرواتب مع أسماء الموظفين والأقسام لتصديرها."""
-    with sqlite3.connect(DB_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT e.name, e.department, s.basic_salary, s.allowances, s.deductions, s.net_salary, s.payment_method, s.payment_date
-            FROM salaries s
-            JOIN employees e ON s.employee_id = e.id
-            ORDER BY s.payment_date DESC
-        ''')
-        rows = cursor.fetchall()
-    
-    processed_rows = []
-    for row in rows:
-        emp_name, department, basic_salary, allowances, deductions, net_salary, payment_method, payment_date_db = row
-        annual_basic_salary = basic_salary * 12
-        payment_date_ddmmyyyy = convert_date_from_db_format(payment_date_db)
-        processed_rows.append((emp_name, department, basic_salary, annual_basic_salary, allowances, deductions, net_salary, payment_method, payment_date_ddmmyyyy))
-    return processed_rows
+    """يجلب جميع سجلات الرواتب مع أسماء الموظفين والأقسام لتصديرها (يفضل iter_salaries_for_export)."""
+    return list(iter_salaries_for_export())
+
+def iter_salaries_for_export(batch_size=FETCH_BATCH_SIZE):
+    """
+    مولد لصفوف تصدير الرواتب (بنفس أعمدة fetch_all_salaries_for_export) يحسب الراتب السنوي
+    وينسق التاريخ لكل صف أثناء القراءة.
+    """
+    query = '''
+        SELECT e.name, e.department, s.basic_salary, s.allowances, s.deductions, s.net_salary, s.payment_method, s.payment_date
+        FROM salaries s
+        JOIN employees e ON s.employee_id = e.id
+        ORDER BY s.payment_date DESC
+    '''
+    for emp_name, department, basic_salary, allowances, deductions, net_salary, payment_method, payment_date_db in _iter_query(query, batch_size=batch_size):
+        yield (emp_name, department, basic_salary, basic_salary * 12, allowances, deductions, net_salary,
+               payment_method, convert_date_from_db_format(payment_date_db))
 
 def get_last_employee_salary(employee_id):
     """
     يجلب آخر راتب تم دفعه لموظف معين.
     """
-    with sqlite3.connect(DB_NAME) as conn:
+    with get_connection(DB_NAME) as conn:
         cursor = conn.cursor()
         cursor.execute('''
             SELECT basic_salary, allowances, deductions, payment_method
@@ -491,52 +1459,169 @@ def get_last_employee_salary(employee_id):
 def salary_exists_for_month(employee_id, year, month):
     """
     يتحقق مما إذا كان هناك سجل راتب لموظف معين في شهر وسنة محددين.
+    يستخدم نطاقًا نصف مفتوح على payment_date بدلاً من STRFTIME على العمود، حتى يبحث SQLite
+    في الفهرس المركب (employee_id, payment_date) مباشرة دون المرور على جميع رواتب الموظف.
     """
-    with sqlite3.connect(DB_NAME) as conn:
+    start, end = _date_range(year, month)
+    with get_connection(DB_NAME) as conn:
         cursor = conn.cursor()
-        # نستخدم دالة STRFTIME للمقارنة بالعام والشهر بشكل مباشر
-        # هذا أكثر كفاءة مع الفهارس من LIKE إذا كانت الأعمدة من نوع TEXT وتخزن بتنسيق YYYY-MM-DD
-        cursor.execute(f"""
+        cursor.execute("""
             SELECT 1 FROM salaries
-            WHERE employee_id = ? AND STRFTIME('%Y-%m', payment_date) = ?
+            WHERE employee_id = ? AND payment_date >= ? AND payment_date < ?
             LIMIT 1
-        """, (employee_id, f"{year}-{month:02d}")) # تأكد من أن الشهر بتنسيق 01, 02...12
+        """, (employee_id, start, end))
         return cursor.fetchone() is not None
 
+def _paid_employee_ids(cursor, year, month):
+    """يعيد معرفات الموظفين الذين صرفت رواتبهم في الشهر (باستخدام مؤشر معاملة قائمة)."""
+    start, end = _date_range(year, month)
+    cursor.execute(
+        "SELECT DISTINCT employee_id FROM salaries WHERE payment_date >= ? AND payment_date < ?", (start, end)
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+def get_paid_employee_ids_for_month(year, month):
+    """
+    يعيد مجموعة معرفات الموظفين الذين صرفت رواتبهم في شهر وسنة محددين، باستعلام واحد
+    (نطاق على idx_salaries_payment_date) بدلاً من استدعاء salary_exists_for_month لكل موظف.
+    """
+    with get_connection(DB_NAME) as conn:
+        return _paid_employee_ids(conn.cursor(), year, month)
+
+def run_monthly_payroll(payment_date, department_adjustments=None, payment_method=None):
+    """
+    يضيف رواتب شهر payment_date (YYYY-MM-DD) لجميع الموظفين دفعة واحدة بدلاً من موظف في كل مرة:
+    لكل موظف له راتب سابق يؤخذ آخر راتب قبل هذا الشهر (ROW_NUMBER في استعلام واحد)،
+    ويتخطى الموظفون الذين صرفت رواتبهم في الشهر نفسه (NOT EXISTS على نطاق التاريخ).
+    department_adjustments: {القسم: نسبة مئوية} تضاف إلى الراتب الأساسي، مثل {"المبيعات": 5}.
+    payment_method: طريقة الدفع لجميع الرواتب (افتراضيًا طريقة آخر راتب لكل موظف).
+    تتم الإضافة بـ executemany في معاملة واحدة مع حدث تدقيق واحد.
+    يعيد (عدد الرواتب المضافة، عدد الموظفين الذين صرفت رواتبهم مسبقًا في هذا الشهر).
+    """
+    department_adjustments = department_adjustments or {}
+    start, end = _date_range(payment_date[:4], payment_date[5:7])
+    conn = get_connection(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        # قفل الكتابة من البداية حتى لا يضيف تشغيلان متزامنان رواتب الشهر نفسه مرتين
+        cursor.execute("BEGIN IMMEDIATE")
+        already_paid = len(_paid_employee_ids(cursor, payment_date[:4], payment_date[5:7]))
+        cursor.execute("""
+            WITH last_salaries AS (
+                SELECT employee_id, basic_salary, allowances, deductions, payment_method,
+                       ROW_NUMBER() OVER (PARTITION BY employee_id ORDER BY payment_date DESC, id DESC) AS rank
+                FROM salaries
+                WHERE payment_date < ?
+            )
+            SELECT e.id, e.department, l.basic_salary, l.allowances, l.deductions, l.payment_method
+            FROM last_salaries l
+            JOIN employees e ON e.id = l.employee_id
+            WHERE l.rank = 1
+              AND NOT EXISTS (
+                  SELECT 1 FROM salaries p
+                  WHERE p.employee_id = l.employee_id AND p.payment_date >= ? AND p.payment_date < ?
+              )
+        """, (start, start, end))
+        rows = []
+        for emp_id, department, basic_salary, allowances, deductions, last_method in cursor.fetchall():
+            adjustment = float(department_adjustments.get(department) or 0)
+            basic_salary = round(basic_salary * (1 + adjustment / 100), 2)
+            allowances = allowances or 0
+            deductions = deductions or 0
+            net_salary = round(calculate_net_salary(basic_salary, allowances, deductions), 2)
+            rows.append((emp_id, basic_salary, allowances, deductions, net_salary,
+                         payment_method or last_method, payment_date))
+        cursor.executemany("""
+            INSERT INTO salaries (employee_id, basic_salary, allowances, deductions, net_salary, payment_method, payment_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"خطأ عند تشغيل رواتب الشهر: {e}")
+        raise
+    if rows:
+        total = sum(row[4] for row in rows)
+        adjusted = ", ".join(f"{department}: {pct}%" for department, pct in department_adjustments.items() if pct)
+        log_audit_event(
+            "تشغيل رواتب الشهر",
+            f"تمت إضافة {len(rows)} راتب/رواتب بتاريخ {payment_date} بإجمالي صافي {total:.2f}"
+            + (f" (تعديلات الأقسام: {adjusted})" if adjusted else "")
+        )
+    return len(rows), already_paid
+
 def fetch_employee_salary_history(employee_id):
     """
-    يجلب جميع سجلات الرواتب لموظف معين، مرتبة تنازليًا حسب تاريخ الدفع.
+    يجلب جميع سجلات الرواتب لموظف معين (سجلات Salary)، مرتبة تنازليًا حسب تاريخ الدفع.
     """
-    with sqlite3.connect(DB_NAME) as conn:
+    with get_connection(DB_NAME) as conn:
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, basic_salary, allowances, deductions, net_salary, payment_method, payment_date
-            FROM salaries
-            WHERE employee_id = ?
-            ORDER BY payment_date DESC
+        cursor.row_factory = Salary.row_factory
+        cursor.execute(f"""
+            SELECT {SALARY_SEARCH_COLUMNS}
+            FROM salaries s
+            JOIN employees e ON s.employee_id = e.id
+            WHERE s.employee_id = ?
+            ORDER BY s.payment_date DESC, s.id DESC
         """, (employee_id,))
-        rows = cursor.fetchall()
-    
-    history_data = []
-    for row in rows:
-        salary_id, basic_salary, allowances, deductions, net_salary, payment_method, payment_date_db = row
-        payment_date_ddmmyyyy = convert_date_from_db_format(payment_date_db)
-        annual_basic_salary = basic_salary * 12
-        history_data.append((salary_id, basic_salary, annual_basic_salary, allowances, deductions, net_salary, payment_method, payment_date_ddmmyyyy))
-    return history_data
+        return cursor.fetchall()
 
 # --- دوال سجل التدقيق (Audit Log) ---
+# الأحداث تكتب بشكل مؤجل على دفعات بدلاً من معاملة مستقلة لكل حدث
+_audit_writer = AuditWriter(lambda: get_connection(DB_NAME))
+
 def log_audit_event(action, details=""):
-    """يسجل حدثًا في سجل التدقيق."""
-    with sqlite3.connect(DB_NAME) as conn:
-        cursor = conn.cursor()
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        cursor.execute("INSERT INTO audit_log (timestamp, action, details) VALUES (?, ?, ?)", (timestamp, action, details))
-        conn.commit()
+    """يسجل حدثًا في سجل التدقيق (يضاف إلى قائمة انتظار تكتب على دفعات)."""
+    _audit_writer.log(action, details)
+
+def flush_audit_log():
+    """يكتب جميع أحداث التدقيق المعلقة في قاعدة البيانات فورًا."""
+    return _audit_writer.flush()
+
+def iter_audit_log(after_timestamp=None, after_id=None, batch_size=FETCH_BATCH_SIZE):
+    """
+    مولد لأحداث سجل التدقيق (الأحدث أولاً)، يقرأ batch_size صفًا في كل استعلام.
+    after_timestamp و after_id: يبدأ بالأحداث الأقدم من هذا الموضع؛ بدون after_id تستبعد
+    جميع الأحداث ذات الوقت after_timestamp نفسه. الصفوف سجلات AuditEvent.
+    """
+    if after_timestamp is None:
+        flush_audit_log()
+        after = None
+    else:
+        after = (after_timestamp, after_id if after_id is not None else 0)
+    yield from _iter_keyset(
+        "id, timestamp, action, details", "FROM audit_log WHERE 1=1", [], "timestamp", "id", after, batch_size,
+        descending=True, record=AuditEvent
+    )
 
 def fetch_audit_log():
-    """يجلب جميع أحداث سجل التدقيق، مرتبة تنازليًا حسب الوقت."""
-    with sqlite3.connect(DB_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, timestamp, action, details FROM audit_log ORDER BY timestamp DESC")
-        return cursor.fetchall()
\ No newline at end of file
+    """يجلب جميع أحداث سجل التدقيق، مرتبة تنازليًا حسب الوقت (يفضل iter_audit_log للسجلات الكبيرة)."""
+    return list(iter_audit_log())
+
+AUDIT_SORT_COLUMNS = {
+    "id": "id",
+    "timestamp": "timestamp",
+    "action": "action",
+    "details": "IFNULL(details, '')",
+}
+
+def fetch_audit_log_page(after=None, limit=PAGE_SIZE, sort_by=None, descending=True):
+    """
+    صفحة واحدة من سجل التدقيق بترقيم المفاتيح. الترتيب الافتراضي: الأحدث أولاً.
+    يعيد (rows, next_cursor) والصفوف سجلات AuditEvent.
+    """
+    if after is None:
+        flush_audit_log()
+    return _fetch_keyset_page(
+        "id, timestamp, action, details",
+        "FROM audit_log WHERE 1=1", [], _sort_expression(AUDIT_SORT_COLUMNS, sort_by or "timestamp"), "id",
+        after, limit, descending, record=AuditEvent
+    )
+
+# --- قياس الأداء ---
+# تغليف جميع الدوال العامة بقياس الزمن وعدد الصفوف (يجب أن يبقى في نهاية الملف).
+# الدوال المساعدة التي تستدعى لكل صف مستثناة حتى لا تملأ الذاكرة الدائرية.
+instrument_functions(globals(), __name__, exclude={
+    "convert_date_to_db_format", "convert_date_from_db_format", "calculate_remaining_time",
+    "format_remaining_days", "calculate_net_salary", "log_audit_event",
+})
@@ -0,0 +1,235 @@
+"""
+قياس أداء عمليات الواجهة الخلفية على قاعدة بيانات مولدة (generate_data.py):
+القراءة الكاملة، والبحث، والتحقق من رواتب الشهر، والتصدير، والحذف الجماعي.
+يعمل على نسخة مؤقتة من قاعدة البيانات (عمليات الحذف لا تغير الملف الأصلي)، ويكتب النتائج
+بصيغة JSON لمقارنتها بين الإصدارات؛ مع --compare يعيد رمز خروج 1 إذا تباطأت أي عملية.
+
+الاستخدام:
+    python generate_data.py --size 100k --output bench_100k.db
+    python bench_backend.py --db bench_100k.db --output results.json
+    python bench_backend.py --db bench_100k.db --compare results.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from itertools import islice
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_REPEAT = 5
+DEFAULT_TOLERANCE = 0.25  # نسبة التباطؤ المسموح بها قبل اعتبارها تراجعًا
+NOISE_FLOOR_MS = 5.0  # فروق أقل من هذا لا تعتبر تراجعًا (تذبذب القياس)
+SALARY_CHECK_SAMPLE = 1000  # عدد الموظفين في قياس salary_exists_for_month
+DELETE_DOCUMENTS_BATCH = 1000
+DELETE_EMPLOYEES_BATCH = 100
+XLSX_EXPORT_ROWS = 100_000  # تصدير xlsx بطيء بطبيعته؛ يقاس على أول هذا العدد من الصفوف
+TOP_STATEMENTS = 5  # عدد الاستعلامات الأبطأ المحفوظة مع كل عملية
+
+DOCUMENT_EXPORT_HEADERS = ["الاسم", "الرقم", "النوع", "الفئة", "تاريخ الإصدار", "تاريخ الانتهاء", "الحالة", "الموظف", "ملاحظات"]
+SALARY_EXPORT_HEADERS = ["اسم الموظف", "القسم", "الراتب الأساسي (شهري)", "الراتب الأساسي (سنوي)",
+                         "البدلات", "الخصومات", "صافي الراتب", "طريقة الدفع", "تاريخ الدفع"]
+
+
+def _copy_database(source, target):
+    """ينسخ قاعدة البيانات بواجهة النسخ الاحتياطي في SQLite (تشمل أي تغييرات في ملف WAL)."""
+    with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+        src.backup(dst)
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=script_dir, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def build_cases(backend, exporter, work_dir, rng):
+    """
+    يعيد [(اسم العملية، دالة تعيد عدد الصفوف)] بالترتيب: القراءة أولاً ثم عمليات الحذف
+    (كل تكرار يحذف صفوفًا مختلفة).
+    """
+    conn = sqlite3.connect(backend.DB_NAME)
+    document_ids = [row[0] for row in conn.execute("SELECT id FROM documents")]
+    employee_ids = [row[0] for row in conn.execute("SELECT id FROM employees")]
+    last_payment = conn.execute("SELECT MAX(payment_date) FROM salaries").fetchone()[0] or date.today().isoformat()
+    conn.close()
+    year, month = int(last_payment[:4]), int(last_payment[5:7])
+    rng.shuffle(document_ids)
+    rng.shuffle(employee_ids)
+    salary_sample = employee_ids[:SALARY_CHECK_SAMPLE]
+    export_path = os.path.join(work_dir, "export")
+
+    def salary_checks():
+        return sum(backend.salary_exists_for_month(emp_id, year, month) for emp_id in salary_sample)
+
+    def export(rows, headers, extension):
+        return exporter.export_rows(rows, headers, export_path + extension)
+
+    def delete_next(ids, batch_size, delete):
+        batch = [ids.pop() for _ in range(min(batch_size, len(ids)))]
+        return delete(batch)
+
+    cases = [
+        ("fetch_all_documents", lambda: len(backend.fetch_all_documents())),
+        ("fetch_all_employees", lambda: len(backend.fetch_all_employees())),
+        ("fetch_all_salaries", lambda: len(backend.fetch_all_salaries())),
+        ("search_documents_fts_word", lambda: len(backend.search_documents_fts("جواز"))),
+        ("search_documents_fts_prefix", lambda: len(backend.search_documents_fts("العت"))),
+        ("search_documents_page", lambda: len(backend.search_documents_page("محمد")[0])),
+        ("expiry_page", lambda: len(backend.fetch_expiry_page()[0])),
+        ("query_salaries_page_month", lambda: len(backend.query_salaries_page(year=year, month=month)[0])),
+        ("salary_exists_for_month", salary_checks),
+        ("get_paid_employee_ids_for_month", lambda: len(backend.get_paid_employee_ids_for_month(year, month))),
+        ("export_documents_csv", lambda: export(backend.iter_documents_for_export(), DOCUMENT_EXPORT_HEADERS, ".csv")),
+        ("export_documents_csv_gz", lambda: export(backend.iter_documents_for_export(), DOCUMENT_EXPORT_HEADERS, ".csv.gz")),
+        ("export_salaries_csv", lambda: export(backend.iter_salaries_for_export(), SALARY_EXPORT_HEADERS, ".csv")),
+    ]
+    try:
+        import openpyxl  # noqa: F401
+        cases.append(("export_documents_xlsx", lambda: export(
+            islice(backend.iter_documents_for_export(), XLSX_EXPORT_ROWS), DOCUMENT_EXPORT_HEADERS, ".xlsx"
+        )))
+    except ImportError:
+        pass
+    cases += [
+        ("delete_documents", lambda: delete_next(document_ids, DELETE_DOCUMENTS_BATCH, backend.delete_documents)),
+        ("delete_employees", lambda: delete_next(employee_ids, DELETE_EMPLOYEES_BATCH, backend.delete_employees)),
+    ]
+    return cases
+
+
+def run_case(fn, repeat, instrumentation):
+    """يشغل العملية repeat مرة ويعيد قاموس الأزمنة (بالمللي ثانية) وعدد الصفوف وأبطأ الاستعلامات."""
+    timings = []
+    rows = None
+    instrumentation.reset()
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    statements = [
+        {"sql": name, "count": count, "p50_ms": round(p50, 3), "p95_ms": round(p95, 3)}
+        for _, name, count, p50, p95, _, _, _ in instrumentation.summary(instrumentation.KIND_SQL)[:TOP_STATEMENTS]
+    ]
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "min_ms": round(min(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "runs_ms": [round(t, 3) for t in timings],
+        "rows": rows,
+        "statements": statements,
+    }
+
+
+def run_benchmarks(db_path, repeat=DEFAULT_REPEAT, only=None, seed=1, progress=print):
+    """ينفذ جميع القياسات على نسخة من db_path ويعيد قاموس النتائج (القابل للحفظ كـ JSON)."""
+    work_dir = tempfile.mkdtemp(prefix="document_manager_bench_")
+    try:
+        work_db = os.path.join(work_dir, "bench.db")
+        _copy_database(db_path, work_db)
+        # يجب ضبط المسارات قبل استيراد backend
+        os.environ["DOCUMENT_MANAGER_DB"] = work_db
+        os.environ["DOCUMENT_MANAGER_ATTACHMENTS_DIR"] = os.path.join(work_dir, "attachments")
+        os.environ["DOCUMENT_MANAGER_SLOW_QUERY_LOG"] = os.path.join(work_dir, "slow_queries.log")
+        # تسجيل جميع الاستعلامات (لا البطيئة فقط) حتى تحفظ أبطأ استعلامات كل عملية في النتائج
+        os.environ["DOCUMENT_MANAGER_SQL_TRACE"] = "1"
+        sys.path.insert(0, script_dir)
+        import backend
+        import exporter
+        import instrumentation
+
+        backend.create_database()
+        conn = sqlite3.connect(work_db)
+        table_counts = {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("documents", "employees", "salaries", "audit_log", "attachments")
+        }
+        conn.close()
+
+        results = {}
+        for name, fn in build_cases(backend, exporter, work_dir, random.Random(seed)):
+            if only and name not in only:
+                continue
+            results[name] = run_case(fn, repeat, instrumentation)
+            progress(f"{name}: {results[name]['median_ms']:.1f} ms (الصفوف: {results[name]['rows']})")
+        backend.flush_audit_log()
+        return {
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "revision": _git_revision(),
+                "database": os.path.abspath(db_path),
+                "tables": table_counts,
+                "repeat": repeat,
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "platform": platform.platform(),
+            },
+            "results": results,
+        }
+    finally:
+        from db_connection import close_all_connections
+        close_all_connections()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    يقارن الوسيط لكل عملية بالنتائج السابقة. يعيد [(العملية، الوسيط السابق، الحالي، النسبة، تراجع؟)].
+    """
+    rows = []
+    for name, result in current["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        before, after = previous["median_ms"], result["median_ms"]
+        ratio = after / before if before else float("inf")
+        regressed = ratio > 1 + tolerance and after - before > NOISE_FLOOR_MS
+        rows.append((name, before, after, ratio, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس أداء عمليات الواجهة الخلفية")
+    parser.add_argument("--db", required=True, help="قاعدة بيانات مولدة بواسطة generate_data.py")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="عدد مرات تكرار كل عملية")
+    parser.add_argument("--only", nargs="*", default=None, help="قياس عمليات محددة فقط")
+    parser.add_argument("--output", default=None, help="حفظ النتائج في ملف JSON")
+    parser.add_argument("--compare", default=None, help="ملف نتائج سابق للمقارنة")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="نسبة التباطؤ المسموح بها")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        sys.exit(f"قاعدة البيانات غير موجودة: {args.db} (أنشئها بـ generate_data.py)")
+    report = run_benchmarks(args.db, repeat=args.repeat, only=set(args.only) if args.only else None)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"تم حفظ النتائج في {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = 0
+        for name, before, after, ratio, regressed in compare(report, baseline, args.tolerance):
+            regressions += regressed
+            marker = "  <-- تراجع" if regressed else ""
+            print(f"{name:35} {before:10.1f} ms -> {after:10.1f} ms ({ratio:5.2f}x){marker}")
+        if regressions:
+            print(f"{regressions} عملية/عمليات أبطأ من النتائج السابقة بأكثر من {args.tolerance:.0%}.")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+قياس زمن بدء تشغيل التطبيق: الزمن حتى ظهور النافذة، والزمن حتى تحميل بيانات اللسان الأول.
+يشغل main.py في عملية مستقلة لكل تكرار (بدون ذاكرة مؤقتة للاستيرادات من تشغيل سابق)،
+ويستبدل root.mainloop بدالة تسجل الأزمنة ثم تغلق النافذة.
+كل تشغيل يعمل على نسخة مؤقتة من قاعدة البيانات ومجلد مرفقات مؤقت فارغ، فلا يغير التطبيق
+(مثل نقل المرفقات القديمة عند البدء) البيانات الحقيقية.
+
+الاستخدام:
+    python bench_startup.py [--db document_management.db] [--runs 5] [--timeout 30]
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+MAIN_SCRIPT = os.path.join(script_dir, "main.py")
+DEFAULT_DB = os.path.join(script_dir, "document_management.db")
+
+# مكتبات ثقيلة يجب ألا يتم استيرادها قبل الحاجة إليها
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "PIL")
+
+# الشيفرة التي تعمل داخل العملية الفرعية
+_CHILD_CODE = r"""
+import json, sys, time
+start = time.perf_counter()
+import tkinter
+
+main_path, heavy_modules, timeout = sys.argv[1], sys.argv[2].split(","), float(sys.argv[3])
+namespace = {"__name__": "__main__", "__file__": main_path}
+
+def measured_mainloop(self, n=0):
+    self.update()  # رسم النافذة لأول مرة
+    window_time = time.perf_counter() - start
+    # انتظار انتهاء تحميل بيانات اللسان الأول في الخيوط العاملة
+    executor = namespace.get("task_executor")
+    deadline = time.perf_counter() + timeout
+    self.update()
+    while executor is not None and executor.busy and time.perf_counter() < deadline:
+        self.update()
+        time.sleep(0.005)
+    data_time = time.perf_counter() - start
+    print(json.dumps({
+        "window": window_time,
+        "first_tab_loaded": data_time,
+        "heavy_imports": [m for m in heavy_modules if m in sys.modules],
+    }))
+    sys.stdout.flush()
+    on_close = namespace.get("on_close")
+    on_close() if on_close else self.destroy()
+
+tkinter.Tk.mainloop = measured_mainloop
+sys.path.insert(0, __import__("os").path.dirname(main_path))
+with open(main_path, encoding="utf-8") as f:
+    exec(compile(f.read(), main_path, "exec"), namespace)
+"""
+
+
+def _copy_database(source, target):
+    """
+    ينسخ قاعدة البيانات بواجهة النسخ الاحتياطي في SQLite (تشمل أي تغييرات في ملف WAL).
+    المرفقات القديمة تفصل عن ملفاتها في النسخة، لأن نقلها إلى المخزن عند البدء يحذف الملف الأصلي.
+    """
+    with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+        src.backup(dst)
+        if dst.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='attachments'").fetchone():
+            dst.execute("UPDATE attachments SET file_path=NULL WHERE content_hash IS NULL")
+
+
+def run_once(timeout, db_path=DEFAULT_DB):
+    """يشغل التطبيق مرة واحدة على نسخة مؤقتة من db_path ويعيد قاموس الأزمنة (بالثواني)."""
+    work_dir = tempfile.mkdtemp(prefix="document_manager_startup_")
+    try:
+        work_db = os.path.join(work_dir, "startup.db")
+        if os.path.exists(db_path):
+            _copy_database(db_path, work_db)
+        env = dict(
+            os.environ,
+            DOCUMENT_MANAGER_DB=work_db,
+            DOCUMENT_MANAGER_ATTACHMENTS_DIR=os.path.join(work_dir, "attachments"),
+            DOCUMENT_MANAGER_SLOW_QUERY_LOG=os.path.join(work_dir, "slow_queries.log"),
+        )
+        completed = subprocess.run(
+            [sys.executable, "-c", _CHILD_CODE, MAIN_SCRIPT, ",".join(HEAVY_MODULES), str(timeout)],
+            capture_output=True, text=True, timeout=timeout + 30, cwd=script_dir, env=env
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    raise RuntimeError(f"فشل تشغيل التطبيق:\n{completed.stderr.strip()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس زمن بدء تشغيل نظام إدارة المستندات")
+    parser.add_argument("--db", default=DEFAULT_DB, help="قاعدة البيانات التي تنسخ لكل تشغيل")
+    parser.add_argument("--runs", type=int, default=5, help="عدد مرات التشغيل")
+    parser.add_argument("--timeout", type=float, default=30.0, help="أقصى مدة لانتظار تحميل البيانات")
+    args = parser.parse_args()
+
+    results = []
+    for i in range(args.runs):
+        result = run_once(args.timeout, args.db)
+        results.append(result)
+        print(f"تشغيل {i + 1}: النافذة {result['window'] * 1000:.0f} ms، "
+              f"اللسان الأول {result['first_tab_loaded'] * 1000:.0f} ms")
+
+    for key, label in (("window", "ظهور النافذة"), ("first_tab_loaded", "تحميل اللسان الأول")):
+        values = [r[key] * 1000 for r in results]
+        print(f"{label}: الوسيط {statistics.median(values):.0f} ms، الأدنى {min(values):.0f} ms، الأعلى {max(values):.0f} ms")
+
+    heavy = sorted({m for r in results for m in r["heavy_imports"]})
+    if heavy:
+        print(f"تحذير: تم استيراد مكتبات ثقيلة أثناء البدء: {', '.join(heavy)}")
+
+
+if __name__ == "__main__":
+    main()
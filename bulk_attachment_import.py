@@ -0,0 +1,239 @@
+"""
+استيراد مجلد كامل من المرفقات دفعة واحدة (مثل آلاف الملفات الممسوحة ضوئيًا عند إضافة فرع جديد).
+كل ملف يربط بمستند حسب قاعدة ربط (افتراضيًا: بادئة اسم الملف = رقم المستند، مثل A123_passport.pdf).
+تحسب ملخصات الملفات وتنسخ إلى مخزن المرفقات بالتوازي، ثم تضاف جميع صفوف المرفقات في معاملة واحدة.
+يسجل التقدم في ملف يوميات (journal)، فإذا توقف الاستيراد يكمل التشغيل التالي من حيث توقف
+دون إعادة قراءة الملفات المنسوخة.
+
+الاستخدام:
+    python bulk_attachment_import.py FOLDER [--workers 4] [--separators "_-. "]
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from attachment_store import AttachmentStore
+from backend import attachment_store, add_attachments_bulk, get_document_ids_by_numbers
+
+DEFAULT_SEPARATORS = "_-. "  # الأحرف التي تفصل رقم المستند عن بقية اسم الملف
+JOURNAL_DIR_NAME = ".imports"
+
+
+def prefix_rule(separators=DEFAULT_SEPARATORS):
+    """
+    قاعدة ربط: رقم المستند هو بداية اسم الملف حتى أول فاصل
+    (A123_passport.pdf و A123-2.jpg كلاهما للمستند A123).
+    """
+    def rule(relative_path):
+        stem = os.path.splitext(os.path.basename(relative_path))[0]
+        for index, char in enumerate(stem):
+            if char in separators:
+                return stem[:index] or None
+        return stem or None
+    return rule
+
+
+def scan_directory(source_dir):
+    """يعيد [(المسار النسبي، الحجم، وقت التعديل)] لجميع الملفات داخل المجلد ومجلداته الفرعية."""
+    files = []
+    for directory, dirnames, filenames in os.walk(source_dir):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            stat = os.stat(path)
+            files.append((os.path.relpath(path, source_dir), stat.st_size, stat.st_mtime))
+    return files
+
+
+def _stage_file(store_dir, compress, path):
+    """
+    يعمل في عملية أو خيط عامل: يقرأ الملف مرة واحدة لحساب ملخصه ونسخه (مضغوطًا عند الجدوى)
+    إلى مجلد مؤقت في المخزن. دالة على مستوى الوحدة حتى يمكن تمريرها إلى ProcessPoolExecutor.
+    """
+    return AttachmentStore(store_dir, compress=compress).stage(path)
+
+
+class ImportJournal:
+    """
+    ملف يوميات لكل مجلد مصدر: سطر JSON لكل ملف تم نسخه إلى المخزن.
+    يحذف عند اكتمال الاستيراد، ويستخدم عند الاستئناف لتخطي الملفات المنسوخة مسبقًا.
+    """
+
+    def __init__(self, store, source_dir):
+        key = hashlib.sha1(os.path.abspath(source_dir).encode("utf-8")).hexdigest()
+        directory = os.path.join(store.root_dir, JOURNAL_DIR_NAME)
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{key}.jsonl")
+
+    def load(self):
+        """يعيد {المسار النسبي: (الحجم، وقت التعديل، الملخص)} للملفات المسجلة."""
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # سطر غير مكتمل بسبب توقف مفاجئ
+                entries[entry["path"]] = (entry["size"], entry["mtime"], entry["hash"])
+        return entries
+
+    def open(self):
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def record(self, relative_path, size, mtime, content_hash):
+        self._file.write(json.dumps({"path": relative_path, "size": size, "mtime": mtime, "hash": content_hash}) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def import_folder(source_dir, rule=None, use_processes=True, max_workers=None, progress_callback=None,
+                  should_cancel=None, store=None):
+    """
+    يستورد جميع ملفات المجلد كمرفقات للمستندات المطابقة لقاعدة الربط.
+    use_processes: استخدام عمليات متعددة (للتشغيل من سطر الأوامر). من واجهة Tk تستخدم الخيوط،
+    لأن العمليات الجديدة في Windows تعيد استيراد الوحدة الرئيسية (التي تنشئ النافذة).
+    progress_callback(done, total, bytes_done): يستدعى بعد نسخ كل ملف.
+    should_cancel(): إذا أعادت True يتوقف الاستيراد، ويمكن استئنافه لاحقًا.
+    يعيد قاموسًا بملخص العملية والإنتاجية.
+    """
+    store = store or attachment_store
+    rule = rule or prefix_rule()
+    started = time.perf_counter()
+
+    files = scan_directory(source_dir)
+    numbers = {relative_path: rule(relative_path) for relative_path, _, _ in files}
+    document_ids = get_document_ids_by_numbers(n for n in numbers.values() if n)
+    matched = [(p, size, mtime) for p, size, mtime in files if numbers[p] in document_ids]
+    unmatched = [p for p, _, _ in files if numbers[p] not in document_ids]
+
+    journal = ImportJournal(store, source_dir)
+    staged = {}  # المسار النسبي -> (الملخص، الحجم، وقت التعديل)
+    for relative_path, (size, mtime, content_hash) in journal.load().items():
+        if store.exists(content_hash):
+            staged[relative_path] = (content_hash, size, mtime)
+    resumed = len(staged)
+
+    # الملفات التي تغيرت منذ التشغيل السابق تنسخ مرة أخرى
+    pending = [(p, size, mtime) for p, size, mtime in matched
+               if p not in staged or staged[p][1:] != (size, mtime)]
+    total = len(matched)
+    done = total - len(pending)
+    bytes_copied = 0
+    errors = []
+    interrupted = False
+
+    pool_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    journal.open()
+    try:
+        with pool_class(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(_stage_file, store.root_dir, store.compress, os.path.join(source_dir, p)): (p, size, mtime)
+                for p, size, mtime in pending
+            }
+            for future in as_completed(futures):
+                relative_path, size, mtime = futures.pop(future)
+                try:
+                    temp_path, content_hash, file_size, codec, stored_size = future.result()
+                    with store.lock:
+                        store.commit(temp_path, content_hash, codec)
+                    journal.record(relative_path, size, mtime, content_hash)
+                    staged[relative_path] = (content_hash, size, mtime)
+                    bytes_copied += file_size
+                except Exception as e:
+                    errors.append((relative_path, str(e)))
+                done += 1
+                if progress_callback:
+                    progress_callback(done, total, bytes_copied)
+                if should_cancel and should_cancel():
+                    interrupted = True
+                    pool.shutdown(wait=True, cancel_futures=True)
+                    _discard_unclaimed(store, futures)
+                    break
+    finally:
+        journal.close()
+
+    inserted = 0
+    if not interrupted:
+        rows = [
+            (document_ids[numbers[p]], os.path.basename(p), staged[p][0], size)
+            for p, size, _ in matched if p in staged
+        ]
+        inserted, missing = add_attachments_bulk(rows)
+        errors.extend((row[1], "الملف غير موجود في المخزن، أعد الاستيراد") for row in missing)
+        if not errors:
+            journal.clear()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "files": len(files),
+        "matched": total,
+        "unmatched": unmatched,
+        "resumed": resumed,
+        "inserted": inserted,
+        "errors": errors,
+        "interrupted": interrupted,
+        "bytes": bytes_copied,
+        "seconds": elapsed,
+        "files_per_second": (len(pending) / elapsed) if elapsed else 0.0,
+        "mb_per_second": (bytes_copied / (1024 * 1024) / elapsed) if elapsed else 0.0,
+    }
+
+
+def _discard_unclaimed(store, futures):
+    """يحذف الملفات المؤقتة للمهام التي انتهت بعد طلب الإيقاف ولم تتم معالجة نتيجتها."""
+    for future in futures:
+        if future.done() and not future.cancelled() and future.exception() is None:
+            store.discard(future.result()[0])
+
+
+def format_report(report):
+    """نص مختصر بنتيجة الاستيراد لعرضه للمستخدم."""
+    lines = [
+        f"تمت إضافة {report['inserted']} مرفق/ات من {report['matched']} ملف/ات مطابقة ({report['files']} ملف في المجلد).",
+        f"الإنتاجية: {report['files_per_second']:.1f} ملف/ثانية، {report['mb_per_second']:.1f} ميجابايت/ثانية "
+        f"({report['seconds']:.1f} ثانية).",
+    ]
+    if report["resumed"]:
+        lines.append(f"تم استئناف استيراد سابق ({report['resumed']} ملف/ات منسوخة مسبقًا).")
+    if report["unmatched"]:
+        lines.append(f"{len(report['unmatched'])} ملف/ات لا تطابق أي رقم مستند.")
+    if report["errors"]:
+        lines.append(f"{len(report['errors'])} ملف/ات فشل استيرادها.")
+    if report["interrupted"]:
+        lines.append("تم إيقاف الاستيراد؛ يمكن استئنافه بتشغيله مرة أخرى على نفس المجلد.")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="استيراد مجلد مرفقات دفعة واحدة")
+    parser.add_argument("folder", help="المجلد الذي يحتوي على الملفات")
+    parser.add_argument("--workers", type=int, default=None, help="عدد العمليات العاملة")
+    parser.add_argument("--separators", default=DEFAULT_SEPARATORS, help="الأحرف التي تنهي رقم المستند في اسم الملف")
+    args = parser.parse_args()
+
+    def show_progress(done, total, bytes_done):
+        print(f"\r{done}/{total} ({bytes_done / (1024 * 1024):.1f} MB)", end="", flush=True)
+
+    report = import_folder(args.folder, rule=prefix_rule(args.separators), max_workers=args.workers,
+                           progress_callback=show_progress)
+    print()
+    print(format_report(report))
+    for path, error in report["errors"]:
+        print(f"  {path}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+استيراد الموظفين أو المستندات دفعة واحدة من ملف Excel (.xlsx) أو CSV (.csv أو .csv.gz)،
+مثل ترحيل السجلات من نظام الموارد البشرية القديم.
+يقرأ الملف على دفعات (openpyxl في وضع القراءة فقط)، ويحول التواريخ لكل دفعة مرة واحدة باستخدام pandas،
+ثم يضيف جميع الصفوف باستخدام executemany في معاملة واحدة.
+الصفوف المرفوضة (حقول ناقصة، تواريخ غير صالحة، رقم مستند أو بريد إلكتروني مكرر) تكتب في ملف
+منفصل مع سبب الرفض بدلاً من إيقاف الاستيراد.
+
+الاستخدام:
+    python bulk_import.py employees FILE
+    python bulk_import.py documents FILE
+"""
+import argparse
+import csv
+import gzip
+import os
+import time
+from datetime import date, datetime
+from itertools import islice
+
+from backend import DOCUMENT_IMPORT_COLUMNS, EMPLOYEE_IMPORT_COLUMNS, add_documents_bulk, add_employees_bulk
+from exporter import detect_export_format
+
+IMPORT_CHUNK_SIZE = 2000  # عدد الصفوف في كل دفعة قراءة وإضافة
+REJECT_REASON_HEADER = "سبب الرفض"
+
+# أسماء الأعمدة المقبولة في الملف لكل حقل (بالإنجليزية أو بعناوين الجداول وملفات التصدير)
+DOCUMENT_HEADER_ALIASES = {
+    "name": ("name", "الاسم", "اسم المستند"),
+    "number": ("number", "الرقم", "رقم المستند"),
+    "type": ("type", "النوع"),
+    "category": ("category", "الفئة"),
+    "issue_date": ("issue_date", "تاريخ الإصدار"),
+    "expiry_date": ("expiry_date", "تاريخ الانتهاء"),
+    "status": ("status", "الحالة"),
+    "employee_id": ("employee_id", "employee", "الموظف"),
+    "notes": ("notes", "ملاحظات"),
+}
+EMPLOYEE_HEADER_ALIASES = {
+    "name": ("name", "الاسم", "اسم الموظف"),
+    "position": ("position", "المنصب", "الوظيفة"),
+    "department": ("department", "القسم"),
+    "start_date": ("start_date", "hire_date", "تاريخ التعيين", "تاريخ البدء"),
+    "phone": ("phone", "الهاتف", "رقم الهاتف"),
+    "email": ("email", "البريد الإلكتروني"),
+    "address": ("address", "العنوان"),
+    "notes": ("notes", "ملاحظات"),
+}
+
+# إعدادات كل نوع من السجلات: الأعمدة، والأسماء البديلة، والحقول المطلوبة، وحقول التواريخ، ودالة الإضافة
+IMPORT_KINDS = {
+    "documents": (DOCUMENT_IMPORT_COLUMNS, DOCUMENT_HEADER_ALIASES, ("name", "number", "type", "category"),
+                  ("issue_date", "expiry_date"), add_documents_bulk),
+    "employees": (EMPLOYEE_IMPORT_COLUMNS, EMPLOYEE_HEADER_ALIASES, ("name",),
+                  ("start_date",), add_employees_bulk),
+}
+
+
+# --- قراءة الملفات ---
+def _iter_xlsx(filepath):
+    """يقرأ صفوف أول ورقة في ملف Excel دون تحميل الملف كاملاً في الذاكرة."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield row
+    finally:
+        workbook.close()
+
+
+def _iter_csv(filepath, compressed):
+    opener = gzip.open if compressed else open
+    with opener(filepath, "rt", encoding="utf-8-sig", newline="") as f:
+        yield from csv.reader(f)
+
+
+def iter_file_rows(filepath):
+    """مولد لصفوف الملف (أول صف هو العناوين) حسب امتداده: xlsx أو csv أو csv.gz."""
+    file_format = detect_export_format(filepath)
+    if file_format == "xlsx":
+        return _iter_xlsx(filepath)
+    return _iter_csv(filepath, compressed=file_format == "csv.gz")
+
+
+def _map_header(header, aliases, required):
+    """يعيد {الحقل: رقم العمود في الملف}. يرفع ValueError إذا كان عمود مطلوب غير موجود."""
+    normalized = [str(cell).strip().lower() if cell is not None else "" for cell in header]
+    positions = {}
+    for field, names in aliases.items():
+        for name in names:
+            if name.lower() in normalized:
+                positions[field] = normalized.index(name.lower())
+                break
+    missing = [field for field in required if field not in positions]
+    if missing:
+        raise ValueError(f"أعمدة مطلوبة غير موجودة في الملف: {', '.join(missing)}")
+    return positions
+
+
+# --- تحويل القيم ---
+def parse_dates(values):
+    """
+    يحول قائمة تواريخ (نصوص DD-MM-YYYY أو YYYY-MM-DD، أو تواريخ Excel) إلى YYYY-MM-DD دفعة واحدة
+    باستخدام pandas بدلاً من تحليل كل قيمة على حدة.
+    يعيد (التواريخ المحولة أو None للقيم الفارغة، قائمة True للقيم غير الصالحة).
+    """
+    import pandas as pd
+
+    series = pd.Series(
+        [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values], dtype="object"
+    )
+    text = series.astype("string").str.strip().str.slice(0, 10).str.replace("/", "-", regex=False)
+    blank = text.isna() | (text == "")
+    parsed = pd.to_datetime(text, format="%Y-%m-%d", errors="coerce")
+    parsed = parsed.fillna(pd.to_datetime(text, format="%d-%m-%Y", errors="coerce"))
+    formatted = parsed.dt.strftime("%Y-%m-%d").astype("object").where(parsed.notna(), None)
+    invalid = (parsed.isna() & ~blank).tolist()
+    return formatted.tolist(), invalid
+
+
+def _clean(value):
+    """يحول الخلايا الفارغة إلى None ويزيل المسافات من النصوص."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))  # أرقام Excel مثل 1234.0 لرقم المستند أو الهاتف
+    return value if isinstance(value, (date, datetime)) else str(value)
+
+
+def _prepare_chunk(rows, first_line, columns, positions, required, date_fields, rejects):
+    """
+    يحول دفعة من صفوف الملف إلى [((رقم السطر، الصف الأصلي)، القيم بترتيب columns)]،
+    ويضيف الصفوف غير الصالحة إلى rejects.
+    """
+    records = []
+    for line, row in enumerate(rows, start=first_line):
+        if all(cell in (None, "") for cell in row):
+            continue  # تخطي الصفوف الفارغة
+        values = {field: _clean(row[index]) if index < len(row) else None for field, index in positions.items()}
+        for field, value in values.items():
+            if field not in date_fields and isinstance(value, (date, datetime)):
+                values[field] = value.isoformat()
+        records.append(((line, row), values))
+
+    invalid_rows = {}
+    for field in date_fields:
+        if field not in positions:
+            continue
+        parsed, invalid = parse_dates([values[field] for _, values in records])
+        for (source, values), value, bad in zip(records, parsed, invalid):
+            values[field] = value
+            if bad:
+                invalid_rows.setdefault(source[0], f"تاريخ غير صالح في الحقل {field}")
+
+    batch = []
+    for source, values in records:
+        missing = [field for field in required if not values.get(field)]
+        if missing:
+            rejects.append((source, f"حقول مطلوبة فارغة: {', '.join(missing)}"))
+        elif source[0] in invalid_rows:
+            rejects.append((source, invalid_rows[source[0]]))
+        else:
+            batch.append((source, tuple(values.get(column) for column in columns)))
+    return batch
+
+
+def _write_rejects(rejects_path, header, rejects):
+    """يكتب الصفوف المرفوضة مع رقم السطر وسبب الرفض إلى ملف CSV."""
+    with open(rejects_path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["السطر"] + [str(cell) if cell is not None else "" for cell in header] + [REJECT_REASON_HEADER])
+        for (line, row), reason in sorted(rejects, key=lambda item: item[0][0]):
+            writer.writerow([line] + list(row) + [reason])
+
+
+def default_rejects_path(filepath):
+    """ملف الصفوف المرفوضة بجانب الملف المستورد (مثل employees.xlsx -> employees_rejects.csv)."""
+    base = filepath[:-len(".csv.gz")] if filepath.lower().endswith(".csv.gz") else os.path.splitext(filepath)[0]
+    return f"{base}_rejects.csv"
+
+
+def import_records(kind, filepath, chunk_size=IMPORT_CHUNK_SIZE, rejects_path=None, progress_callback=None):
+    """
+    يستورد سجلات kind ("employees" أو "documents") من الملف في معاملة واحدة.
+    progress_callback(rows_read): يستدعى بعد قراءة كل دفعة.
+    يعيد قاموسًا بعدد الصفوف المقروءة والمضافة والمرفوضة، ومسار ملف المرفوضات، والمدة.
+    """
+    columns, aliases, required, date_fields, add_bulk = IMPORT_KINDS[kind]
+    started = time.perf_counter()
+    rows = iter(iter_file_rows(filepath))
+    header = next(rows, None)
+    if header is None:
+        raise ValueError("الملف فارغ.")
+    positions = _map_header(header, aliases, required)
+
+    rejects = []
+    counter = {"read": 0}
+
+    def batches():
+        line = 2  # السطر الأول في الملف هو العناوين
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            yield _prepare_chunk(chunk, line, columns, positions, required, date_fields, rejects)
+            line += len(chunk)
+            counter["read"] += len(chunk)
+            if progress_callback:
+                progress_callback(counter["read"])
+
+    inserted, duplicates = add_bulk(batches())
+    rejects.extend(duplicates)
+
+    rejects_path = rejects_path or default_rejects_path(filepath)
+    if rejects:
+        _write_rejects(rejects_path, header, rejects)
+    elapsed = time.perf_counter() - started
+    return {
+        "kind": kind,
+        "read": counter["read"],
+        "inserted": inserted,
+        "rejected": len(rejects),
+        "rejects_path": rejects_path if rejects else None,
+        "seconds": elapsed,
+        "rows_per_second": counter["read"] / elapsed if elapsed else 0.0,
+    }
+
+
+def format_report(report):
+    """نص مختصر بنتيجة الاستيراد لعرضه للمستخدم."""
+    lines = [
+        f"تمت إضافة {report['inserted']} من {report['read']} صف/صفوف "
+        f"خلال {report['seconds']:.1f} ثانية ({report['rows_per_second']:.0f} صف/ثانية).",
+    ]
+    if report["rejected"]:
+        lines.append(f"تم رفض {report['rejected']} صف/صفوف، وحفظت مع أسباب الرفض في:\n{report['rejects_path']}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="استيراد الموظفين أو المستندات من ملف Excel أو CSV")
+    parser.add_argument("kind", choices=sorted(IMPORT_KINDS), help="نوع السجلات")
+    parser.add_argument("file", help="ملف xlsx أو csv أو csv.gz")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="عدد الصفوف في كل دفعة")
+    parser.add_argument("--rejects", default=None, help="مسار ملف الصفوف المرفوضة")
+    args = parser.parse_args()
+
+    report = import_records(args.kind, args.file, chunk_size=args.chunk_size, rejects_path=args.rejects,
+                            progress_callback=lambda n: print(f"\r{n} صف", end="", flush=True))
+    print()
+    print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
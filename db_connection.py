@@ -0,0 +1,75 @@
+import atexit
+import sqlite3
+import threading
+
+import instrumentation
+
+# إعدادات الاتصال بقاعدة البيانات
+BUSY_TIMEOUT_MS = 5000  # مدة انتظار القفل قبل رفع خطأ "database is locked"
+STATEMENT_CACHE_SIZE = 256  # عدد الاستعلامات المحضرة التي يحتفظ بها كل اتصال
+
+_local = threading.local()
+_all_connections = []
+_registry_lock = threading.Lock()
+
+
+def _configure_connection(conn):
+    """يطبق إعدادات الأداء على اتصال جديد."""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    instrumentation.install(conn)
+
+
+def get_connection(db_name):
+    """
+    يعيد اتصالاً مشتركًا بقاعدة البيانات خاصًا بالخيط (thread) الحالي.
+    يتم إنشاء الاتصال مرة واحدة لكل خيط ولكل ملف قاعدة بيانات ثم يعاد استخدامه،
+    بدلاً من فتح اتصال جديد وإغلاقه في كل استدعاء.
+    يمكن استخدامه مع "with" كما في sqlite3.connect: يتم الحفظ (commit) عند النجاح
+    والتراجع (rollback) عند حدوث استثناء، دون إغلاق الاتصال.
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get(db_name)
+    if conn is None:
+        conn = sqlite3.connect(db_name, timeout=BUSY_TIMEOUT_MS / 1000, cached_statements=STATEMENT_CACHE_SIZE)
+        _configure_connection(conn)
+        connections[db_name] = conn
+        with _registry_lock:
+            _all_connections.append(conn)
+    return conn
+
+
+def close_connection(db_name=None):
+    """يغلق اتصال الخيط الحالي (أو جميع اتصالاته إذا لم يحدد ملف قاعدة البيانات)."""
+    connections = getattr(_local, "connections", None)
+    if not connections:
+        return
+    names = [db_name] if db_name else list(connections)
+    for name in names:
+        conn = connections.pop(name, None)
+        if conn is None:
+            continue
+        with _registry_lock:
+            if conn in _all_connections:
+                _all_connections.remove(conn)
+        conn.close()
+
+
+def close_all_connections():
+    """يغلق جميع الاتصالات المفتوحة في كل الخيوط (يستدعى عند إغلاق التطبيق)."""
+    with _registry_lock:
+        connections = list(_all_connections)
+        _all_connections.clear()
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.ProgrammingError:
+            # لا يمكن إغلاق اتصال خيط آخر في بعض الحالات؛ سيغلق عند انتهاء العملية
+            pass
+
+
+atexit.register(close_all_connections)
@@ -0,0 +1,137 @@
+from bisect import bisect_left
+from tkinter import ttk
+
+from text_normalize import normalize_arabic
+
+DEFAULT_MAX_RESULTS = 50  # أقصى عدد من النتائج المعروضة في القائمة
+DEFAULT_DEBOUNCE_MS = 150  # مدة الانتظار بعد آخر ضغطة مفتاح قبل البحث
+
+
+def _normalize(text):
+    # توحيد الهمزات والتشكيل كما في بحث قاعدة البيانات: "احمد" يجد "أحمد"
+    return normalize_arabic(text)
+
+
+class EmployeeIndex:
+    """
+    فهرس بادئات للموظفين في الذاكرة: مصفوفتان مرتبتان من (النص الموحد، المعرف، الاسم)،
+    الأولى للاسم الكامل والثانية لكل كلمة تالية فيه، فكتابة بداية الاسم الأول أو اسم العائلة تكفي.
+    البحث بـ bisect (O(log n) ثم المرور على limit نتيجة فقط) بدلاً من المرور على جميع الموظفين.
+    """
+
+    def __init__(self, employees=()):
+        self.build(employees)
+
+    def build(self, employees):
+        """employees: [(id, name)]."""
+        full_entries, word_entries = [], []
+        self._names = {}
+        for emp_id, name in employees:
+            name = name or ""
+            self._names[emp_id] = name
+            words = _normalize(name).split(" ")
+            full_entries.append((" ".join(words), emp_id, name))
+            for index in range(1, len(words)):
+                word_entries.append((" ".join(words[index:]), emp_id, name))
+        full_entries.sort()
+        word_entries.sort()
+        self._arrays = [(full_entries, [entry[0] for entry in full_entries]),
+                        (word_entries, [entry[0] for entry in word_entries])]
+        self._by_name = [(emp_id, name) for _, emp_id, name in full_entries]
+
+    def __len__(self):
+        return len(self._names)
+
+    def name_of(self, emp_id):
+        return self._names.get(emp_id)
+
+    def search(self, text, limit=DEFAULT_MAX_RESULTS):
+        """
+        يعيد حتى limit من أزواج (id, name) التي تبدأ إحدى كلمات اسمها بالنص،
+        والمطابقة من بداية الاسم أولاً. النص الفارغ يعيد أول limit موظف حسب الاسم.
+        """
+        prefix = _normalize(text)
+        if not prefix:
+            return self._by_name[:limit]
+        results, seen = [], set()
+        for entries, keys in self._arrays:
+            for position in range(bisect_left(keys, prefix), len(entries)):
+                key, emp_id, name = entries[position]
+                if len(results) >= limit or not key.startswith(prefix):
+                    break
+                if emp_id not in seen:
+                    seen.add(emp_id)
+                    results.append((emp_id, name))
+        return results
+
+
+class EmployeePicker(ttk.Combobox):
+    """
+    قائمة منسدلة لاختيار موظف بالكتابة: تعرض بعد توقف الكتابة (debounce) أفضل النتائج المطابقة فقط
+    بدلاً من جميع الموظفين، وتعيد الموظف المختار كزوج (id, name) دون تحليل النص المعروض.
+    """
+
+    def __init__(self, master, max_results=DEFAULT_MAX_RESULTS, debounce_ms=DEFAULT_DEBOUNCE_MS, **kwargs):
+        super().__init__(master, **kwargs)
+        self.index = EmployeeIndex()
+        self.max_results = max_results
+        self.debounce_ms = debounce_ms
+        self._results = []  # الأزواج (id, name) المعروضة حاليًا بنفس ترتيب القائمة
+        self._selected = None
+        self._pending = None
+        self.bind("<KeyRelease>", self._on_key, add="+")
+        self.bind("<<ComboboxSelected>>", self._on_selected, add="+")
+
+    def set_employees(self, employees):
+        """يعيد بناء الفهرس من [(id, name)] (مثلاً بعد إضافة موظف أو حذفه)."""
+        self.index.build(employees)
+        if self._selected is not None and self.index.name_of(self._selected[0]) is None:
+            self.clear()
+        self._show_results("" if self._selected is not None else self.get())
+
+    def get_selected(self):
+        """
+        يعيد (id, name) للموظف المختار، أو None. إذا كتب المستخدم اسمًا كاملاً دون الاختيار
+        من القائمة، يقبل فقط إذا كان يطابق موظفًا واحدًا.
+        """
+        text = self.get()
+        if self._selected is not None and text == self._display(self._selected):
+            return self._selected
+        normalized = _normalize(text)
+        matches = [pair for pair in self.index.search(text, self.max_results) if _normalize(pair[1]) == normalized]
+        return matches[0] if len(matches) == 1 else None
+
+    def set_selected(self, emp_id, name=None):
+        name = name if name is not None else self.index.name_of(emp_id) or ""
+        self._selected = (emp_id, name)
+        self.set(self._display(self._selected))
+
+    def clear(self):
+        self._selected = None
+        self.set("")
+
+    # --- داخلي ---
+    def _display(self, pair):
+        emp_id, name = pair
+        return f"{name} ({emp_id})"
+
+    def _on_key(self, event):
+        if event.keysym in ("Up", "Down", "Return", "Escape", "Tab"):
+            return
+        self._selected = None
+        if self._pending is not None:
+            self.after_cancel(self._pending)
+        self._pending = self.after(self.debounce_ms, self._search)
+
+    def _search(self):
+        self._pending = None
+        self._show_results(self.get())
+
+    def _show_results(self, text):
+        self._results = self.index.search(text, self.max_results)
+        self["values"] = [self._display(pair) for pair in self._results]
+
+    def _on_selected(self, event=None):
+        index = self.current()
+        if 0 <= index < len(self._results):
+            self._selected = self._results[index]
@@ -0,0 +1,73 @@
+import csv
+import gzip
+import os
+
+PROGRESS_EVERY = 1000  # عدد الصفوف بين كل تحديثين لشريط التقدم
+
+# صيغ التصدير المدعومة حسب امتداد الملف
+EXPORT_FORMATS = {
+    ".xlsx": "xlsx",
+    ".csv": "csv",
+    ".gz": "csv.gz",
+}
+
+
+def detect_export_format(filepath):
+    """يحدد صيغة التصدير من امتداد الملف (xlsx أو csv أو csv.gz)."""
+    extension = os.path.splitext(filepath)[1].lower()
+    try:
+        return EXPORT_FORMATS[extension]
+    except KeyError:
+        raise ValueError(f"صيغة تصدير غير مدعومة: {extension or filepath}")
+
+
+def export_rows(rows, headers, filepath, progress_callback=None, sheet_title="Sheet1"):
+    """
+    يصدر الصفوف إلى ملف أثناء قراءتها (بذاكرة ثابتة) دون تجميعها في قائمة أو DataFrame.
+    rows: أي كائن قابل للتكرار (مثل مولد يقرأ من مؤشر قاعدة البيانات).
+    progress_callback(count): يستدعى كل PROGRESS_EVERY صف وعند الانتهاء.
+    يعيد عدد الصفوف المصدرة.
+    """
+    export_format = detect_export_format(filepath)
+    if export_format == "xlsx":
+        return _export_xlsx(rows, headers, filepath, progress_callback, sheet_title)
+    if export_format == "csv.gz":
+        with gzip.open(filepath, "wt", encoding="utf-8-sig", newline="") as f:
+            return _export_csv(rows, headers, f, progress_callback)
+    # utf-8-sig حتى يتعرف Excel على النص العربي بشكل صحيح
+    with open(filepath, "w", encoding="utf-8-sig", newline="") as f:
+        return _export_csv(rows, headers, f, progress_callback)
+
+
+def _export_xlsx(rows, headers, filepath, progress_callback, sheet_title):
+    """يكتب ملف Excel باستخدام وضع الكتابة فقط في openpyxl (لا يحتفظ بالخلايا في الذاكرة)."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title)
+    sheet.append(list(headers))
+    count = 0
+    for row in rows:
+        sheet.append(list(row))
+        count += 1
+        if progress_callback and count % PROGRESS_EVERY == 0:
+            progress_callback(count)
+    workbook.save(filepath)
+    if progress_callback:
+        progress_callback(count)
+    return count
+
+
+def _export_csv(rows, headers, fileobj, progress_callback):
+    """يكتب الصفوف بصيغة CSV إلى ملف مفتوح."""
+    writer = csv.writer(fileobj)
+    writer.writerow(headers)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if progress_callback and count % PROGRESS_EVERY == 0:
+            progress_callback(count)
+    if progress_callback:
+        progress_callback(count)
+    return count
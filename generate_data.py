@@ -0,0 +1,212 @@
+"""
+توليد قاعدة بيانات تجريبية واقعية (أسماء عربية، أقسام، مستندات بتواريخ صلاحية متنوعة، رواتب شهرية،
+وسجل تدقيق) لقياس أداء الواجهة الخلفية على أحجام كبيرة.
+الأحجام المتاحة (عدد المستندات): 10k و 100k و 1m؛ عدد الموظفين عُشر عدد المستندات،
+ولكل موظف راتب لكل شهر من آخر SALARY_MONTHS شهرًا، وعدد أحداث التدقيق يساوي عدد المستندات.
+
+الاستخدام:
+    python generate_data.py --size 100k --output bench_100k.db
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+EMPLOYEES_PER_DOCUMENT = 0.1
+SALARY_MONTHS = 12
+INSERT_BATCH_SIZE = 10_000
+
+FIRST_NAMES = [
+    "محمد", "أحمد", "عبدالله", "خالد", "فهد", "سعود", "عمر", "علي", "يوسف", "إبراهيم",
+    "ناصر", "سلطان", "ماجد", "تركي", "بندر", "فاطمة", "نورة", "سارة", "مريم", "عائشة",
+    "هند", "ريم", "لطيفة", "منيرة", "أسماء", "جواهر", "العنود", "دانة", "هيفاء", "أمل",
+]
+FAMILY_NAMES = [
+    "العتيبي", "القحطاني", "الشمري", "الدوسري", "الحربي", "الغامدي", "الزهراني", "المطيري",
+    "السبيعي", "العنزي", "الشهري", "المالكي", "الرشيدي", "البقمي", "الظفيري", "الهاجري",
+    "الأحمدي", "الجهني", "السهلي", "الخالدي", "التميمي", "العمري", "الفيفي", "اليامي",
+]
+DEPARTMENTS = [
+    "الموارد البشرية", "المالية", "تقنية المعلومات", "المبيعات", "التسويق",
+    "العمليات", "الشؤون القانونية", "المشتريات", "خدمة العملاء",
+]
+POSITIONS = ["محاسب", "مهندس", "مدير", "أخصائي", "مساعد إداري", "محلل", "مشرف", "فني", "مندوب"]
+# نوع المستند -> (الفئة، بادئة الرقم، مدة الصلاحية بالسنوات)
+DOCUMENT_TYPES = {
+    "جواز سفر": ("شخصية", "P", 10),
+    "هوية وطنية": ("شخصية", "N", 10),
+    "رخصة قيادة": ("شخصية", "D", 5),
+    "إقامة": ("رسمية", "R", 1),
+    "عقد عمل": ("عقود", "C", 2),
+    "شهادة صحية": ("صحية", "H", 1),
+    "تأمين طبي": ("صحية", "I", 1),
+    "سجل تجاري": ("رسمية", "B", 5),
+}
+STATUSES = ["ساري", "قيد التجديد", "منتهي"]
+PAYMENT_METHODS = ["تحويل بنكي", "نقدي", "شيك"]
+NOTES = [None, None, None, "تم التجديد", "بانتظار الاعتماد", "نسخة أصلية في الأرشيف", "يرجى المتابعة مع الموظف"]
+AUDIT_ACTIONS = [
+    ("إضافة مستند", "تمت إضافة مستند جديد"), ("تحديث مستند", "تم تحديث بيانات المستند"),
+    ("إضافة موظف", "تمت إضافة موظف جديد"), ("إضافة راتب", "تمت إضافة راتب"),
+    ("تصدير بيانات", "تم تصدير المستندات إلى ملف"), ("حذف مستند", "تم حذف مستند"),
+]
+
+
+def _random_name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(FIRST_NAMES[:15])} {rng.choice(FAMILY_NAMES)}"
+
+
+def _batched(rows, size=INSERT_BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_employees(rng, count, today):
+    for i in range(1, count + 1):
+        start_date = today - timedelta(days=rng.randint(30, 15 * 365))
+        yield (
+            _random_name(rng), rng.choice(POSITIONS), rng.choice(DEPARTMENTS), start_date.isoformat(),
+            f"05{rng.randint(10_000_000, 99_999_999)}", f"employee{i}@example.com", "الرياض", None,
+        )
+
+
+def iter_documents(rng, count, employee_count, today):
+    types = list(DOCUMENT_TYPES)
+    for i in range(1, count + 1):
+        doc_type = rng.choice(types)
+        category, prefix, years = DOCUMENT_TYPES[doc_type]
+        # تواريخ انتهاء موزعة بين منتهية وقريبة الانتهاء وسارية
+        expiry = today + timedelta(days=rng.randint(-2 * 365, years * 365))
+        issue = expiry - timedelta(days=years * 365)
+        status = "منتهي" if expiry < today else rng.choice(STATUSES[:2])
+        employee_id = rng.randint(1, employee_count) if employee_count else None
+        yield (
+            f"{doc_type} {_random_name(rng)}", f"{prefix}{i:08d}", doc_type, category,
+            issue.isoformat(), expiry.isoformat(), status, employee_id, rng.choice(NOTES),
+        )
+
+
+def iter_salaries(rng, employee_count, today):
+    for emp_id in range(1, employee_count + 1):
+        basic = rng.randrange(4000, 40000, 250)
+        allowances = round(basic * rng.choice((0.1, 0.2, 0.25)), 2)
+        method = rng.choice(PAYMENT_METHODS)
+        for months_ago in range(SALARY_MONTHS, 0, -1):
+            year, month = divmod(today.year * 12 + today.month - 1 - months_ago, 12)
+            deductions = rng.choice((0, 0, 0, 100, 250, 500))
+            yield (emp_id, basic, allowances, deductions, basic + allowances - deductions, method,
+                   date(year, month + 1, 27).isoformat())
+
+
+def iter_audit_rows(rng, count, today):
+    for _ in range(count):
+        action, details = rng.choice(AUDIT_ACTIONS)
+        day = today - timedelta(days=rng.randint(0, 2 * 365))
+        yield (f"{day.isoformat()} {rng.randint(7, 19):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}", action,
+               f"{details} (ID: {rng.randint(1, 1_000_000)})")
+
+
+def generate(output, documents, seed=1, progress=print):
+    """
+    ينشئ قاعدة بيانات جديدة في output بالمخطط نفسه الذي يستخدمه التطبيق (create_database)
+    ويملؤها بالبيانات. يعيد قاموسًا بعدد صفوف كل جدول.
+    """
+    os.environ["DOCUMENT_MANAGER_DB"] = output
+    os.environ.setdefault("DOCUMENT_MANAGER_SLOW_QUERY_LOG", os.path.splitext(output)[0] + "_slow_queries.log")
+    # استيراد backend ينشئ مجلد المرفقات (المخزن والصور المصغرة)؛ البيانات المولدة بلا مرفقات،
+    # فيستخدم مجلد مؤقت يحذف في النهاية بدلاً من إنشاء attachments بجانب التطبيق
+    attachments_dir = None
+    if not os.environ.get("DOCUMENT_MANAGER_ATTACHMENTS_DIR"):
+        attachments_dir = tempfile.mkdtemp(prefix="document_manager_generate_")
+        os.environ["DOCUMENT_MANAGER_ATTACHMENTS_DIR"] = attachments_dir
+    try:
+        return _generate(output, documents, seed, progress)
+    finally:
+        if attachments_dir:
+            shutil.rmtree(attachments_dir, ignore_errors=True)
+
+
+def _generate(output, documents, seed, progress):
+    import backend
+    from db_connection import get_connection
+
+    backend.create_database()
+    conn = get_connection(output)
+    # الإضافة دون فهارس البحث النصي أسرع بكثير؛ تعاد فهرستها مرة واحدة في النهاية
+    # (ونص البحث الموحد search_text يحسبه create_database للصفوف الجديدة)
+    for index in ("documents_fts", "documents_search", "employees_search"):
+        conn.execute(f"DROP TABLE IF EXISTS {index}")
+        for suffix in ("_ai", "_ad", "_au"):
+            conn.execute(f"DROP TRIGGER IF EXISTS {index}{suffix}")
+    conn.execute("PRAGMA synchronous=OFF")
+
+    rng = random.Random(seed)
+    today = date.today()
+    employee_count = max(1, int(documents * EMPLOYEES_PER_DOCUMENT))
+    tables = (
+        ("employees", "INSERT INTO employees (name, position, department, start_date, phone, email, address, notes) "
+                      "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", iter_employees(rng, employee_count, today)),
+        ("documents", "INSERT INTO documents (name, number, type, category, issue_date, expiry_date, status, "
+                      "employee_id, notes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+         iter_documents(rng, documents, employee_count, today)),
+        ("salaries", "INSERT INTO salaries (employee_id, basic_salary, allowances, deductions, net_salary, "
+                     "payment_method, payment_date) VALUES (?, ?, ?, ?, ?, ?, ?)",
+         iter_salaries(rng, employee_count, today)),
+        ("audit_log", "INSERT INTO audit_log (timestamp, action, details) VALUES (?, ?, ?)",
+         iter_audit_rows(rng, documents, today)),
+    )
+    counts = {}
+    for table, sql, rows in tables:
+        started = time.perf_counter()
+        count = 0
+        with conn:
+            for batch in _batched(rows):
+                conn.executemany(sql, batch)
+                count += len(batch)
+        counts[table] = count
+        progress(f"{table}: {count} صف ({time.perf_counter() - started:.1f} ثانية)")
+
+    started = time.perf_counter()
+    backend.create_database()  # يحسب search_text ويعيد إنشاء جداول FTS5 ومشغلاتها ويفهرس جميع الصفوف
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("ANALYZE")
+    progress(f"فهرس البحث و ANALYZE: {time.perf_counter() - started:.1f} ثانية")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="توليد قاعدة بيانات تجريبية لقياس الأداء")
+    parser.add_argument("--size", choices=sorted(SIZES), default="10k", help="عدد المستندات")
+    parser.add_argument("--documents", type=int, default=None, help="عدد المستندات (بدلاً من --size)")
+    parser.add_argument("--output", default=None, help="ملف قاعدة البيانات (افتراضيًا bench_<size>.db)")
+    parser.add_argument("--seed", type=int, default=1, help="بذرة التوليد العشوائي (لنتائج قابلة للتكرار)")
+    parser.add_argument("--force", action="store_true", help="استبدال الملف إذا كان موجودًا")
+    args = parser.parse_args()
+
+    documents = args.documents or SIZES[args.size]
+    output = os.path.abspath(args.output or f"bench_{args.size}.db")
+    if os.path.exists(output):
+        if not args.force:
+            sys.exit(f"الملف موجود مسبقًا: {output} (استخدم --force لاستبداله)")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(output + suffix):
+                os.remove(output + suffix)
+
+    started = time.perf_counter()
+    generate(output, documents, seed=args.seed)
+    print(f"تم إنشاء {output} خلال {time.perf_counter() - started:.1f} ثانية.")
+
+
+if __name__ == "__main__":
+    main()
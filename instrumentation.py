@@ -0,0 +1,251 @@
+"""
+قياس أداء الواجهة الخلفية: زمن التنفيذ وعدد الصفوف لكل دالة ولكل استعلام SQL.
+- الدوال: تغلف بـ timed (أو instrument_functions لتغليف دوال وحدة كاملة).
+- الاستعلامات: تلتقط عبر set_trace_callback على كل اتصال؛ زمن الاستعلام هو الوقت من بدايته
+  حتى بداية الاستعلام التالي أو نهاية الدالة المقاسة (أي يشمل جلب الصفوف).
+  افتراضيًا لا يحفظ في الذاكرة إلا الاستعلامات البطيئة (التطبيع والتجميع لكل استعلام مكلف في عمليات
+  الكتابة الكبيرة التي تمر بالتتبع مرة لكل خطوة من خطوات المشغلات)؛ والتسجيل الكامل لجميع الاستعلامات
+  يشغل من لسان التشخيص أو بمتغير البيئة DOCUMENT_MANAGER_SQL_TRACE=1.
+تحفظ القياسات في ذاكرة دائرية (آخر RING_BUFFER_SIZE قياس)، والاستعلامات الأبطأ من الحد
+تكتب مع خطة التنفيذ (EXPLAIN QUERY PLAN) في ملف سجل دوري.
+"""
+import functools
+import inspect
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+ENABLED = os.environ.get("DOCUMENT_MANAGER_INSTRUMENTATION", "1") != "0"
+_sql_tracing = os.environ.get("DOCUMENT_MANAGER_SQL_TRACE", "0") == "1"  # تسجيل جميع الاستعلامات (يغير بـ set_sql_tracing)
+RING_BUFFER_SIZE = 10000  # عدد القياسات المحفوظة في الذاكرة
+SLOW_QUERY_MS = float(os.environ.get("DOCUMENT_MANAGER_SLOW_QUERY_MS", 100))  # حد الاستعلام البطيء
+SLOW_QUERY_LOG = os.environ.get("DOCUMENT_MANAGER_SLOW_QUERY_LOG") or os.path.join(script_dir, "logs", "slow_queries.log")
+SLOW_QUERY_LOG_MAX_BYTES = 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 3
+MAX_SQL_LENGTH = 300  # طول نص الاستعلام في الملخص
+
+KIND_FUNCTION = "function"
+KIND_SQL = "sql"
+
+# القياس: (الوقت، النوع، الاسم، المدة بالثواني، عدد الصفوف أو None)
+_records = deque(maxlen=RING_BUFFER_SIZE)
+_local = threading.local()
+_slow_logger = None
+_slow_logger_lock = threading.Lock()
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_WHITESPACE = re.compile(r"\s+")
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+def normalize_sql(sql):
+    """
+    يحول نص الاستعلام (الذي تمرره SQLite بالقيم الفعلية) إلى شكل عام لتجميع القياسات:
+    القيم تستبدل بـ ? وقوائم IN الطويلة تختصر.
+    """
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _PLACEHOLDER_LIST.sub("?, ...", sql)
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    return sql[:MAX_SQL_LENGTH]
+
+
+def _state():
+    state = getattr(_local, "state", None)
+    if state is None:
+        # depth: عمق الدوال المقاسة المتداخلة، pending: الاستعلام الجاري، slow: استعلامات تنتظر الشرح
+        state = _local.state = {"depth": 0, "pending": None, "slow": [], "explaining": False}
+    return state
+
+
+def record(kind, name, seconds, rows=None):
+    """يضيف قياسًا إلى الذاكرة الدائرية."""
+    _records.append((time.time(), kind, name, seconds, rows))
+
+
+# --- قياس الاستعلامات ---
+def sql_tracing_enabled():
+    return ENABLED and _sql_tracing
+
+
+def set_sql_tracing(enabled):
+    """يشغل تسجيل جميع الاستعلامات في الملخص أو يوقفه (الاستعلامات البطيئة تسجل دائمًا)."""
+    global _sql_tracing
+    _sql_tracing = bool(enabled)
+
+
+def install(conn):
+    """يربط التقاط الاستعلامات باتصال جديد (يستدعى عند إنشاء كل اتصال)."""
+    if not ENABLED:
+        return
+
+    def trace(sql):
+        state = _state()
+        if state["explaining"] or state["depth"] == 0:
+            return  # الاستعلامات خارج الدوال المقاسة (مثل خيط سجل التدقيق) لا تقاس
+        if sql.startswith("--"):
+            return  # استعلامات داخلية ينفذها استعلام جارٍ (المشغلات وجداول FTS5) تحسب ضمنه
+        pending = state["pending"]
+        if pending is not None and pending[2] is conn and pending[0] == sql:
+            # خطوات المشغلات تمرر إلى التتبع بنص الاستعلام الأصلي نفسه (مرة لكل صف ولكل مشغل):
+            # تحسب ضمن الاستعلام الجاري بدلاً من إغلاقه وتطبيع نصه من جديد في كل مرة
+            return
+        _close_pending(state)
+        state["pending"] = (sql, time.perf_counter(), conn, conn.total_changes)
+
+    conn.set_trace_callback(trace)
+
+
+def _close_pending(state):
+    pending = state["pending"]
+    if pending is None:
+        return
+    state["pending"] = None
+    sql, started, conn, changes_before = pending
+    seconds = time.perf_counter() - started
+    slow = seconds * 1000 >= SLOW_QUERY_MS
+    if not (slow or _sql_tracing):
+        return  # الاستعلامات السريعة لا تطبع نصوصها ولا تحفظ إلا عند تشغيل التسجيل الكامل
+    # عدد الصفوف المعدلة لاستعلامات الكتابة؛ استعلامات القراءة لا يعرف عدد صفوفها من التتبع
+    changes = conn.total_changes - changes_before
+    record(KIND_SQL, normalize_sql(sql), seconds, changes or None)
+    if slow:
+        state["slow"].append((sql, seconds, conn))
+
+
+def _log_slow_queries(state):
+    """يكتب الاستعلامات البطيئة مع خطة تنفيذها (بعد انتهاء الدالة، حين لا يكون الاتصال مشغولاً)."""
+    slow, state["slow"] = state["slow"], []
+    state["explaining"] = True
+    try:
+        for sql, seconds, conn in slow:
+            plan = ""
+            if sql.lstrip().upper().startswith(_EXPLAINABLE):
+                try:
+                    plan = "\n".join(
+                        f"    {row[3]}" for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+                    )
+                except Exception as e:
+                    plan = f"    (تعذر الحصول على خطة التنفيذ: {e})"
+            _get_slow_logger().warning("%.1f ms\n%s\n%s", seconds * 1000, sql, plan)
+    finally:
+        state["explaining"] = False
+
+
+def _get_slow_logger():
+    global _slow_logger
+    with _slow_logger_lock:
+        if _slow_logger is None:
+            os.makedirs(os.path.dirname(SLOW_QUERY_LOG), exist_ok=True)
+            handler = RotatingFileHandler(
+                SLOW_QUERY_LOG, maxBytes=SLOW_QUERY_LOG_MAX_BYTES, backupCount=SLOW_QUERY_LOG_BACKUPS, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(asctime)s %(threadName)s %(message)s"))
+            logger = logging.getLogger("document_manager.slow_queries")
+            logger.setLevel(logging.WARNING)
+            logger.propagate = False
+            logger.addHandler(handler)
+            _slow_logger = logger
+        return _slow_logger
+
+
+# --- قياس الدوال ---
+def _count_rows(result):
+    """يقدر عدد الصفوف من نتيجة الدالة: طول القائمة، أو الصفحة الأولى من (rows, cursor)، أو العدد."""
+    if isinstance(result, bool) or result is None:
+        return None
+    if isinstance(result, int):
+        return result
+    if isinstance(result, (list, set, dict)):
+        return len(result)
+    if isinstance(result, tuple) and result:
+        first = result[0]
+        if isinstance(first, list):
+            return len(first)
+        if isinstance(first, int) and not isinstance(first, bool):
+            return first
+        return 1
+    return None
+
+
+def timed(fn, name=None):
+    """يغلف دالة لقياس زمن تنفيذها وعدد الصفوف التي تعيدها، وينسب إليها استعلاماتها."""
+    if not ENABLED:
+        return fn
+    name = name or fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        state = _state()
+        state["depth"] += 1
+        started = time.perf_counter()
+        result = None
+        try:
+            result = fn(*args, **kwargs)
+            return result
+        finally:
+            seconds = time.perf_counter() - started
+            state["depth"] -= 1
+            if state["depth"] == 0:
+                _close_pending(state)
+                if state["slow"]:
+                    _log_slow_queries(state)
+            record(KIND_FUNCTION, name, seconds, _count_rows(result))
+
+    return wrapper
+
+
+def instrument_functions(namespace, module_name, exclude=()):
+    """
+    يستبدل جميع الدوال العامة المعرفة في الوحدة (namespace هو globals() للوحدة) بنسخ مقاسة.
+    المولدات لا تغلف (زمنها يشمل وقت المستهلك)، ولا الدوال المساعدة التي تستدعى لكل صف (exclude).
+    """
+    if not ENABLED:
+        return
+    for name, value in list(namespace.items()):
+        if (name.startswith("_") or name in exclude or not inspect.isfunction(value)
+                or value.__module__ != module_name or inspect.isgeneratorfunction(value)):
+            continue
+        namespace[name] = timed(value)
+
+
+# --- الملخص ---
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summary(kind=None):
+    """
+    يعيد ملخصًا لكل عملية في الذاكرة الدائرية، مرتبًا تنازليًا حسب الوقت الكلي:
+    [(النوع، الاسم، العدد، p50، p95، الأقصى، الوقت الكلي، مجموع الصفوف)] والأزمنة بالمللي ثانية.
+    """
+    grouped = {}
+    for _, record_kind, name, seconds, rows in list(_records):
+        if kind is not None and record_kind != kind:
+            continue
+        durations, total_rows = grouped.setdefault((record_kind, name), ([], [0]))
+        durations.append(seconds * 1000)
+        total_rows[0] += rows or 0
+    result = []
+    for (record_kind, name), (durations, total_rows) in grouped.items():
+        durations.sort()
+        result.append((
+            record_kind, name, len(durations), _percentile(durations, 0.5), _percentile(durations, 0.95),
+            durations[-1], sum(durations), total_rows[0]
+        ))
+    result.sort(key=lambda item: item[6], reverse=True)
+    return result
+
+
+def reset():
+    """يمسح جميع القياسات المحفوظة."""
+    _records.clear()
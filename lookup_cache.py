@@ -0,0 +1,53 @@
+import functools
+import threading
+
+
+class LookupCache:
+    """
+    ذاكرة مؤقتة داخل العملية لقوائم البحث الصغيرة (الفئات، الأقسام، أسماء الموظفين)
+    التي تعرض في القوائم المنسدلة وتعاد قراءتها بعد كل حفظ أو حذف.
+    لكل جدول رقم إصدار تزيده دوال الكتابة (invalidate) بعد تعديل الجدول فعليًا؛
+    والقيمة المحفوظة تستخدم فقط إذا لم يتغير إصدار أي جدول تعتمد عليه منذ حسابها.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._entries = {}  # (اسم الدالة، المعاملات) -> (الإصدارات وقت الحساب، القيمة)
+
+    def version(self, table):
+        with self._lock:
+            return self._versions.get(table, 0)
+
+    def invalidate(self, *tables):
+        """يعلم بأن الجداول تغيرت (يستدعى بعد حفظ التعديل في قاعدة البيانات)."""
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def clear(self):
+        """يحذف جميع القيم المحفوظة (مثلاً عند تغيير ملف قاعدة البيانات)."""
+        with self._lock:
+            self._entries.clear()
+
+    def cached(self, *tables):
+        """
+        مزخرف لدالة قراءة تعتمد على الجداول tables. تعيد نسخة من القائمة المحفوظة
+        حتى لا يؤثر تعديل النتيجة لدى المستدعي على القيمة المحفوظة.
+        """
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args):
+                key = (fn.__name__, args)
+                with self._lock:
+                    # الإصدارات تقرأ قبل الاستعلام: إذا حدثت كتابة أثناءه فلن تستخدم القيمة لاحقًا
+                    versions = tuple(self._versions.get(table, 0) for table in tables)
+                    entry = self._entries.get(key)
+                if entry is not None and entry[0] == versions:
+                    return list(entry[1])
+                value = fn(*args)
+                with self._lock:
+                    self._entries[key] = (versions, value)
+                return list(value)
+            return wrapper
+        return decorator
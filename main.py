@@ -2,41 +2,55 @@ from backend import (
     create_database,
     add_document,
     update_document,
-    delete_document,
+    delete_documents,
     add_employee,
     update_employee,
-    delete_employee,
+    delete_employees,
     fetch_employee_id_name,
-    fetch_all_employees,
-    fetch_audit_log,
     convert_date_from_db_format,
     convert_date_to_db_format,
     add_attachment,
     get_attachments_for_document,
-    delete_attachment,
+    delete_attachments,
+    get_attachment_open_path,
+    get_attachment_thumbnails,
+    get_attachment_storage_stats,
+    migrate_legacy_attachments,
     get_all_categories,
-    calculate_remaining_time,
-    fetch_all_documents_for_export,
+    format_remaining_days,
+    iter_documents_for_export,
     log_audit_event,
     calculate_net_salary,
     add_salary,
     update_salary,
     delete_salary,
-    fetch_all_salaries,
     get_all_departments,
-    fetch_all_salaries_for_export,
+    iter_salaries_for_export,
     get_last_employee_salary, # New import
-    salary_exists_for_month   # New import
+    salary_exists_for_month,  # New import
+    get_paid_employee_ids_for_month,
+    run_monthly_payroll,
+    search_documents_page,
+    query_salaries_page,
+    fetch_employees_page,
+    fetch_audit_log_page,
+    fetch_expiry_page
 )
+from virtual_table import VirtualTable, keyset_fetcher
+from exporter import export_rows
+from task_runner import TaskExecutor
+from bulk_attachment_import import import_folder, format_report
+from thumbnail_cache import THUMBNAIL_SIZE
+from employee_picker import EmployeePicker
+from bulk_import import import_records, format_report as format_import_report
+import instrumentation
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from tkcalendar import DateEntry
-import sqlite3
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
 import subprocess
-import pandas as pd
 
 # إنشاء قاعدة البيانات
 create_database()
@@ -62,6 +76,27 @@ def set_status(message):
     status_bar.config(text=message)
     root.update_idletasks()
 
+def set_busy(busy):
+    """إظهار مؤشر الانتظار أثناء وجود مهام تعمل في الخلفية."""
+    root.config(cursor="watch" if busy else "")
+
+# تنفيذ عمليات قاعدة البيانات والملفات في خيوط عاملة حتى لا تتجمد الواجهة
+task_executor = TaskExecutor(root, on_progress=set_status, on_busy_change=set_busy)
+
+def report_view_loaded(label):
+    """ينشئ دالة تعرض عدد الصفوف المحملة في جدول افتراضي في شريط الحالة."""
+    def on_loaded(view):
+        more = "" if view.end_reached else " (يتم تحميل المزيد عند التمرير)"
+        set_status(f"تم تحميل {view.loaded_count} {label}{more}.")
+    return on_loaded
+
+def report_view_error(message):
+    """ينشئ دالة تعرض أخطاء تحميل جدول افتراضي."""
+    def on_error(error):
+        messagebox.showerror("خطأ", f"{message}: {error}")
+        set_status(f"{message}: {error}")
+    return on_error
+
 # --- نافذة تأكيد مخصصة ---
 class CustomConfirmDialog(tk.Toplevel):
     """نافذة منبثقة مخصصة للتأكيد بدلاً من messagebox."""
@@ -102,34 +137,49 @@ class CustomConfirmDialog(tk.Toplevel):
         self.result = False
         self.destroy()
 
-# --- دالة الفرز العامة للجداول ---
-def treeview_sort_column(tv, col, reverse):
+# --- نافذة تشغيل رواتب الشهر ---
+class PayrollDialog(tk.Toplevel):
     """
-    دالة لفرز بيانات Treeview بناءً على عمود معين.
-    tv: كائن Treeview
-    col: معرف العمود (اسم العمود)
-    reverse: True للفرز التنازلي، False للفرز التصاعدي
+    نافذة منبثقة لاختيار تاريخ صرف رواتب الشهر ونسبة الزيادة (اختيارية) لكل قسم.
+    result: (تاريخ الدفع YYYY-MM-DD، {القسم: نسبة}) أو None عند الإلغاء.
     """
-    l = [(tv.set(k, col), k) for k in tv.get_children('')]
+    def __init__(self, parent, departments):
+        super().__init__(parent)
+        self.title("تشغيل رواتب الشهر")
+        self.transient(parent)
+        self.grab_set()
+        self.result = None
+        self.resizable(False, False)
 
-    try:
-        if col in ["id", "الرقم", "الرقم الوظيفي", "الراتب الأساسي (شهري)", "الراتب الأساسي (سنوي)", "البدلات", "الخصومات", "صافي الراتب"]:
-            # تحويل إلى عدد حقيقي، مع التعامل مع القيم غير الرقمية بوضعها في النهاية
-            l.sort(key=lambda t: float(t[0]) if str(t[0]).replace('.', '', 1).isdigit() else float('inf'), reverse=reverse)
-        elif col in ["تاريخ الإصدار", "تاريخ الانتهاء", "تاريخ التعيين", "الوقت", "تاريخ الدفع"]:
-            # تحويل إلى كائن تاريخ، مع التعامل مع القيم الفارغة بوضعها في البداية/النهاية
-            l.sort(key=lambda t: datetime.strptime(t[0], "%d-%m-%Y") if t[0] and t[0] != "N/A" else (datetime.min if not reverse else datetime.max), reverse=reverse)
-        else:
-            l.sort(key=lambda t: t[0], reverse=reverse)
-    except Exception as e:
-        l.sort(key=lambda t: t[0], reverse=reverse)
-        print(f"Warning: Could not sort column '{col}' numerically/date-wise. Sorting as text. Error: {e}")
+        ttk.Label(self, text="تاريخ الدفع:").grid(row=0, column=0, padx=10, pady=10, sticky="w")
+        self.date_entry = DateEntry(self, width=12, background='darkblue', foreground='white', borderwidth=2,
+                                    date_pattern='dd-mm-yyyy', locale='ar')
+        self.date_entry.grid(row=0, column=1, padx=10, pady=10, sticky="ew")
 
+        adjustments_frame = ttk.LabelFrame(self, text="نسبة الزيادة على الراتب الأساسي لكل قسم (%)")
+        adjustments_frame.grid(row=1, column=0, columnspan=2, padx=10, pady=5, sticky="ew")
+        self.adjustment_vars = {}
+        for row, department in enumerate(departments):
+            ttk.Label(adjustments_frame, text=department).grid(row=row, column=0, padx=5, pady=2, sticky="w")
+            var = tk.StringVar(value="0")
+            ttk.Entry(adjustments_frame, textvariable=var, width=8).grid(row=row, column=1, padx=5, pady=2)
+            self.adjustment_vars[department] = var
+
+        button_frame = ttk.Frame(self)
+        button_frame.grid(row=2, column=0, columnspan=2, pady=10)
+        ttk.Button(button_frame, text="تشغيل", command=self._on_run).pack(side=tk.LEFT, padx=10)
+        ttk.Button(button_frame, text="إلغاء", command=self.destroy).pack(side=tk.RIGHT, padx=10)
 
-    for index, (val, k) in enumerate(l):
-        tv.move(k, '', index)
+        self.wait_window(self)
 
-    tv.heading(col, command=lambda: treeview_sort_column(tv, col, not reverse))
+    def _on_run(self):
+        try:
+            adjustments = {department: float(var.get() or 0) for department, var in self.adjustment_vars.items()}
+        except ValueError:
+            messagebox.showerror("خطأ في الإدخال", "نسب الزيادة يجب أن تكون أرقامًا.", parent=self)
+            return
+        self.result = (self.date_entry.get_date().strftime("%Y-%m-%d"), adjustments)
+        self.destroy()
 
 # --- دالة اللصق لحقول الإدخال ---
 def paste_event_handler(event):
@@ -149,21 +199,8 @@ root.bind_all("<Control-v>", paste_event_handler)
 root.bind_all("<Command-v>", paste_event_handler) # لدعم macOS
 
 # --- دوال مساعدة للمستندات ---
-def get_row_color(expiry_date_str):
-    """تحديد لون الصف بناءً على تاريخ الانتهاء."""
-    try:
-        if not expiry_date_str:
-            return "valid"
-        expiry = datetime.strptime(expiry_date_str, "%Y-%m-%d").date()
-        today = datetime.today().date()
-        if expiry < today:
-            return "expired"
-        elif expiry <= today + timedelta(days=90):
-            return "near"
-        else:
-            return "valid"
-    except:
-        return "valid"
+# خيارات تصفية الصلاحية في الواجهة وما يقابلها في الواجهة الخلفية
+EXPIRY_FILTER_OPTIONS = {"صالحة": "valid", "قرب الانتهاء": "near", "منتهية": "expired"}
 
 def clear_fields():
     """مسح جميع حقول إدخال المستندات."""
@@ -192,6 +229,7 @@ def save_document():
         clear_fields()
         load_documents()
         update_category_filter_options()
+        invalidate_tabs(remaining_time_tab, audit_tab)
         set_status("تم حفظ المستند بنجاح.")
     except ValueError as e:
         messagebox.showerror("خطأ في الإدخال", str(e))
@@ -206,27 +244,25 @@ def populate_form_from_selection():
     if not selected:
         clear_fields()
         return
-    values = doc_table.item(selected[0])['values']
+    doc = doc_view.row(selected[0])
     clear_fields()
     
-    entry_name.insert(0, values[1])
-    entry_number.insert(0, values[2])
+    entry_name.insert(0, doc.name)
+    entry_number.insert(0, doc.number)
     
-    date_ddmmyyyy = convert_date_from_db_format(values[3])
-    entry_date.set_date(datetime.strptime(date_ddmmyyyy, "%d-%m-%Y").date())
+    entry_date.set_date(datetime.strptime(doc.issue_date_display, "%d-%m-%Y").date())
     
-    expiry_ddmmyyyy = convert_date_from_db_format(values[4])
-    if expiry_ddmmyyyy:
-        entry_expiry.set_date(datetime.strptime(expiry_ddmmyyyy, "%d-%m-%Y").date())
+    if doc.expiry_date_display:
+        entry_expiry.set_date(datetime.strptime(doc.expiry_date_display, "%d-%m-%Y").date())
     else:
         entry_expiry.set_date("")
 
-    entry_issuer.insert(0, values[5])
-    entry_category.insert(0, values[6] if values[6] else "")
-    entry_tags.insert(0, values[7] if values[7] else "")
+    entry_issuer.insert(0, doc.type)
+    entry_category.insert(0, doc.category or "")
+    entry_tags.insert(0, doc.notes or "")
 
-    load_attachments(values[0])
-    set_status(f"تم تحديد المستند: {values[1]}.")
+    load_attachments(doc.id)
+    set_status(f"تم تحديد المستند: {doc.name}.")
 
 def update_selected_document():
     """تحديث معلومات المستند المحدد في قاعدة البيانات."""
@@ -256,6 +292,7 @@ def update_selected_document():
         clear_fields()
         load_documents()
         update_category_filter_options()
+        invalidate_tabs(remaining_time_tab, audit_tab)
         set_status("تم تعديل المستند بنجاح.")
     except ValueError as e:
         messagebox.showerror("خطأ في الإدخال", str(e))
@@ -264,71 +301,62 @@ def update_selected_document():
         messagebox.showerror("خطأ", f"حدث خطأ غير متوقع: {e}")
         set_status(f"خطأ: {e}")
 
+def selected_ids(table):
+    """يعيد معرفات جميع الصفوف المحددة في جدول (العمود الأول)."""
+    return [table.item(item)['values'][0] for item in table.selection()]
+
 def delete_selected_document():
-    """حذف المستند المحدد من قاعدة البيانات."""
-    selected = doc_table.selection()
-    if not selected:
+    """حذف المستندات المحددة (يمكن تحديد عدة صفوف) من قاعدة البيانات."""
+    doc_ids = selected_ids(doc_table)
+    if not doc_ids:
         messagebox.showwarning("تحذير", "يرجى تحديد مستند للحذف.")
         return
     
-    dialog = CustomConfirmDialog(root, "تأكيد الحذف", "هل أنت متأكد أنك تريد حذف هذا المستند وكل مرفقاته؟")
+    message = ("هل أنت متأكد أنك تريد حذف هذا المستند وكل مرفقاته؟" if len(doc_ids) == 1
+               else f"هل أنت متأكد أنك تريد حذف {len(doc_ids)} مستندات وكل مرفقاتها؟")
+    dialog = CustomConfirmDialog(root, "تأكيد الحذف", message)
     if dialog.result:
-        doc_id = doc_table.item(selected[0])['values'][0]
-        set_status(f"جاري حذف المستند ID: {doc_id}...")
-        try:
-            delete_document(doc_id)
+        def on_success(deleted):
             load_documents()
             update_category_filter_options()
-            messagebox.showinfo("نجاح", "تم حذف المستند بنجاح.")
+            invalidate_tabs(remaining_time_tab, audit_tab)
             clear_fields()
-            set_status("تم حذف المستند بنجاح.")
-        except Exception as e:
-            messagebox.showerror("خطأ", f"حدث خطأ أثناء حذف المستند: {e}")
+            messagebox.showinfo("نجاح", f"تم حذف {deleted} مستند/ات بنجاح.")
+            set_status(f"تم حذف {deleted} مستند/ات بنجاح.")
+
+        def on_error(e):
+            messagebox.showerror("خطأ", f"حدث خطأ أثناء حذف المستندات: {e}")
             set_status(f"خطأ في الحذف: {e}")
 
+        set_status(f"جاري حذف {len(doc_ids)} مستند/ات...")
+        task_executor.submit("delete-documents", delete_documents, doc_ids, on_success=on_success, on_error=on_error)
+
 def search_documents():
     """البحث عن المستندات وتصفيتها وعرضها في الجدول."""
     keyword = search_var.get()
     filter_status = filter_var.get()
     selected_category = category_filter_var.get()
 
-    doc_table.delete(*doc_table.get_children())
     attachments_table.delete(*attachments_table.get_children())
     set_status("جاري البحث عن المستندات...")
 
     try:
-        with sqlite3.connect("document_management.db") as conn:
-            cursor = conn.cursor()
-            
-            query = """
-                SELECT id, name, number, date, expiry_date, issuer, category, tags
-                FROM documents
-                WHERE (name LIKE ? OR number LIKE ? OR issuer LIKE ? OR category LIKE ? OR tags LIKE ?)
-            """
-            params = (f"%{keyword}%", f"%{keyword}%", f"%{keyword}%", f"%{keyword}%", f"%{keyword}%")
-
-            if selected_category != "الكل":
-                query += " AND category = ?"
-                params += (selected_category,)
-
-            cursor.execute(query, params)
-
-            results_count = 0
-            for row in cursor.fetchall():
-                color = get_row_color(row[4])
-                if filter_status == "الكل" or \
-                   (filter_status == "صالحة" and color == "valid") or \
-                   (filter_status == "قرب الانتهاء" and color == "near") or \
-                   (filter_status == "منتهية" and color == "expired"):
-                    doc_table.insert("", "end", values=row, tags=(color,))
-                    results_count += 1
-
-            set_status(f"تم العثور على {results_count} مستند/ات.")
+        # البحث عبر فهرس النص الكامل، وجلب النتائج على صفحات أثناء التمرير
+        category = selected_category if selected_category != "الكل" else None
+
+        # تصفية الصلاحية تتم داخل SQL كنطاق على تاريخ الانتهاء
+        status = EXPIRY_FILTER_OPTIONS.get(filter_status)
+        doc_view.reset(keyset_fetcher(search_documents_page, keyword=keyword, category=category, status=status))
 
     except Exception as e:
         messagebox.showerror("خطأ في البحث", f"حدث خطأ أثناء البحث عن المستندات: {e}")
         set_status(f"خطأ في البحث: {e}")
 
+def document_row_to_item(doc):
+    """تحويل سجل مستند إلى قيم وعلامة لون لعنصر الجدول (الحالة محسوبة في الاستعلام)."""
+    return (doc.id, doc.name, doc.number, doc.issue_date, doc.expiry_date, doc.type, doc.category, doc.notes), \
+        (doc.expiry_status,)
+
 def load_documents():
     """تحميل جميع المستندات أو المستندات بناءً على البحث/التصفية."""
     search_documents()
@@ -339,16 +367,38 @@ def update_category_filter_options():
     category_filter_menu['values'] = ["الكل"] + categories
 
 # --- دوال إدارة المرفقات في الواجهة ---
+attachment_thumbnails = {}  # معرف المرفق -> PhotoImage (يجب الاحتفاظ بمرجع حتى لا تحذف الصورة)
+
 def load_attachments(document_id):
-    """تحميل وعرض المرفقات لمستند معين."""
+    """تحميل وعرض المرفقات لمستند معين، ثم عرض الصور المصغرة عند تجهيزها في الخلفية."""
     attachments_table.delete(*attachments_table.get_children())
+    attachment_thumbnails.clear()
     try:
         attachments = get_attachments_for_document(document_id)
         for att in attachments:
-            attachments_table.insert("", "end", values=att)
+            attachments_table.insert("", "end", iid=str(att.id), values=(att.id, att.file_name, att.path, att.upload_date))
     except Exception as e:
         messagebox.showerror("خطأ", f"فشل تحميل المرفقات: {e}")
         set_status(f"خطأ في تحميل المرفقات: {e}")
+        return
+    if attachments:
+        task_executor.submit(
+            "attachment-thumbnails", get_attachment_thumbnails, [att.id for att in attachments],
+            on_success=show_attachment_thumbnails, on_error=lambda e: set_status(f"تعذر إنشاء الصور المصغرة: {e}")
+        )
+
+def show_attachment_thumbnails(thumbnails):
+    """عرض الصور المصغرة (المنشأة في خيط عامل) في عمود الشجرة بجدول المرفقات."""
+    for attachment_id, path in thumbnails.items():
+        item = str(attachment_id)
+        if not attachments_table.exists(item):
+            continue  # تم تغيير المستند المحدد أثناء التجهيز
+        try:
+            image = tk.PhotoImage(file=path)
+        except tk.TclError:
+            continue
+        attachment_thumbnails[attachment_id] = image
+        attachments_table.item(item, image=image)
 
 def add_attachment_to_selected():
     """إرفاق ملف بالمستند المحدد."""
@@ -363,16 +413,33 @@ def add_attachment_to_selected():
         filetypes=(("جميع الملفات", "*.*"), ("ملفات PDF", "*.pdf"), ("مستندات Word", "*.doc *.docx"), ("صور", "*.png *.jpg *.jpeg"))
     )
     if file_path:
-        set_status(f"جاري إرفاق الملف: {os.path.basename(file_path)}...")
-        try:
-            add_attachment(doc_id, file_path)
+        file_name = os.path.basename(file_path)
+
+        def on_success(added):
+            if not added:
+                on_error("تعذر حفظ المرفق")
+                return
             load_attachments(doc_id)
             messagebox.showinfo("نجاح", "تم إرفاق الملف بنجاح.")
             set_status("تم إرفاق الملف بنجاح.")
-        except Exception as e:
+
+        def on_error(e):
             messagebox.showerror("خطأ", f"فشل إرفاق الملف: {e}")
             set_status(f"فشل إرفاق الملف: {e}")
 
+        # نسخ الملف يتم في خيط عامل حتى لا تتجمد الواجهة مع الملفات الكبيرة
+        set_status(f"جاري إرفاق الملف: {file_name}...")
+        task_executor.submit(None, add_attachment, doc_id, file_path, file_name, on_success=on_success, on_error=on_error)
+
+def open_file_with_system(filepath):
+    """فتح ملف بالبرنامج الافتراضي في نظام التشغيل."""
+    if os.name == 'nt':
+        os.startfile(filepath)
+    elif os.uname().sysname == 'Darwin':
+        subprocess.call(('open', filepath))
+    else:
+        subprocess.call(('xdg-open', filepath))
+
 def open_selected_attachment():
     """فتح المرفق المحدد."""
     selected = attachments_table.selection()
@@ -380,55 +447,114 @@ def open_selected_attachment():
         messagebox.showwarning("تحذير", "يرجى تحديد مرفق لفتحه.")
         return
     
-    values = attachments_table.item(selected[0])['values']
-    filepath = values[2]
+    attachment_id = attachments_table.item(selected[0])['values'][0]
 
-    if os.path.exists(filepath):
+    def on_success(filepath):
+        if not filepath:
+            messagebox.showerror("خطأ", "الملف غير موجود في المسار المحدد.")
+            set_status("الملف غير موجود.")
+            return
         try:
-            if os.name == 'nt':
-                os.startfile(filepath)
-            elif os.uname().sysname == 'Darwin':
-                subprocess.call(('open', filepath))
-            else:
-                subprocess.call(('xdg-open', filepath))
+            open_file_with_system(filepath)
             set_status(f"تم فتح الملف: {os.path.basename(filepath)}.")
         except Exception as e:
-            messagebox.showerror("خطأ", f"فشل فتح الملف: {e}")
-            set_status(f"فشل فتح الملف: {e}")
-    else:
-        messagebox.showerror("خطأ", "الملف غير موجود في المسار المحدد.")
-        set_status("الملف غير موجود.")
+            on_error(e)
+
+    def on_error(e):
+        messagebox.showerror("خطأ", f"فشل فتح الملف: {e}")
+        set_status(f"فشل فتح الملف: {e}")
+
+    # نسخ الملف من مخزن المرفقات باسمه الأصلي يتم في خيط عامل
+    set_status("جاري تجهيز المرفق للفتح...")
+    task_executor.submit("open-attachment", get_attachment_open_path, attachment_id, on_success=on_success, on_error=on_error)
+
+def import_attachments_folder():
+    """استيراد مجلد كامل من المرفقات، حيث تبدأ أسماء الملفات برقم المستند (مثل A123_passport.pdf)."""
+    folder = filedialog.askdirectory(title="اختر مجلد المرفقات (بادئة اسم الملف = رقم المستند)")
+    if not folder:
+        return
+
+    def run_import(task):
+        # من الواجهة تستخدم الخيوط بدلاً من العمليات (العمليات الجديدة تعيد تشغيل main.py في Windows)
+        return import_folder(
+            folder, use_processes=False,
+            progress_callback=lambda done, total, size: task.report_progress(
+                f"جاري استيراد المرفقات... {done}/{total} ({size / (1024 * 1024):.1f} ميجابايت)"),
+            should_cancel=lambda: task.cancelled
+        )
+
+    def on_success(report):
+        selected = doc_table.selection()
+        if selected:
+            load_attachments(doc_table.item(selected[0])['values'][0])
+        invalidate_tabs(audit_tab)
+        messagebox.showinfo("استيراد المرفقات", format_report(report))
+        set_status(f"تم استيراد {report['inserted']} مرفق/ات.")
+
+    def on_error(e):
+        messagebox.showerror("خطأ", f"فشل استيراد المرفقات: {e}")
+        set_status(f"فشل استيراد المرفقات: {e}")
+
+    set_status("جاري استيراد المرفقات...")
+    task_executor.submit("import-attachments", run_import, pass_task=True, on_success=on_success, on_error=on_error)
+
+def format_bytes(size):
+    """تنسيق حجم بالبايت إلى وحدة مقروءة."""
+    for unit in ("بايت", "كيلوبايت", "ميجابايت"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} جيجابايت"
+
+def show_attachment_storage_stats():
+    """عرض المساحة التي يوفرها مخزن المرفقات (إزالة التكرار والضغط)."""
+    def on_success(stats):
+        messagebox.showinfo("مساحة تخزين المرفقات", "\n".join([
+            f"حجم جميع المرفقات: {format_bytes(stats['attachments_bytes'])}",
+            f"الملفات الفريدة: {stats['unique_files']} ({format_bytes(stats['unique_bytes'])})",
+            f"الحجم الفعلي على القرص: {format_bytes(stats['stored_bytes'])}",
+            f"التوفير من إزالة التكرار: {format_bytes(stats['dedup_saved'])}",
+            f"التوفير من الضغط: {format_bytes(stats['compression_saved'])}",
+        ]))
+
+    task_executor.submit(
+        "attachment-stats", get_attachment_storage_stats, on_success=on_success,
+        on_error=lambda e: messagebox.showerror("خطأ", f"تعذر حساب إحصائيات التخزين: {e}")
+    )
+
+def delete_attachments_and_reload(attachment_ids, success_message):
+    """حذف مرفقات في خيط عامل ثم إعادة تحميل مرفقات المستند المحدد."""
+    selected_doc_item = doc_table.selection()
+    doc_id = doc_table.item(selected_doc_item[0])['values'][0] if selected_doc_item else None
+
+    def on_success(deleted):
+        if doc_id:
+            load_attachments(doc_id)
+        else:
+            attachments_table.delete(*attachments_table.get_children())
+        invalidate_tabs(audit_tab)
+        messagebox.showinfo("نجاح", success_message.format(count=deleted))
+        set_status(success_message.format(count=deleted))
+
+    def on_error(e):
+        messagebox.showerror("خطأ", f"فشل حذف المرفقات: {e}")
+        set_status(f"فشل حذف المرفقات: {e}")
+
+    set_status(f"جاري حذف {len(attachment_ids)} مرفق/ات...")
+    task_executor.submit("delete-attachments", delete_attachments, attachment_ids, on_success=on_success, on_error=on_error)
 
 def delete_selected_attachment():
-    """حذف المرفق المحدد."""
-    selected = attachments_table.selection()
-    if not selected:
+    """حذف المرفقات المحددة (يمكن تحديد عدة صفوف)."""
+    attachment_ids = selected_ids(attachments_table)
+    if not attachment_ids:
         messagebox.showwarning("تحذير", "يرجى تحديد مرفق لحذفه.")
         return
     
-    dialog = CustomConfirmDialog(root, "تأكيد الحذف", "هل أنت متأكد أنك تريد حذف هذا المرفق؟")
+    message = ("هل أنت متأكد أنك تريد حذف هذا المرفق؟" if len(attachment_ids) == 1
+               else f"هل أنت متأكد أنك تريد حذف {len(attachment_ids)} مرفقات؟")
+    dialog = CustomConfirmDialog(root, "تأكيد الحذف", message)
     if dialog.result:
-        values = attachments_table.item(selected[0])['values']
-        attachment_id = values[0]
-        filepath = values[2]
-        selected_doc_item = doc_table.selection()
-        if selected_doc_item:
-            doc_id = doc_table.item(selected_doc_item[0])['values'][0]
-        else:
-            doc_id = None
-
-        set_status(f"جاري حذف المرفق: {values[1]}...")
-        try:
-            delete_attachment(attachment_id, filepath)
-            if doc_id:
-                load_attachments(doc_id)
-            else:
-                attachments_table.delete(*attachments_table.get_children())
-            messagebox.showinfo("نجاح", "تم حذف المرفق بنجاح.")
-            set_status("تم حذف المرفق بنجاح.")
-        except Exception as e:
-            messagebox.showerror("خطأ", f"فشل حذف المرفق: {e}")
-            set_status(f"فشل حذف المرفق: {e}")
+        delete_attachments_and_reload(attachment_ids, "تم حذف {count} مرفق/ات بنجاح.")
 
 def delete_all_attachments_for_document():
     """حذف جميع المرفقات للمستند المحدد."""
@@ -437,31 +563,17 @@ def delete_all_attachments_for_document():
         messagebox.showwarning("تحذير", "يرجى تحديد مستند أولاً لحذف مرفقاته.")
         return
     
-    doc_id = doc_table.item(selected_doc_item[0])['values'][0]
     doc_name = doc_table.item(selected_doc_item[0])['values'][1]
+    attachment_ids = [int(item) for item in attachments_table.get_children()]
+    if not attachment_ids:
+        messagebox.showinfo("معلومات", "لا توجد مرفقات لحذفها لهذا المستند.")
+        set_status("لا توجد مرفقات لحذفها.")
+        return
 
     dialog = CustomConfirmDialog(root, "تأكيد الحذف", f"هل أنت متأكد أنك تريد حذف جميع المرفقات للمستند: {doc_name}؟")
     if dialog.result:
-        set_status(f"جاري حذف جميع المرفقات للمستند ID: {doc_id}...")
-        try:
-            attachments = get_attachments_for_document(doc_id)
-            if not attachments:
-                messagebox.showinfo("معلومات", "لا توجد مرفقات لحذفها لهذا المستند.")
-                set_status("لا توجد مرفقات لحذفها.")
-                return
-
-            for att_id, att_filename, att_filepath, _ in attachments:
-                delete_attachment(att_id, att_filepath)
-            
-            load_attachments(doc_id)
-            messagebox.showinfo("نجاح", f"تم حذف جميع المرفقات للمستند: {doc_name} بنجاح.")
-            log_audit_event("حذف جميع المرفقات", f"تم حذف جميع المرفقات للمستند ID: {doc_id} ({doc_name})")
-            set_status("تم حذف جميع المرفقات بنجاح.")
-        except Exception as e:
-            messagebox.showerror("خطأ", f"فشل حذف جميع المرفقات: {e}")
-            set_status(f"فشل حذف جميع المرفقات: {e}")
+        delete_attachments_and_reload(attachment_ids, f"تم حذف جميع المرفقات ({{count}}) للمستند: {doc_name} بنجاح.")
 
-# --- دوال الموظفين ---
 def clear_employee_fields():
     """مسح جميع حقول إدخال الموظف."""
     for entry in emp_entries:
@@ -473,18 +585,17 @@ def clear_employee_fields():
 
 def load_employees():
     """تحميل وعرض بيانات الموظفين في الجدول."""
-    emp_table.delete(*emp_table.get_children())
     set_status("جاري تحميل بيانات الموظفين...")
     try:
-        employees = fetch_all_employees()
-        for emp in employees:
-            formatted_hire_date = convert_date_from_db_format(emp[5])
-            emp_table.insert("", "end", values=(emp[0], emp[1], emp[2], emp[3], emp[4], formatted_hire_date))
-        set_status(f"تم تحميل {len(employees)} موظف/موظفين.")
+        emp_view.reset()
     except Exception as e:
         messagebox.showerror("خطأ", f"حدث خطأ أثناء تحميل بيانات الموظفين: {e}")
         set_status(f"خطأ في تحميل الموظفين: {e}")
 
+def employee_row_to_item(emp):
+    """تحويل سجل موظف إلى قيم عنصر الجدول مع تنسيق تاريخ التعيين."""
+    return (emp.id, emp.name, emp.position, emp.department, emp.phone, emp.start_date_display), ()
+
 def save_employee():
     """حفظ بيانات موظف جديد في قاعدة البيانات."""
     set_status("جاري حفظ بيانات الموظف...")
@@ -499,6 +610,7 @@ def save_employee():
         messagebox.showinfo("نجاح", "تمت إضافة الموظف بنجاح.")
         clear_employee_fields()
         load_employees()
+        invalidate_tabs(salaries_tab, audit_tab)
         set_status("تم حفظ الموظف بنجاح.")
     except ValueError as e:
         messagebox.showerror("خطأ في الإدخال", str(e))
@@ -513,20 +625,19 @@ def populate_employee_form_from_selection():
     if not selected:
         clear_employee_fields()
         return
-    values = emp_table.item(selected[0])['values']
+    emp = emp_view.row(selected[0])
     clear_employee_fields()
 
-    emp_entry_name.insert(0, values[1])
-    emp_entry_number.insert(0, values[2])
-    emp_entry_department.insert(0, values[3])
-    emp_entry_contact.insert(0, values[4])
+    emp_entry_name.insert(0, emp.name)
+    emp_entry_number.insert(0, emp.position or "")
+    emp_entry_department.insert(0, emp.department or "")
+    emp_entry_contact.insert(0, emp.phone or "")
     
-    hire_date_ddmmyyyy = values[5]
-    if hire_date_ddmmyyyy:
-        emp_entry_hire_date.set_date(datetime.strptime(hire_date_ddmmyyyy, "%d-%m-%Y").date())
+    if emp.start_date_display:
+        emp_entry_hire_date.set_date(datetime.strptime(emp.start_date_display, "%d-%m-%Y").date())
     else:
         emp_entry_hire_date.set_date("")
-    set_status(f"تم تحديد الموظف: {values[1]}.")
+    set_status(f"تم تحديد الموظف: {emp.name}.")
 
 def update_selected_employee():
     """تحديث بيانات الموظف المحدد في قاعدة البيانات."""
@@ -548,6 +659,7 @@ def update_selected_employee():
         messagebox.showinfo("نجاح", "تم تعديل بيانات الموظف بنجاح.")
         clear_employee_fields()
         load_employees()
+        invalidate_tabs(salaries_tab, audit_tab)
         set_status("تم تعديل الموظف بنجاح.")
     except ValueError as e:
         messagebox.showerror("خطأ في الإدخال", str(e))
@@ -557,104 +669,152 @@ def update_selected_employee():
         set_status(f"خطأ: {e}")
 
 def delete_selected_employee():
-    """حذف الموظف المحدد من قاعدة البيانات."""
-    selected = emp_table.selection()
-    if not selected:
+    """حذف الموظفين المحددين (يمكن تحديد عدة صفوف) من قاعدة البيانات."""
+    emp_ids = selected_ids(emp_table)
+    if not emp_ids:
         messagebox.showwarning("تحذير", "يرجى تحديد موظف للحذف.")
         return
     
-    dialog = CustomConfirmDialog(root, "تأكيد الحذف", "هل أنت متأكد أنك تريد حذف هذا الموظف؟\n(ملاحظة: سيتم إزالة ربط هذا الموظف بأي مستندات.)")
+    message = ("هل أنت متأكد أنك تريد حذف هذا الموظف؟" if len(emp_ids) == 1
+               else f"هل أنت متأكد أنك تريد حذف {len(emp_ids)} موظفين؟")
+    dialog = CustomConfirmDialog(root, "تأكيد الحذف", message + "\n(ملاحظة: سيتم حذف رواتبهم وإزالة ربطهم بأي مستندات.)")
     if dialog.result:
-        emp_id = emp_table.item(selected[0])['values'][0]
-        set_status(f"جاري حذف الموظف ID: {emp_id}...")
-        try:
-            delete_employee(emp_id)
+        def on_success(deleted):
             load_employees()
-            messagebox.showinfo("نجاح", "تم حذف الموظف بنجاح.")
+            invalidate_tabs(salaries_tab, audit_tab)
             clear_employee_fields()
-            set_status("تم حذف الموظف بنجاح.")
-        except Exception as e:
-            messagebox.showerror("خطأ", f"حدث خطأ أثناء حذف الموظف: {e}")
+            messagebox.showinfo("نجاح", f"تم حذف {deleted} موظف/ين بنجاح.")
+            set_status(f"تم حذف {deleted} موظف/ين بنجاح.")
+
+        def on_error(e):
+            messagebox.showerror("خطأ", f"حدث خطأ أثناء حذف الموظفين: {e}")
             set_status(f"خطأ في الحذف: {e}")
 
+        set_status(f"جاري حذف {len(emp_ids)} موظف/ين...")
+        task_executor.submit("delete-employees", delete_employees, emp_ids, on_success=on_success, on_error=on_error)
+
 # --- دوال سجل التدقيق ---
 def load_audit_log():
     """تحميل وعرض سجل التدقيق في الجدول."""
-    audit_table.delete(*audit_table.get_children())
     set_status("جاري تحميل سجل التدقيق...")
     try:
-        logs = fetch_audit_log()
-        for log in logs:
-            audit_table.insert("", "end", values=log)
-        set_status(f"تم تحميل {len(logs)} سجل/سجلات تدقيق.")
+        audit_view.reset()
     except Exception as e:
         messagebox.showerror("خطأ", f"حدث خطأ أثناء تحميل سجل التدقيق: {e}")
         set_status(f"خطأ في تحميل سجل التدقيق: {e}")
 
+def audit_row_to_item(event):
+    """تحويل سجل حدث تدقيق إلى قيم عنصر الجدول."""
+    return (event.id, event.timestamp, event.action, event.details), ()
+
 # --- دوال المدة المتبقية ---
 def load_remaining_time_documents():
     """تحميل وعرض معلومات المدة المتبقية للمستندات في الجدول."""
-    remaining_time_table.delete(*remaining_time_table.get_children())
     set_status("جاري تحميل معلومات المدة المتبقية للمستندات...")
     try:
-        with sqlite3.connect("document_management.db") as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, name, number, expiry_date FROM documents WHERE expiry_date IS NOT NULL")
-            
-            for row in cursor.fetchall():
-                doc_id, name, number, expiry_date_db = row
-                
-                remaining_time_str = calculate_remaining_time(expiry_date_db)
-                
-                display_expiry_date = convert_date_from_db_format(expiry_date_db)
-
-                remaining_time_table.insert("", "end", values=(doc_id, name, number, display_expiry_date, remaining_time_str))
-            
-            set_status(f"تم تحميل معلومات المدة المتبقية لـ {len(remaining_time_table.get_children())} مستند/ات.")
+        remaining_time_view.reset()
     except Exception as e:
         messagebox.showerror("خطأ", f"حدث خطأ أثناء تحميل المدة المتبقية للمستندات: {e}")
         set_status(f"خطأ في تحميل المدة المتبقية: {e}")
 
+def remaining_time_row_to_item(doc):
+    """تحويل سجل مستند (عدد الأيام محسوب في الاستعلام) إلى قيم عنصر الجدول."""
+    return (doc.id, doc.name, doc.number, doc.expiry_date_display, format_remaining_days(doc.days_remaining)), ()
+
 # --- دالة التصدير للمستندات ---
+EXPORT_FILETYPES = [
+    ("Excel files", "*.xlsx"),
+    ("CSV files", "*.csv"),
+    ("Compressed CSV files", "*.csv.gz"),
+    ("All files", "*.*"),
+]
+
+DOCUMENT_EXPORT_HEADERS = [
+    "الاسم", "الرقم", "النوع", "الفئة", "تاريخ الإصدار", "تاريخ الانتهاء", "الحالة", "الموظف", "ملاحظات"
+]
+
 def export_documents_to_excel():
-    """تصدير جميع بيانات المستندات إلى ملف Excel."""
+    """تصدير جميع بيانات المستندات إلى ملف Excel أو CSV."""
     filepath = filedialog.asksaveasfilename(
         defaultextension=".xlsx",
-        filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")],
+        filetypes=EXPORT_FILETYPES,
         title="حفظ المستندات كملف Excel"
     )
     if not filepath:
         set_status("تم إلغاء عملية التصدير.")
         return
 
-    set_status("جاري تصدير المستندات إلى Excel...")
-    try:
-        documents_data = fetch_all_documents_for_export()
-        
-        formatted_documents_data = []
-        for doc in documents_data:
-            doc_list = list(doc)
-            if doc_list[4]:
-                doc_list[4] = convert_date_from_db_format(doc_list[4])
-            formatted_documents_data.append(doc_list)
-
-        df = pd.DataFrame(formatted_documents_data, columns=[
-            "ID", "الاسم", "الرقم", "تاريخ الإصدار", "تاريخ الانتهاء", "الجهة المصدرة", "الفئة", "العلامات"
-        ])
-        df.to_excel(filepath, index=False)
-        messagebox.showinfo("نجاح", f"تم تصدير المستندات بنجاح إلى:\n{filepath}")
-        log_audit_event("تصدير بيانات", f"تم تصدير جميع المستندات إلى ملف Excel: {filepath}")
+    def run_export(task):
+        # كتابة الصفوف أثناء قراءتها من قاعدة البيانات (ذاكرة ثابتة) في خيط عامل
+        return export_rows(
+            iter_documents_for_export(), DOCUMENT_EXPORT_HEADERS, filepath,
+            progress_callback=lambda n: task.report_progress(f"جاري تصدير المستندات... ({n} صف)"),
+            sheet_title="المستندات"
+        )
+
+    def on_success(count):
+        messagebox.showinfo("نجاح", f"تم تصدير {count} مستند/ات بنجاح إلى:\n{filepath}")
+        log_audit_event("تصدير بيانات", f"تم تصدير جميع المستندات إلى ملف: {filepath}")
         set_status(f"تم تصدير المستندات بنجاح إلى: {filepath}")
-    except Exception as e:
+
+    def on_error(e):
         messagebox.showerror("خطأ في التصدير", f"حدث خطأ أثناء تصدير المستندات: {e}")
         set_status(f"خطأ في التصدير: {e}")
 
+    set_status("جاري تصدير المستندات...")
+    task_executor.submit("export-documents", run_export, pass_task=True, on_success=on_success, on_error=on_error)
+
+# --- الاستيراد الجماعي من Excel/CSV ---
+IMPORT_FILETYPES = [
+    ("Excel / CSV", "*.xlsx *.csv *.csv.gz"),
+    ("Excel files", "*.xlsx"),
+    ("CSV files", "*.csv *.csv.gz"),
+]
+
+def import_records_from_file(kind, label, on_done):
+    """استيراد سجلات (employees أو documents) من ملف Excel أو CSV في خيط عامل."""
+    filepath = filedialog.askopenfilename(title=f"اختر ملف {label} للاستيراد", filetypes=IMPORT_FILETYPES)
+    if not filepath:
+        return
+
+    def run_import(task):
+        return import_records(
+            kind, filepath,
+            progress_callback=lambda n: task.report_progress(f"جاري استيراد {label}... ({n} صف)")
+        )
+
+    def on_success(report):
+        on_done()
+        invalidate_tabs(audit_tab)
+        messagebox.showinfo("نتيجة الاستيراد", format_import_report(report))
+        set_status(f"تم استيراد {report['inserted']} من {report['read']} صف/صفوف.")
+
+    def on_error(e):
+        messagebox.showerror("خطأ في الاستيراد", f"حدث خطأ أثناء استيراد {label}: {e}")
+        set_status(f"خطأ في الاستيراد: {e}")
+
+    set_status(f"جاري استيراد {label}...")
+    task_executor.submit(f"import-{kind}", run_import, pass_task=True, on_success=on_success, on_error=on_error)
+
+def import_documents_from_file():
+    """استيراد مستندات من ملف Excel أو CSV."""
+    def on_done():
+        load_documents()
+        update_category_filter_options()
+        invalidate_tabs(remaining_time_tab)
+    import_records_from_file("documents", "المستندات", on_done)
+
+def import_employees_from_file():
+    """استيراد موظفين من ملف Excel أو CSV."""
+    def on_done():
+        load_employees()
+        invalidate_tabs(salaries_tab)
+    import_records_from_file("employees", "الموظفين", on_done)
+
 # --- دوال الرواتب ---
 def update_employee_salary_options():
     """تحديث خيارات الموظفين في قائمة الرواتب المنسدلة."""
-    employees = fetch_employee_id_name()
-    employee_options = [f"{emp[1]} (ID: {emp[0]})" for emp in employees]
-    emp_id_salary_combobox['values'] = employee_options
+    emp_id_salary_combobox.set_employees(fetch_employee_id_name())
 
 def update_department_salary_filter_options():
     """تحديث خيارات تصفية الأقسام في قائمة الرواتب المنسدلة."""
@@ -702,7 +862,7 @@ def update_salary_display_fields(event=None):
 
 def clear_salary_fields():
     """مسح جميع حقول إدخال الرواتب."""
-    emp_id_salary_combobox.set("")
+    emp_id_salary_combobox.clear()
     monthly_basic_salary_var.set("")
     annual_basic_salary_var.set("")
     entry_allowances.delete(0, tk.END)
@@ -716,23 +876,33 @@ def save_salary():
     """حفظ سجل راتب جديد."""
     set_status("جاري حفظ الراتب...")
     try:
-        selected_emp_str = emp_id_salary_combobox.get()
-        if not selected_emp_str:
-            messagebox.showwarning("تحذير", "يرجى تحديد موظف.")
+        selected_employee = emp_id_salary_combobox.get_selected()
+        if selected_employee is None:
+            messagebox.showwarning("تحذير", "يرجى تحديد موظف من القائمة.")
             return
-        emp_id = int(selected_emp_str.split('(ID: ')[1][:-1])
+        emp_id = selected_employee[0]
 
         # نأخذ الراتب الشهري من الحقل المخصص له
         basic_salary_monthly = float(monthly_basic_salary_var.get() or 0)
         allowances = float(entry_allowances.get() or 0)
         deductions = float(entry_deductions.get() or 0)
         payment_method = payment_method_var.get()
-        payment_date = entry_payment_date.get_date().strftime("%d-%m-%Y")
+        payment_date = entry_payment_date.get_date()
+
+        # تحذير إذا كان راتب هذا الشهر قد صرف للموظف مسبقًا
+        if emp_id in get_paid_employee_ids_for_month(payment_date.year, payment_date.month):
+            dialog = CustomConfirmDialog(root, "راتب مكرر", "تم صرف راتب لهذا الموظف في هذا الشهر مسبقًا. هل تريد إضافة راتب آخر؟")
+            if not dialog.result:
+                set_status("تم إلغاء حفظ الراتب.")
+                return
 
-        add_salary(emp_id, basic_salary_monthly, allowances, deductions, payment_method, payment_date)
+        net_salary = calculate_net_salary(basic_salary_monthly, allowances, deductions)
+        add_salary(emp_id, basic_salary_monthly, allowances, deductions, net_salary, payment_method,
+                   payment_date.strftime("%Y-%m-%d"))
         messagebox.showinfo("نجاح", "تم حفظ الراتب بنجاح.")
         clear_salary_fields()
         load_salaries()
+        invalidate_tabs(audit_tab)
         set_status("تم حفظ الراتب بنجاح.")
     except ValueError as e:
         messagebox.showerror("خطأ في الإدخال", str(e))
@@ -747,31 +917,19 @@ def populate_salary_form_from_selection():
     if not selected:
         clear_salary_fields()
         return
-    values = salary_table.item(selected[0])['values']
-    # القيم هي: id, employee_name, department, basic_salary_monthly, basic_salary_annual, allowances, deductions, net_salary, payment_method, payment_date, employee_id
-    salary_id = values[0]
-    employee_name = values[1]
-    department = values[2] # القيمة الجديدة
-    monthly_basic_salary = values[3]
-    annual_basic_salary = values[4]
-    allowances = values[5]
-    deductions = values[6]
-    net_salary = values[7]
-    payment_method = values[8]
-    payment_date_ddmmyyyy = values[9] # تاريخ الدفع هو الآن العنصر العاشر (الفهرس 9)
-    employee_id_from_db = values[10] # employee_id هو الآن العنصر الحادي عشر (الفهرس 10)
+    salary = salary_view.row(selected[0])
 
     clear_salary_fields()
-    emp_id_salary_combobox.set(f"{employee_name} (ID: {employee_id_from_db})")
-    monthly_basic_salary_var.set(str(monthly_basic_salary))
-    annual_basic_salary_var.set(str(annual_basic_salary))
-    entry_allowances.insert(0, str(allowances))
-    entry_deductions.insert(0, str(deductions))
-    label_net_salary_value.config(text=f"{net_salary:.2f}")
-    payment_method_var.set(payment_method)
-    entry_payment_date.set_date(datetime.strptime(payment_date_ddmmyyyy, "%d-%m-%Y").date())
-    salary_table.current_salary_id = salary_id
-    set_status(f"تم تحديد سجل الراتب للموظف: {employee_name}.")
+    emp_id_salary_combobox.set_selected(salary.employee_id, salary.employee_name)
+    monthly_basic_salary_var.set(f"{salary.basic_salary:.2f}")
+    annual_basic_salary_var.set(f"{salary.annual_basic_salary:.2f}")
+    entry_allowances.insert(0, f"{salary.allowances or 0:.2f}")
+    entry_deductions.insert(0, f"{salary.deductions or 0:.2f}")
+    label_net_salary_value.config(text=f"{salary.net_salary:.2f}")
+    payment_method_var.set(salary.payment_method)
+    entry_payment_date.set_date(datetime.strptime(salary.payment_date, "%Y-%m-%d").date())
+    salary_table.current_salary_id = salary.id
+    set_status(f"تم تحديد سجل الراتب للموظف: {salary.employee_name}.")
 
 def update_selected_salary():
     """تحديث سجل الراتب المحدد."""
@@ -787,22 +945,24 @@ def update_selected_salary():
 
     set_status("جاري تعديل سجل الراتب...")
     try:
-        selected_emp_str = emp_id_salary_combobox.get()
-        if not selected_emp_str:
-            messagebox.showwarning("تحذير", "يرجى تحديد موظف.")
+        selected_employee = emp_id_salary_combobox.get_selected()
+        if selected_employee is None:
+            messagebox.showwarning("تحذير", "يرجى تحديد موظف من القائمة.")
             return
-        emp_id = int(selected_emp_str.split('(ID: ')[1][:-1])
+        emp_id = selected_employee[0]
         
         basic_salary_monthly = float(monthly_basic_salary_var.get() or 0)
         allowances = float(entry_allowances.get() or 0)
         deductions = float(entry_deductions.get() or 0)
         payment_method = payment_method_var.get()
-        payment_date = entry_payment_date.get_date().strftime("%d-%m-%Y")
+        payment_date = entry_payment_date.get_date().strftime("%Y-%m-%d")
+        net_salary = calculate_net_salary(basic_salary_monthly, allowances, deductions)
 
-        update_salary(salary_id, emp_id, basic_salary_monthly, allowances, deductions, payment_method, payment_date)
+        update_salary(salary_id, emp_id, basic_salary_monthly, allowances, deductions, net_salary, payment_method, payment_date)
         messagebox.showinfo("نجاح", "تم تعديل سجل الراتب بنجاح.")
         clear_salary_fields()
         load_salaries()
+        invalidate_tabs(audit_tab)
         set_status("تم تعديل سجل الراتب بنجاح.")
     except ValueError as e:
         messagebox.showerror("خطأ في الإدخال", str(e))
@@ -825,6 +985,7 @@ def delete_selected_salary():
         try:
             delete_salary(salary_id)
             load_salaries()
+            invalidate_tabs(audit_tab)
             messagebox.showinfo("نجاح", "تم حذف سجل الراتب بنجاح.")
             clear_salary_fields()
             set_status("تم حذف سجل الراتب بنجاح.")
@@ -839,88 +1000,126 @@ def search_salaries():
     selected_month = salary_month_filter_var.get()
     selected_year = salary_year_filter_var.get()
 
-    salary_table.delete(*salary_table.get_children())
     set_status("جاري البحث عن سجلات الرواتب...")
 
     try:
-        salaries = fetch_all_salaries()
-        results_count = 0
-        for s in salaries:
-            salary_id, employee_name, department, basic_salary_monthly, allowances, deductions, net_salary, payment_method, payment_date_db, employee_id = s
-            
-            # Convert date for display and filtering
-            payment_date_ddmmyyyy = convert_date_from_db_format(payment_date_db)
-            payment_date_obj = datetime.strptime(payment_date_ddmmyyyy, "%d-%m-%Y").date()
-
-            # Calculate annual basic salary for display
-            basic_salary_annual = basic_salary_monthly * 12
-
-            # Apply filters
-            keyword_match = (keyword.lower() in employee_name.lower() or
-                             keyword.lower() in department.lower() or
-                             keyword.lower() in str(basic_salary_monthly) or
-                             keyword.lower() in str(net_salary))
-
-            department_match = (selected_department == "الكل" or department == selected_department)
-            month_match = (selected_month == "الكل" or payment_date_obj.month == int(selected_month))
-            year_match = (selected_year == "الكل" or payment_date_obj.year == int(selected_year))
-
-            if keyword_match and department_match and month_match and year_match:
-                salary_table.insert("", "end", values=(
-                    salary_id, employee_name, department, 
-                    f"{basic_salary_monthly:.2f}", f"{basic_salary_annual:.2f}", 
-                    f"{allowances:.2f}", f"{deductions:.2f}", f"{net_salary:.2f}", 
-                    payment_method, payment_date_ddmmyyyy, employee_id
-                ))
-                results_count += 1
-        set_status(f"تم العثور على {results_count} سجل/سجلات راتب.")
+        # تطبيق عوامل التصفية داخل قاعدة البيانات وجلب النتائج على صفحات
+        salary_view.reset(keyset_fetcher(
+            query_salaries_page,
+            keyword=keyword.strip() or None,
+            department=selected_department if selected_department != "الكل" else None,
+            year=int(selected_year) if selected_year != "الكل" else None,
+            month=int(selected_month) if selected_month != "الكل" else None,
+        ))
 
     except Exception as e:
         messagebox.showerror("خطأ في البحث", f"حدث خطأ أثناء البحث عن سجلات الرواتب: {e}")
         set_status(f"خطأ في البحث: {e}")
 
+def salary_row_to_item(salary):
+    """تحويل سجل راتب إلى قيم منسقة لعنصر الجدول."""
+    return (
+        salary.id, salary.employee_name, salary.department,
+        f"{salary.basic_salary:.2f}", f"{salary.annual_basic_salary:.2f}",
+        f"{salary.allowances:.2f}", f"{salary.deductions:.2f}", f"{salary.net_salary:.2f}",
+        salary.payment_method, salary.payment_date_display, salary.employee_id
+    ), ()
+
+def run_payroll_for_month():
+    """إضافة رواتب الشهر لجميع الموظفين دفعة واحدة (آخر راتب لكل موظف مع تعديلات الأقسام)."""
+    dialog = PayrollDialog(root, get_all_departments())
+    if dialog.result is None:
+        return
+    payment_date, adjustments = dialog.result
+
+    def on_success(result):
+        inserted, already_paid = result
+        load_salaries()
+        invalidate_tabs(audit_tab)
+        message = f"تمت إضافة {inserted} راتب/رواتب بتاريخ {convert_date_from_db_format(payment_date)}."
+        if already_paid:
+            message += f"\n{already_paid} موظف/ين صرفت رواتبهم مسبقًا في هذا الشهر وتم تخطيهم."
+        messagebox.showinfo("رواتب الشهر", message)
+        set_status(f"تمت إضافة {inserted} راتب/رواتب.")
+
+    def on_error(e):
+        messagebox.showerror("خطأ", f"حدث خطأ أثناء تشغيل رواتب الشهر: {e}")
+        set_status(f"خطأ في تشغيل رواتب الشهر: {e}")
+
+    set_status("جاري تشغيل رواتب الشهر...")
+    task_executor.submit("run-payroll", run_monthly_payroll, payment_date, adjustments,
+                         on_success=on_success, on_error=on_error)
+
 def load_salaries():
     """تحميل جميع سجلات الرواتب أو السجلات بناءً على البحث/التصفية."""
     search_salaries()
 
+SALARY_EXPORT_HEADERS = [
+    "اسم الموظف", "القسم", "الراتب الأساسي (شهري)", "الراتب الأساسي (سنوي)",
+    "البدلات", "الخصومات", "صافي الراتب", "طريقة الدفع", "تاريخ الدفع"
+]
+
 def export_salaries_to_excel():
-    """تصدير جميع بيانات الرواتب إلى ملف Excel."""
+    """تصدير جميع بيانات الرواتب إلى ملف Excel أو CSV."""
     filepath = filedialog.asksaveasfilename(
         defaultextension=".xlsx",
-        filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")],
+        filetypes=EXPORT_FILETYPES,
         title="حفظ الرواتب كملف Excel"
     )
     if not filepath:
         set_status("تم إلغاء عملية التصدير.")
         return
 
-    set_status("جاري تصدير الرواتب إلى Excel...")
-    try:
-        salaries_data = fetch_all_salaries_for_export()
-        
-        formatted_salaries_data = []
-        for sal in salaries_data:
-            sal_list = list(sal)
-            sal_list[8] = convert_date_from_db_format(sal_list[8]) # Format payment_date
-            sal_list.insert(4, f"{sal_list[3] * 12:.2f}") # Insert annual salary after monthly
-            formatted_salaries_data.append(sal_list)
-
-        df = pd.DataFrame(formatted_salaries_data, columns=[
-            "ID", "اسم الموظف", "القسم", "الراتب الأساسي (شهري)", "الراتب الأساسي (سنوي)",
-            "البدلات", "الخصومات", "صافي الراتب", "طريقة الدفع", "تاريخ الدفع", "معرف الموظف"
-        ])
-        df.to_excel(filepath, index=False)
-        messagebox.showinfo("نجاح", f"تم تصدير الرواتب بنجاح إلى:\n{filepath}")
-        log_audit_event("تصدير بيانات", f"تم تصدير جميع الرواتب إلى ملف Excel: {filepath}")
+    def run_export(task):
+        return export_rows(
+            iter_salaries_for_export(), SALARY_EXPORT_HEADERS, filepath,
+            progress_callback=lambda n: task.report_progress(f"جاري تصدير الرواتب... ({n} صف)"),
+            sheet_title="الرواتب"
+        )
+
+    def on_success(count):
+        messagebox.showinfo("نجاح", f"تم تصدير {count} سجل/سجلات راتب بنجاح إلى:\n{filepath}")
+        log_audit_event("تصدير بيانات", f"تم تصدير جميع الرواتب إلى ملف: {filepath}")
         set_status(f"تم تصدير الرواتب بنجاح إلى: {filepath}")
-    except Exception as e:
+
+    def on_error(e):
         messagebox.showerror("خطأ في التصدير", f"حدث خطأ أثناء تصدير الرواتب: {e}")
         set_status(f"خطأ في التصدير: {e}")
 
+    set_status("جاري تصدير الرواتب...")
+    task_executor.submit("export-salaries", run_export, pass_task=True, on_success=on_success, on_error=on_error)
+
 # --- الألسنة (Notebook) ---
 notebook = ttk.Notebook(root)
 notebook.pack(pady=10, expand=True, fill="both")
 
+# --- التحميل الكسول للألسنة ---
+# يتم تحميل بيانات كل لسان عند عرضه لأول مرة بدلاً من تحميل جميع الألسنة قبل ظهور النافذة
+tab_loaders = {}  # معرف اللسان -> قائمة دوال التحميل
+loaded_tabs = set()
+
+def register_tab_loader(tab, *loaders):
+    """يربط لسانًا بدوال تحميل بياناته (تستدعى عند عرض اللسان لأول مرة)."""
+    tab_loaders[str(tab)] = loaders
+
+def load_selected_tab(event=None):
+    """يحمل بيانات اللسان المعروض حاليًا إذا لم تكن محملة بعد."""
+    tab = notebook.select()
+    if not tab or tab in loaded_tabs:
+        return
+    loaded_tabs.add(tab)
+    for loader in tab_loaders.get(tab, ()):
+        loader()
+
+def invalidate_tabs(*tabs):
+    """
+    يعلم الألسنة بأن بياناتها قديمة (مثلاً بعد تعديل مستند يؤثر على سجل التدقيق).
+    اللسان المعروض حاليًا يعاد تحميله فورًا، والبقية عند عرضها في المرة القادمة.
+    """
+    for tab in tabs:
+        loaded_tabs.discard(str(tab))
+    load_selected_tab()
+
 # --- تبويب المستندات ---
 documents_tab = ttk.Frame(notebook)
 notebook.add(documents_tab, text="إدارة المستندات")
@@ -982,6 +1181,7 @@ ttk.Button(doc_buttons_frame, text="مسح الحقول", command=clear_fields).
 ttk.Button(doc_buttons_frame, text="تعديل المستند", command=update_selected_document).pack(side=tk.LEFT, padx=5)
 ttk.Button(doc_buttons_frame, text="حذف المستند", command=delete_selected_document).pack(side=tk.LEFT, padx=5)
 ttk.Button(doc_buttons_frame, text="تصدير إلى Excel", command=export_documents_to_excel).pack(side=tk.LEFT, padx=5)
+ttk.Button(doc_buttons_frame, text="استيراد من Excel/CSV", command=import_documents_from_file).pack(side=tk.LEFT, padx=5)
 
 
 # شريط البحث والتصفية للمستندات
@@ -1005,14 +1205,14 @@ doc_table = ttk.Treeview(doc_table_frame, columns=("id", "name", "number", "date
 doc_table.pack(fill="both", expand=True)
 
 # أعمدة جدول المستندات
-doc_table.heading("id", text="ID", command=lambda: treeview_sort_column(doc_table, "id", False))
-doc_table.heading("name", text="اسم المستند", command=lambda: treeview_sort_column(doc_table, "name", False))
-doc_table.heading("number", text="رقم المستند", command=lambda: treeview_sort_column(doc_table, "number", False))
-doc_table.heading("date", text="تاريخ الإصدار", command=lambda: treeview_sort_column(doc_table, "date", False))
-doc_table.heading("expiry", text="تاريخ الانتهاء", command=lambda: treeview_sort_column(doc_table, "expiry", False))
-doc_table.heading("issuer", text="الجهة المصدرة", command=lambda: treeview_sort_column(doc_table, "issuer", False))
-doc_table.heading("category", text="الفئة", command=lambda: treeview_sort_column(doc_table, "category", False))
-doc_table.heading("tags", text="العلامات", command=lambda: treeview_sort_column(doc_table, "tags", False))
+doc_table.heading("id", text="ID")
+doc_table.heading("name", text="اسم المستند")
+doc_table.heading("number", text="رقم المستند")
+doc_table.heading("date", text="تاريخ الإصدار")
+doc_table.heading("expiry", text="تاريخ الانتهاء")
+doc_table.heading("issuer", text="الجهة المصدرة")
+doc_table.heading("category", text="الفئة")
+doc_table.heading("tags", text="العلامات")
 
 doc_table.column("id", width=30, stretch=tk.NO)
 doc_table.column("name", width=150)
@@ -1039,13 +1239,30 @@ doc_table_scrollbar_x = ttk.Scrollbar(doc_table_frame, orient="horizontal", comm
 doc_table_scrollbar_x.pack(side="bottom", fill="x")
 doc_table.configure(xscrollcommand=doc_table_scrollbar_x.set)
 
+# عرض المستندات على صفحات أثناء التمرير بدلاً من إدراج كل الصفوف
+doc_view = VirtualTable(
+    doc_table, keyset_fetcher(search_documents_page), document_row_to_item, scrollbar=doc_table_scrollbar_y,
+    executor=task_executor, on_loaded=report_view_loaded("مستند/ات"),
+    on_error=report_view_error("حدث خطأ أثناء البحث عن المستندات")
+)
+# الفرز عند النقر على العناوين يتم في قاعدة البيانات (ORDER BY) على الأعمدة بأنواعها الحقيقية
+doc_view.enable_sorting({
+    "id": "id", "name": "name", "number": "number", "date": "issue_date",
+    "expiry": "expiry_date", "issuer": "type", "category": "category", "tags": "notes",
+})
+
 
 # --- إطار المرفقات ---
 attachments_frame = ttk.LabelFrame(documents_tab, text="المرفقات")
 attachments_frame.pack(pady=10, padx=10, fill="both", expand=True)
 
-attachments_table = ttk.Treeview(attachments_frame, columns=("id", "filename", "filepath", "upload_time"), show="headings")
+# عمود الشجرة (#0) يعرض الصورة المصغرة، لذا يكون ارتفاع الصف بحجمها
+style.configure("Attachments.Treeview", rowheight=THUMBNAIL_SIZE[1] + 6)
+attachments_table = ttk.Treeview(attachments_frame, columns=("id", "filename", "filepath", "upload_time"),
+                                 show="tree headings", style="Attachments.Treeview")
 attachments_table.pack(fill="both", expand=True)
+attachments_table.heading("#0", text="معاينة")
+attachments_table.column("#0", width=THUMBNAIL_SIZE[0] + 20, stretch=False)
 
 attachments_table.heading("id", text="ID")
 attachments_table.heading("filename", text="اسم الملف")
@@ -1065,6 +1282,8 @@ ttk.Button(attachment_buttons_frame, text="إضافة مرفق", command=add_att
 ttk.Button(attachment_buttons_frame, text="فتح المرفق", command=open_selected_attachment).pack(side=tk.LEFT, padx=5)
 ttk.Button(attachment_buttons_frame, text="حذف المرفق", command=delete_selected_attachment).pack(side=tk.LEFT, padx=5)
 ttk.Button(attachment_buttons_frame, text="حذف كل المرفقات", command=delete_all_attachments_for_document).pack(side=tk.LEFT, padx=5)
+ttk.Button(attachment_buttons_frame, text="استيراد مجلد مرفقات", command=import_attachments_folder).pack(side=tk.LEFT, padx=5)
+ttk.Button(attachment_buttons_frame, text="مساحة التخزين", command=show_attachment_storage_stats).pack(side=tk.LEFT, padx=5)
 
 # شريط التمرير لجدول المرفقات
 attachments_table_scrollbar_y = ttk.Scrollbar(attachments_frame, orient="vertical", command=attachments_table.yview)
@@ -1126,18 +1345,19 @@ ttk.Button(emp_buttons_frame, text="حفظ موظف", command=save_employee).pac
 ttk.Button(emp_buttons_frame, text="مسح الحقول", command=clear_employee_fields).pack(side=tk.LEFT, padx=5)
 ttk.Button(emp_buttons_frame, text="تعديل موظف", command=update_selected_employee).pack(side=tk.LEFT, padx=5)
 ttk.Button(emp_buttons_frame, text="حذف موظف", command=delete_selected_employee).pack(side=tk.LEFT, padx=5)
+ttk.Button(emp_buttons_frame, text="استيراد من Excel/CSV", command=import_employees_from_file).pack(side=tk.LEFT, padx=5)
 
 # جدول عرض الموظفين
 emp_table = ttk.Treeview(emp_table_frame, columns=("id", "name", "number", "department", "contact", "hire_date"), show="headings")
 emp_table.pack(fill="both", expand=True)
 
 # أعمدة جدول الموظفين
-emp_table.heading("id", text="ID", command=lambda: treeview_sort_column(emp_table, "id", False))
-emp_table.heading("name", text="اسم الموظف", command=lambda: treeview_sort_column(emp_table, "name", False))
-emp_table.heading("number", text="الرقم الوظيفي", command=lambda: treeview_sort_column(emp_table, "number", False))
-emp_table.heading("department", text="القسم", command=lambda: treeview_sort_column(emp_table, "department", False))
-emp_table.heading("contact", text="معلومات الاتصال", command=lambda: treeview_sort_column(emp_table, "contact", False))
-emp_table.heading("hire_date", text="تاريخ التعيين", command=lambda: treeview_sort_column(emp_table, "hire_date", False))
+emp_table.heading("id", text="ID")
+emp_table.heading("name", text="اسم الموظف")
+emp_table.heading("number", text="الرقم الوظيفي")
+emp_table.heading("department", text="القسم")
+emp_table.heading("contact", text="معلومات الاتصال")
+emp_table.heading("hire_date", text="تاريخ التعيين")
 
 emp_table.column("id", width=50)
 emp_table.column("name", width=150)
@@ -1157,6 +1377,16 @@ emp_table_scrollbar_x = ttk.Scrollbar(emp_table_frame, orient="horizontal", comm
 emp_table_scrollbar_x.pack(side="bottom", fill="x")
 emp_table.configure(xscrollcommand=emp_table_scrollbar_x.set)
 
+emp_view = VirtualTable(
+    emp_table, keyset_fetcher(fetch_employees_page), employee_row_to_item, scrollbar=emp_table_scrollbar_y,
+    executor=task_executor, on_loaded=report_view_loaded("موظف/موظفين"),
+    on_error=report_view_error("حدث خطأ أثناء تحميل بيانات الموظفين")
+)
+emp_view.enable_sorting({
+    "id": "id", "name": "name", "number": "position", "department": "department",
+    "contact": "phone", "hire_date": "start_date",
+})
+
 # --- تبويب سجل التدقيق ---
 audit_tab = ttk.Frame(notebook)
 notebook.add(audit_tab, text="سجل التدقيق")
@@ -1167,10 +1397,10 @@ audit_table_frame.pack(pady=10, padx=10, expand=True, fill="both")
 audit_table = ttk.Treeview(audit_table_frame, columns=("id", "timestamp", "event_type", "description"), show="headings")
 audit_table.pack(fill="both", expand=True)
 
-audit_table.heading("id", text="ID", command=lambda: treeview_sort_column(audit_table, "id", False))
-audit_table.heading("timestamp", text="الوقت", command=lambda: treeview_sort_column(audit_table, "timestamp", False))
-audit_table.heading("event_type", text="نوع الحدث", command=lambda: treeview_sort_column(audit_table, "event_type", False))
-audit_table.heading("description", text="الوصف", command=lambda: treeview_sort_column(audit_table, "description", False))
+audit_table.heading("id", text="ID")
+audit_table.heading("timestamp", text="الوقت")
+audit_table.heading("event_type", text="نوع الحدث")
+audit_table.heading("description", text="الوصف")
 
 audit_table.column("id", width=50)
 audit_table.column("timestamp", width=150)
@@ -1186,6 +1416,13 @@ audit_table_scrollbar_x = ttk.Scrollbar(audit_table_frame, orient="horizontal",
 audit_table_scrollbar_x.pack(side="bottom", fill="x")
 audit_table.configure(xscrollcommand=audit_table_scrollbar_x.set)
 
+audit_view = VirtualTable(
+    audit_table, keyset_fetcher(fetch_audit_log_page), audit_row_to_item, scrollbar=audit_table_scrollbar_y,
+    executor=task_executor, on_loaded=report_view_loaded("سجل/سجلات تدقيق"),
+    on_error=report_view_error("حدث خطأ أثناء تحميل سجل التدقيق")
+)
+audit_view.enable_sorting({"id": "id", "timestamp": "timestamp", "event_type": "action", "description": "details"})
+
 
 # --- تبويب المدة المتبقية للمستندات ---
 remaining_time_tab = ttk.Frame(notebook)
@@ -1197,11 +1434,11 @@ remaining_time_frame.pack(pady=10, padx=10, expand=True, fill="both")
 remaining_time_table = ttk.Treeview(remaining_time_frame, columns=("id", "name", "number", "expiry_date", "remaining_time"), show="headings")
 remaining_time_table.pack(fill="both", expand=True)
 
-remaining_time_table.heading("id", text="ID", command=lambda: treeview_sort_column(remaining_time_table, "id", False))
-remaining_time_table.heading("name", text="اسم المستند", command=lambda: treeview_sort_column(remaining_time_table, "name", False))
-remaining_time_table.heading("number", text="رقم المستند", command=lambda: treeview_sort_column(remaining_time_table, "number", False))
-remaining_time_table.heading("expiry_date", text="تاريخ الانتهاء", command=lambda: treeview_sort_column(remaining_time_table, "expiry_date", False))
-remaining_time_table.heading("remaining_time", text="المدة المتبقية", command=lambda: treeview_sort_column(remaining_time_table, "remaining_time", False))
+remaining_time_table.heading("id", text="ID")
+remaining_time_table.heading("name", text="اسم المستند")
+remaining_time_table.heading("number", text="رقم المستند")
+remaining_time_table.heading("expiry_date", text="تاريخ الانتهاء")
+remaining_time_table.heading("remaining_time", text="المدة المتبقية")
 
 remaining_time_table.column("id", width=50)
 remaining_time_table.column("name", width=150)
@@ -1218,6 +1455,15 @@ remaining_time_table_scrollbar_x = ttk.Scrollbar(remaining_time_frame, orient="h
 remaining_time_table_scrollbar_x.pack(side="bottom", fill="x")
 remaining_time_table.configure(xscrollcommand=remaining_time_table_scrollbar_x.set)
 
+remaining_time_view = VirtualTable(
+    remaining_time_table, keyset_fetcher(fetch_expiry_page), remaining_time_row_to_item, scrollbar=remaining_time_table_scrollbar_y,
+    executor=task_executor, on_loaded=report_view_loaded("مستند/ات (المدة المتبقية)"),
+    on_error=report_view_error("حدث خطأ أثناء تحميل المدة المتبقية للمستندات")
+)
+remaining_time_view.enable_sorting({
+    "id": "id", "name": "name", "number": "number", "expiry_date": "expiry_date", "remaining_time": "days_remaining",
+})
+
 # --- تبويب إدارة الرواتب ---
 salaries_tab = ttk.Frame(notebook)
 notebook.add(salaries_tab, text="إدارة الرواتب")
@@ -1231,7 +1477,8 @@ salary_table_frame.pack(pady=10, padx=10, expand=True, fill="both")
 
 # حقول إدخال الرواتب
 tk.Label(salary_inputs_frame, text="اسم الموظف:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
-emp_id_salary_combobox = ttk.Combobox(salary_inputs_frame, width=40, state="readonly")
+# اختيار الموظف بالكتابة (بحث في فهرس بادئات الأسماء) بدلاً من قائمة بجميع الموظفين
+emp_id_salary_combobox = EmployeePicker(salary_inputs_frame, width=40)
 emp_id_salary_combobox.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
 
 tk.Label(salary_inputs_frame, text="الراتب الأساسي (شهري):").grid(row=1, column=0, padx=5, pady=5, sticky="w")
@@ -1283,6 +1530,7 @@ ttk.Button(salary_buttons_frame, text="مسح الحقول", command=clear_salar
 ttk.Button(salary_buttons_frame, text="تعديل الراتب", command=update_selected_salary).pack(side=tk.LEFT, padx=5)
 ttk.Button(salary_buttons_frame, text="حذف الراتب", command=delete_selected_salary).pack(side=tk.LEFT, padx=5)
 ttk.Button(salary_buttons_frame, text="تصدير إلى Excel", command=export_salaries_to_excel).pack(side=tk.LEFT, padx=5)
+ttk.Button(salary_buttons_frame, text="تشغيل رواتب الشهر", command=run_payroll_for_month).pack(side=tk.LEFT, padx=5)
 
 # شريط البحث والتصفية للرواتب
 salary_search_frame = ttk.Frame(salary_table_frame)
@@ -1319,7 +1567,7 @@ salary_table.pack(fill="both", expand=True)
 
 # أعمدة جدول الرواتب
 for col in ["id", "اسم الموظف", "القسم", "الراتب الأساسي (شهري)", "الراتب الأساسي (سنوي)", "البدلات", "الخصومات", "صافي الراتب", "طريقة الدفع", "تاريخ الدفع"]:
-    salary_table.heading(col, text=col, command=lambda _col=col: treeview_sort_column(salary_table, _col, False))
+    salary_table.heading(col, text=col)
     salary_table.column(col, anchor="center")
 
 salary_table.column("id", width=30)
@@ -1344,18 +1592,110 @@ salary_table_scrollbar_x = ttk.Scrollbar(salary_table_frame, orient="horizontal"
 salary_table_scrollbar_x.pack(side="bottom", fill="x")
 salary_table.configure(xscrollcommand=salary_table_scrollbar_x.set)
 
+salary_view = VirtualTable(
+    salary_table, keyset_fetcher(query_salaries_page), salary_row_to_item, scrollbar=salary_table_scrollbar_y,
+    executor=task_executor, on_loaded=report_view_loaded("سجل/سجلات راتب"),
+    on_error=report_view_error("حدث خطأ أثناء البحث عن سجلات الرواتب")
+)
+salary_view.enable_sorting({
+    "id": "id", "اسم الموظف": "employee_name", "القسم": "department",
+    "الراتب الأساسي (شهري)": "basic_salary", "الراتب الأساسي (سنوي)": "basic_salary",
+    "البدلات": "allowances", "الخصومات": "deductions", "صافي الراتب": "net_salary",
+    "طريقة الدفع": "payment_method", "تاريخ الدفع": "payment_date",
+})
+
 # ربط تحديد الصف في جدول الرواتب
 salary_table.bind("<<TreeviewSelect>>", lambda event: populate_salary_form_from_selection())
 
+# --- تبويب التشخيص (مخفي، يظهر بـ Ctrl+Shift+D) ---
+diagnostics_tab = ttk.Frame(notebook)
+notebook.add(diagnostics_tab, text="التشخيص")
+notebook.hide(diagnostics_tab)
+
+diagnostics_buttons_frame = ttk.Frame(diagnostics_tab)
+diagnostics_buttons_frame.pack(pady=5, padx=10, fill="x")
 
-# Initial loads
-update_category_filter_options()
-load_documents()
-load_employees()
-load_audit_log()
-load_remaining_time_documents()
-update_employee_salary_options()
-update_department_salary_filter_options()
-load_salaries()
+diagnostics_table_frame = ttk.LabelFrame(diagnostics_tab, text="أزمنة العمليات والاستعلامات (بالمللي ثانية)")
+diagnostics_table_frame.pack(pady=10, padx=10, expand=True, fill="both")
 
+diagnostics_table = ttk.Treeview(diagnostics_table_frame, columns=(
+    "kind", "name", "count", "p50", "p95", "max", "total", "rows"
+), show="headings")
+for column, heading, width in (
+    ("kind", "النوع", 70), ("name", "العملية", 500), ("count", "العدد", 60), ("p50", "p50", 70),
+    ("p95", "p95", 70), ("max", "الأقصى", 70), ("total", "الإجمالي", 80), ("rows", "الصفوف", 70),
+):
+    diagnostics_table.heading(column, text=heading)
+    diagnostics_table.column(column, width=width, stretch=column == "name")
+
+diagnostics_table_scrollbar_y = ttk.Scrollbar(diagnostics_table_frame, orient="vertical", command=diagnostics_table.yview)
+diagnostics_table_scrollbar_y.pack(side="right", fill="y")
+diagnostics_table.configure(yscrollcommand=diagnostics_table_scrollbar_y.set)
+diagnostics_table.pack(fill="both", expand=True)
+
+DIAGNOSTICS_KIND_LABELS = {instrumentation.KIND_FUNCTION: "دالة", instrumentation.KIND_SQL: "SQL"}
+
+def load_diagnostics():
+    """عرض p50/p95 لكل دالة واستعلام من القياسات المحفوظة في الذاكرة."""
+    diagnostics_table.delete(*diagnostics_table.get_children())
+    for kind, name, count, p50, p95, maximum, total, rows in instrumentation.summary():
+        diagnostics_table.insert("", "end", values=(
+            DIAGNOSTICS_KIND_LABELS.get(kind, kind), name, count,
+            f"{p50:.2f}", f"{p95:.2f}", f"{maximum:.2f}", f"{total:.1f}", rows
+        ))
+    set_status(f"سجل الاستعلامات البطيئة (أكثر من {instrumentation.SLOW_QUERY_MS:.0f} مللي ثانية): {instrumentation.SLOW_QUERY_LOG}")
+
+def reset_diagnostics():
+    instrumentation.reset()
+    load_diagnostics()
+
+def toggle_diagnostics_tab(event=None):
+    """إظهار لسان التشخيص أو إخفاؤه."""
+    if notebook.tab(diagnostics_tab, "state") == "hidden":
+        notebook.add(diagnostics_tab)  # إعادة إضافة لسان مخفي تظهره في مكانه
+        notebook.select(diagnostics_tab)
+        invalidate_tabs(diagnostics_tab)  # عرض أحدث القياسات في كل مرة
+    else:
+        notebook.hide(diagnostics_tab)
+
+ttk.Button(diagnostics_buttons_frame, text="تحديث", command=load_diagnostics).pack(side=tk.LEFT, padx=5)
+ttk.Button(diagnostics_buttons_frame, text="مسح القياسات", command=reset_diagnostics).pack(side=tk.LEFT, padx=5)
+
+# افتراضيًا تسجل الاستعلامات البطيئة فقط؛ التسجيل الكامل يبطئ عمليات الكتابة الكبيرة
+sql_tracing_var = tk.BooleanVar(value=instrumentation.sql_tracing_enabled())
+ttk.Checkbutton(
+    diagnostics_buttons_frame, text="تسجيل جميع استعلامات SQL", variable=sql_tracing_var,
+    command=lambda: instrumentation.set_sql_tracing(sql_tracing_var.get())
+).pack(side=tk.LEFT, padx=5)
+
+root.bind_all("<Control-Shift-D>", toggle_diagnostics_tab)
+root.bind_all("<Control-Shift-d>", toggle_diagnostics_tab)
+
+
+# تحميل بيانات كل لسان عند عرضه لأول مرة
+register_tab_loader(documents_tab, update_category_filter_options, load_documents)
+register_tab_loader(employees_tab, load_employees)
+register_tab_loader(audit_tab, load_audit_log)
+register_tab_loader(remaining_time_tab, load_remaining_time_documents)
+register_tab_loader(salaries_tab, update_employee_salary_options, update_department_salary_filter_options, load_salaries)
+register_tab_loader(diagnostics_tab, load_diagnostics)
+notebook.bind("<<NotebookTabChanged>>", load_selected_tab)
+# تحميل اللسان الأول بعد ظهور النافذة
+root.after_idle(load_selected_tab)
+
+def report_attachment_migration(result):
+    """عرض نتيجة نقل المرفقات القديمة إلى مخزن المرفقات."""
+    migrated, freed = result
+    if migrated:
+        set_status(f"تم نقل {migrated} مرفق/ات إلى مخزن المرفقات وتحرير {freed / (1024 * 1024):.1f} ميجابايت.")
+
+# نقل المرفقات القديمة إلى المخزن القائم على المحتوى في الخلفية
+task_executor.submit("migrate-attachments", migrate_legacy_attachments, on_success=report_attachment_migration)
+
+def on_close():
+    """إيقاف مهام الخلفية قبل إغلاق النافذة."""
+    task_executor.shutdown()
+    root.destroy()
+
+root.protocol("WM_DELETE_WINDOW", on_close)
 root.mainloop()
\ No newline at end of file
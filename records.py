@@ -0,0 +1,152 @@
+from datetime import datetime
+from functools import lru_cache
+
+
+@lru_cache(maxsize=4096)
+def display_date(date_str_yyyymmdd):
+    """
+    يحول تاريخًا من YYYY-MM-DD إلى DD-MM-YYYY للعرض، أو سلسلة فارغة إذا كان فارغًا أو غير صحيح.
+    النتائج محفوظة: عدد التواريخ المختلفة في الجداول صغير مقارنة بعدد الصفوف (مثلاً تاريخ دفع لكل شهر).
+    """
+    if not date_str_yyyymmdd:
+        return ""
+    try:
+        return datetime.strptime(date_str_yyyymmdd, "%Y-%m-%d").strftime("%d-%m-%Y")
+    except (TypeError, ValueError):
+        return ""
+
+
+class Record:
+    """
+    أساس سجلات الصفوف: كائنات بـ __slots__ (دون قاموس لكل كائن) تنشأ مباشرة من المؤشر
+    عبر row_factory، وتقرأ حقولها بالاسم بدلاً من موقعها في tuple.
+    الحقول المشتقة (تواريخ العرض) تحسب عند أول طلب وتحفظ في خانة الكائن نفسه
+    (الخانة غير المعينة ترفع AttributeError، فلا تكلفة لها عند الإنشاء).
+    """
+
+    __slots__ = ()
+    _fields = ()
+
+    @classmethod
+    def row_factory(cls, cursor, row):
+        """row_factory للمؤشر: أعمدة الاستعلام بنفس ترتيب _fields (الحقول الأخيرة الاختيارية قد تحذف)."""
+        return cls(*row)
+
+    def __repr__(self):
+        values = ", ".join(f"{field}={getattr(self, field)!r}" for field in self._fields)
+        return f"{type(self).__name__}({values})"
+
+
+class Document(Record):
+    __slots__ = ("id", "name", "number", "type", "category", "issue_date", "expiry_date", "status", "notes",
+                 "employee_name", "expiry_status", "days_remaining", "_issue_date_display", "_expiry_date_display")
+    _fields = __slots__[:12]
+
+    def __init__(self, id, name, number, type, category, issue_date, expiry_date, status, notes,
+                 employee_name=None, expiry_status=None, days_remaining=None):
+        self.id = id
+        self.name = name
+        self.number = number
+        self.type = type
+        self.category = category
+        self.issue_date = issue_date
+        self.expiry_date = expiry_date
+        self.status = status
+        self.notes = notes
+        self.employee_name = employee_name
+        self.expiry_status = expiry_status  # "valid" أو "near" أو "expired" (محسوبة في الاستعلام)
+        self.days_remaining = days_remaining  # عدد الأيام حتى الانتهاء (محسوب في الاستعلام)
+
+    @property
+    def issue_date_display(self):
+        try:
+            return self._issue_date_display
+        except AttributeError:
+            self._issue_date_display = display_date(self.issue_date)
+            return self._issue_date_display
+
+    @property
+    def expiry_date_display(self):
+        try:
+            return self._expiry_date_display
+        except AttributeError:
+            self._expiry_date_display = display_date(self.expiry_date)
+            return self._expiry_date_display
+
+
+class Employee(Record):
+    __slots__ = ("id", "name", "position", "department", "start_date", "phone", "email", "address", "notes",
+                 "_start_date_display")
+    _fields = __slots__[:9]
+
+    def __init__(self, id, name, position, department, start_date, phone=None, email=None, address=None, notes=None):
+        self.id = id
+        self.name = name
+        self.position = position
+        self.department = department
+        self.start_date = start_date
+        self.phone = phone
+        self.email = email
+        self.address = address
+        self.notes = notes
+
+    @property
+    def start_date_display(self):
+        try:
+            return self._start_date_display
+        except AttributeError:
+            self._start_date_display = display_date(self.start_date)
+            return self._start_date_display
+
+
+class Salary(Record):
+    __slots__ = ("id", "employee_name", "department", "basic_salary", "allowances", "deductions", "net_salary",
+                 "payment_method", "payment_date", "employee_id", "_payment_date_display")
+    _fields = __slots__[:10]
+
+    def __init__(self, id, employee_name, department, basic_salary, allowances, deductions, net_salary,
+                 payment_method, payment_date, employee_id=None):
+        self.id = id
+        self.employee_name = employee_name
+        self.department = department
+        self.basic_salary = basic_salary  # الراتب الأساسي الشهري
+        self.allowances = allowances
+        self.deductions = deductions
+        self.net_salary = net_salary
+        self.payment_method = payment_method
+        self.payment_date = payment_date  # YYYY-MM-DD
+        self.employee_id = employee_id
+
+    @property
+    def annual_basic_salary(self):
+        return self.basic_salary * 12
+
+    @property
+    def payment_date_display(self):
+        try:
+            return self._payment_date_display
+        except AttributeError:
+            self._payment_date_display = display_date(self.payment_date)
+            return self._payment_date_display
+
+
+class Attachment(Record):
+    __slots__ = ("id", "file_name", "path", "upload_date")
+    _fields = __slots__
+
+    def __init__(self, id, file_name, path, upload_date=""):
+        self.id = id
+        self.file_name = file_name
+        self.path = path  # مسار الملف في مخزن المرفقات أو المسار القديم
+        self.upload_date = upload_date
+
+
+class AuditEvent(Record):
+    __slots__ = ("id", "timestamp", "action", "details")
+    _fields = __slots__
+
+    def __init__(self, id, timestamp, action, details=None):
+        self.id = id
+        self.timestamp = timestamp
+        self.action = action
+        self.details = details
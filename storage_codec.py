@@ -0,0 +1,80 @@
+import lzma
+import os
+import zlib
+
+CODEC_NONE = "none"
+CODEC_ZLIB = "zlib"
+CODEC_LZMA = "lzma"
+CODECS = (CODEC_NONE, CODEC_ZLIB, CODEC_LZMA)
+
+SAMPLE_SIZE = 256 * 1024  # حجم العينة (من بداية الملف) المستخدمة لاختيار طريقة الضغط
+MIN_SAVING = 0.10  # أقل نسبة توفير تجعل الضغط مجديًا
+LZMA_EXTRA_SAVING = 0.10  # يستخدم lzma (الأبطأ) فقط إذا وفر هذه النسبة الإضافية مقارنة بـ zlib
+ZLIB_LEVEL = 6
+LZMA_PRESET = 1  # مستوى سريع؛ المستويات الأعلى بطيئة جدًا مع ملفات المسح الضوئي الكبيرة
+CHUNK_SIZE = 1024 * 1024
+
+# صيغ مضغوطة أصلاً لا فائدة من محاولة ضغطها
+COMPRESSED_EXTENSIONS = {
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".mp3", ".mp4", ".mov", ".avi",
+    ".zip", ".rar", ".7z", ".gz", ".xz", ".bz2", ".docx", ".xlsx", ".pptx", ".odt", ".ods",
+}
+
+
+def choose_codec(sample, file_name=""):
+    """
+    يختار طريقة الضغط لملف بناءً على عينة من بدايته:
+    لا ضغط إذا لم توفر العينة MIN_SAVING على الأقل، و lzma فقط إذا كان أفضل بوضوح من zlib.
+    """
+    if not sample or os.path.splitext(file_name)[1].lower() in COMPRESSED_EXTENSIONS:
+        return CODEC_NONE
+    zlib_ratio = len(zlib.compress(sample, ZLIB_LEVEL)) / len(sample)
+    if zlib_ratio > 1 - MIN_SAVING:
+        return CODEC_NONE
+    lzma_ratio = len(lzma.compress(sample, preset=LZMA_PRESET)) / len(sample)
+    if lzma_ratio <= zlib_ratio - LZMA_EXTRA_SAVING:
+        return CODEC_LZMA
+    return CODEC_ZLIB
+
+
+class _Identity:
+    """ضاغط/فاك ضغط لا يغير البيانات (للملفات غير المضغوطة)."""
+
+    def compress(self, data):
+        return data
+
+    decompress = compress
+
+    def flush(self):
+        return b""
+
+
+def compressor(codec):
+    """يعيد كائن ضغط تدريجي (compress/flush) لطريقة الضغط."""
+    if codec == CODEC_ZLIB:
+        return zlib.compressobj(ZLIB_LEVEL)
+    if codec == CODEC_LZMA:
+        return lzma.LZMACompressor(preset=LZMA_PRESET)
+    return _Identity()
+
+
+def decompressor(codec):
+    """يعيد كائن فك ضغط تدريجي لطريقة الضغط."""
+    if codec == CODEC_ZLIB:
+        return zlib.decompressobj()
+    if codec == CODEC_LZMA:
+        return lzma.LZMADecompressor()
+    return _Identity()
+
+
+def decompress_file(source_path, target_path, codec):
+    """يفك ضغط ملف إلى ملف آخر على دفعات (دون تحميل الملف كاملاً في الذاكرة)."""
+    decoder = decompressor(codec)
+    with open(source_path, "rb") as src, open(target_path, "wb") as dst:
+        while True:
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            dst.write(decoder.decompress(chunk))
+        if codec == CODEC_ZLIB:
+            dst.write(decoder.flush())
@@ -0,0 +1,158 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = 4
+POLL_INTERVAL_MS = 50  # الفاصل الزمني لفحص قائمة النتائج من حلقة Tk
+
+
+class TaskCancelled(Exception):
+    """يرفع داخل المهمة عند إلغائها (عبر Task.check_cancelled)."""
+
+
+class Task:
+    """
+    مقبض لمهمة تعمل في الخلفية. يمرر إلى الدالة عند استخدام pass_task=True
+    حتى تتمكن من الإبلاغ عن التقدم والتحقق من الإلغاء.
+    """
+
+    def __init__(self, key, results_queue):
+        self.key = key
+        self._queue = results_queue
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """يطلب إلغاء المهمة؛ لن تسلم نتيجتها إلى الواجهة."""
+        self._cancelled.set()
+
+    def check_cancelled(self):
+        """يرفع TaskCancelled إذا تم إلغاء المهمة (للاستخدام داخل الحلقات الطويلة)."""
+        if self.cancelled:
+            raise TaskCancelled()
+
+    def report_progress(self, message):
+        """يرسل رسالة تقدم ليتم عرضها في شريط الحالة من خيط الواجهة."""
+        self._queue.put(("progress", self, message))
+
+
+class TaskExecutor:
+    """
+    ينفذ استدعاءات الواجهة الخلفية في مجموعة خيوط عاملة، ويسلم النتائج إلى واجهة Tk
+    عبر قائمة انتظار يتم فحصها باستخدام root.after، لأن Tk لا يسمح بالوصول إلى
+    عناصر الواجهة إلا من الخيط الرئيسي.
+    المهام التي تحمل نفس المفتاح (key) تلغي بعضها: المهمة الأحدث تحل محل الأقدم،
+    ونتيجة المهمة الأقدم تهمل حتى لو انتهت لاحقًا.
+    """
+
+    def __init__(self, root, max_workers=DEFAULT_WORKERS, on_progress=None, on_busy_change=None):
+        self.root = root
+        self.on_progress = on_progress
+        self.on_busy_change = on_busy_change
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-worker")
+        self._queue = queue.Queue()
+        self._latest = {}  # المفتاح -> أحدث مهمة
+        self._in_flight = 0
+        self._polling = False
+
+    @property
+    def busy(self):
+        return self._in_flight > 0
+
+    def submit(self, key, fn, *args, on_success=None, on_error=None, pass_task=False, **kwargs):
+        """
+        يشغل fn(*args, **kwargs) في الخلفية (أو fn(task, *args, **kwargs) مع pass_task=True).
+        on_success(result) و on_error(exception) تستدعى في خيط الواجهة.
+        يعيد كائن Task يمكن استخدامه للإلغاء.
+        """
+        task = Task(key, self._queue)
+        task.on_success = on_success
+        task.on_error = on_error
+        if key is not None:
+            previous = self._latest.get(key)
+            if previous is not None:
+                previous.cancel()
+            self._latest[key] = task
+
+        self._set_in_flight(self._in_flight + 1)
+        self._pool.submit(self._run, task, fn, args, kwargs, pass_task)
+        self._start_polling()
+        return task
+
+    def cancel(self, key):
+        """يلغي المهمة الحالية التي تحمل هذا المفتاح."""
+        task = self._latest.pop(key, None)
+        if task is not None:
+            task.cancel()
+
+    def shutdown(self):
+        """يلغي جميع المهام ويوقف الخيوط العاملة (يستدعى عند إغلاق النافذة)."""
+        for task in self._latest.values():
+            task.cancel()
+        self._latest.clear()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # --- التنفيذ في الخيط العامل ---
+    def _run(self, task, fn, args, kwargs, pass_task):
+        if task.cancelled:
+            self._queue.put(("cancelled", task, None))
+            return
+        try:
+            result = fn(task, *args, **kwargs) if pass_task else fn(*args, **kwargs)
+        except TaskCancelled:
+            self._queue.put(("cancelled", task, None))
+        except Exception as e:
+            self._queue.put(("error", task, e))
+        else:
+            self._queue.put(("done", task, result))
+
+    # --- الاستلام في خيط الواجهة ---
+    def _is_stale(self, task):
+        return task.cancelled or (task.key is not None and self._latest.get(task.key) is not task)
+
+    def _start_polling(self):
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_INTERVAL_MS, self._poll)
+
+    def _poll(self):
+        while True:
+            try:
+                kind, task, payload = self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "progress":
+                if not self._is_stale(task) and self.on_progress:
+                    self.on_progress(payload)
+                continue
+
+            self._set_in_flight(self._in_flight - 1)
+            if self._is_stale(task):
+                continue  # نتيجة قديمة تم استبدالها بمهمة أحدث
+            if task.key is not None:
+                self._latest.pop(task.key, None)
+            try:
+                if kind == "done" and task.on_success:
+                    task.on_success(payload)
+                elif kind == "error":
+                    if task.on_error:
+                        task.on_error(payload)
+                    else:
+                        print(f"خطأ في مهمة الخلفية ({task.key}): {payload}")
+            except Exception as e:
+                print(f"خطأ في معالجة نتيجة المهمة ({task.key}): {e}")
+
+        if self._in_flight > 0:
+            self.root.after(POLL_INTERVAL_MS, self._poll)
+        else:
+            self._polling = False
+
+    def _set_in_flight(self, count):
+        was_busy = self._in_flight > 0
+        self._in_flight = count
+        if self.on_busy_change and was_busy != (count > 0):
+            self.on_busy_change(count > 0)
@@ -0,0 +1,58 @@
+"""
+اختبارات البحث الموحد في المستندات: يجب أن يتجاهل البحث أشكال الألف والتشكيل
+سواء كانت كلمات البحث طويلة (فهرس المقاطع الثلاثية) أو قصيرة (فهرس الكلمات).
+
+التشغيل:
+    python -m unittest test_search
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+_work_dir = tempfile.mkdtemp(prefix="document_manager_test_")
+# يجب ضبط المسارات قبل استيراد backend
+os.environ["DOCUMENT_MANAGER_DB"] = os.path.join(_work_dir, "test.db")
+os.environ["DOCUMENT_MANAGER_ATTACHMENTS_DIR"] = os.path.join(_work_dir, "attachments")
+os.environ["DOCUMENT_MANAGER_SLOW_QUERY_LOG"] = os.path.join(_work_dir, "slow_queries.log")
+
+import backend  # noqa: E402
+from db_connection import close_connection  # noqa: E402
+
+
+def tearDownModule():
+    backend.flush_audit_log()
+    close_connection()
+    shutil.rmtree(_work_dir, ignore_errors=True)
+
+
+class DocumentSearchNormalizationTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        backend.create_database()
+        for number, name in enumerate(("إب محمد", "أب محمد", "اَب محمد", "ابراهيم محمد", "إب علي", "باب محمد"), 1):
+            backend.add_document(name, f"N{number}", "هوية", "شخصية", "2024-01-01", "2030-01-01", "سارية", None, "")
+
+    def names(self, keyword):
+        return sorted(document.name for document in backend.search_documents_fts(keyword))
+
+    def test_short_term_with_long_term(self):
+        expected = sorted(["إب محمد", "أب محمد", "اَب محمد", "ابراهيم محمد"])
+        self.assertEqual(self.names("اب محمد"), expected)
+        self.assertEqual(self.names("إب محمد"), expected)
+
+    def test_short_term_only(self):
+        self.assertEqual(self.names("اب"), self.names("إب"))
+        self.assertEqual(len(self.names("اب")), 5)
+
+    def test_long_term_only(self):
+        self.assertEqual(self.names("ابراهيم"), self.names("إبراهيم"))
+        self.assertEqual(self.names("ابراهيم"), ["ابراهيم محمد"])
+
+    def test_paged_search_matches(self):
+        rows, _ = backend.search_documents_page("أب محمد")
+        self.assertEqual(sorted(row.name for row in rows), self.names("اب محمد"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import re
+
+# التشكيل (الحركات والتنوين والشدة والسكون والألف الخنجرية) وعلامات القرآن، والتطويل (ـ)
+_REMOVED_CHARS = (
+    [chr(c) for c in range(0x0610, 0x061B)]
+    + [chr(c) for c in range(0x064B, 0x0660)]
+    + ["ٰ", "ـ"]
+    + [chr(c) for c in range(0x06D6, 0x06EE)]
+)
+_FOLDED_CHARS = {
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ٲ": "ا", "ٳ": "ا",  # أشكال الألف
+    "ى": "ي", "ی": "ي", "ې": "ي",  # الألف المقصورة والياء الفارسية
+}
+_TRANSLATION = str.maketrans({**{char: None for char in _REMOVED_CHARS}, **_FOLDED_CHARS})
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_arabic(text):
+    """
+    يوحد النص للبحث: يحذف التشكيل والتطويل، ويوحد أشكال الألف (أ إ آ ٱ -> ا)
+    والألف المقصورة (ى -> ي)، ويحول الحروف اللاتينية إلى أحرف صغيرة، ويختصر المسافات.
+    فالبحث عن "احمد" يجد "أحمد" و "إحمد" و "أَحْمَد".
+    """
+    if not text:
+        return ""
+    return _WHITESPACE.sub(" ", str(text).translate(_TRANSLATION).casefold()).strip()
+
+
+def search_text(*values):
+    """يجمع عدة حقول في نص بحث موحد واحد (القيم الفارغة تتجاهل)."""
+    return normalize_arabic(" ".join(str(value) for value in values if value not in (None, "")))
@@ -0,0 +1,138 @@
+import os
+import tempfile
+import threading
+
+THUMBNAIL_SIZE = (64, 64)  # أقصى أبعاد الصورة المصغرة بالبكسل
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024  # الحجم الأقصى لمجلد الصور المصغرة قبل حذف الأقدم استخدامًا
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tif", ".tiff", ".webp"}
+THUMBNAIL_SUFFIX = ".png"
+FAILED_SUFFIX = ".failed"  # علامة لملف تعذر فك ترميزه، حتى لا تعاد المحاولة في كل مرة
+
+
+def is_image_file(file_name):
+    """True إذا كان امتداد الملف لصورة يمكن إنشاء صورة مصغرة لها."""
+    return os.path.splitext(file_name)[1].lower() in IMAGE_EXTENSIONS
+
+
+class ThumbnailCache:
+    """
+    ذاكرة مؤقتة على القرص للصور المصغرة، مفتاحها ملخص محتوى المرفق (content hash):
+    كل صورة يفك ترميزها مرة واحدة فقط مهما تكرر عرضها أو إرفاقها بعدة مستندات.
+    عند تجاوز الحجم الأقصى تحذف الصور الأقدم استخدامًا (LRU حسب وقت التعديل،
+    الذي يحدث عند كل قراءة).
+    Pillow تستورد عند إنشاء أول صورة مصغرة فقط.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, size=THUMBNAIL_SIZE):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.size = size
+        self._lock = threading.Lock()
+        self._total_bytes = None  # يحسب عند أول حاجة إليه
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path_for(self, digest, suffix=THUMBNAIL_SUFFIX):
+        return os.path.join(self.cache_dir, digest[:2], digest + suffix)
+
+    def get(self, digest):
+        """يعيد مسار الصورة المصغرة إذا كانت موجودة (ويحدث وقت استخدامها)، أو None."""
+        path = self.path_for(digest)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def get_or_create(self, digest, source_path):
+        """
+        يعيد مسار الصورة المصغرة، وينشئها من source_path إذا لم تكن موجودة.
+        يعيد None إذا تعذر فك ترميز الملف كصورة (ويتذكر ذلك).
+        """
+        path = self.get(digest)
+        if path is not None:
+            return path
+        if os.path.exists(self.path_for(digest, FAILED_SUFFIX)):
+            return None
+        try:
+            return self._create(digest, source_path)
+        except ImportError:
+            return None  # Pillow غير مثبتة؛ لا تحفظ علامة فشل حتى تنشأ الصورة بعد تثبيتها
+        except Exception as e:
+            print(f"تعذر إنشاء صورة مصغرة للملف {source_path}: {e}")
+            self._write_marker(digest)
+            return None
+
+    def remove(self, digest):
+        """يحذف الصورة المصغرة لمحتوى لم يعد مخزنًا."""
+        for suffix in (THUMBNAIL_SUFFIX, FAILED_SUFFIX):
+            path = self.path_for(digest, suffix)
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            with self._lock:
+                if self._total_bytes is not None:
+                    self._total_bytes -= size
+
+    # --- الإنشاء والحذف ---
+    def _create(self, digest, source_path):
+        from PIL import Image
+
+        path = self.path_for(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with Image.open(source_path) as image:
+            # draft يجعل JPEG يفك بدقة مخفضة مباشرة بدلاً من فك الصورة الكاملة ثم تصغيرها
+            image.draft("RGB", self.size)
+            image.thumbnail(self.size)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA")
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=THUMBNAIL_SUFFIX)
+            with os.fdopen(fd, "wb") as f:
+                image.save(f, format="PNG")
+        os.replace(temp_path, path)
+        self._added(os.path.getsize(path))
+        return path
+
+    def _write_marker(self, digest):
+        path = self.path_for(digest, FAILED_SUFFIX)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, "wb").close()
+        except OSError:
+            pass
+
+    def _entries(self):
+        """يعيد [(وقت الاستخدام، الحجم، المسار)] لجميع الصور المصغرة."""
+        entries = []
+        for directory, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                if filename.endswith(THUMBNAIL_SUFFIX):
+                    path = os.path.join(directory, filename)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _added(self, size):
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(entry[1] for entry in self._entries())
+            else:
+                self._total_bytes += size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """يحذف الصور الأقدم استخدامًا حتى يصبح الحجم الكلي أقل من 90% من الحد الأقصى."""
+        target = self.max_bytes * 0.9
+        for _, size, path in sorted(self._entries()):
+            if self._total_bytes <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self._total_bytes -= size
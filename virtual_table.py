@@ -0,0 +1,230 @@
+from collections import deque
+
+# الحدود التي يبدأ عندها تحميل الصفحة التالية/السابقة (نسبة من ارتفاع المحتوى)
+LOAD_THRESHOLD = 0.1
+
+
+class VirtualTable:
+    """
+    جدول افتراضي فوق ttk.Treeview يجلب الصفوف على صفحات أثناء التمرير.
+    يحتفظ الجدول بعدد محدود من الصفحات فقط (النافذة المرئية مع هامش)، ويحذف الصفحات
+    البعيدة ثم يعيد جلبها عند الرجوع إليها باستخدام مؤشرات الصفحات المحفوظة.
+
+    fetch_page(cursor, limit) -> (rows, next_cursor): تجلب صفحة تبدأ بعد المؤشر
+    (None للصفحة الأولى) وتعيد مؤشر الصفحة التالية أو None عند النهاية.
+    row_to_item(row) -> (values, tags): تحول الصف إلى قيم وعلامات عنصر Treeview.
+
+    عند تفعيل الفرز عبر enable_sorting، يمرر عمود الفرز واتجاهه إلى fetch_page
+    كوسيطين sort_by و descending، فيتم الفرز في قاعدة البيانات بدلاً من Treeview.
+
+    عند تمرير executor (TaskExecutor)، تجلب الصفحات في خيط عامل دون تجميد الواجهة،
+    وتهمل نتائج الطلبات القديمة عند إعادة التحميل (مثلاً بحث أحدث يحل محل الأقدم).
+    """
+
+    def __init__(self, tree, fetch_page, row_to_item, scrollbar=None, page_size=200, max_pages=3, on_loaded=None,
+                 executor=None, on_error=None):
+        self.tree = tree
+        self.fetch_page = fetch_page
+        self.row_to_item = row_to_item
+        self.scrollbar = scrollbar
+        self.page_size = page_size
+        self.max_pages = max(2, max_pages)
+        self.on_loaded = on_loaded
+        self.executor = executor
+        self.on_error = on_error
+        self._task_key = f"virtual-table-{id(self)}"
+        self._generation = 0  # يزداد مع كل إعادة تحميل لتمييز النتائج القديمة
+
+        self._page_cursors = [None]  # مؤشر بداية كل صفحة تمت زيارتها
+        self._pages = deque()  # (رقم الصفحة، معرفات عناصر Treeview)
+        self._rows = {}  # معرف عنصر Treeview -> الصف الأصلي (للصفحات المعروضة فقط)
+        self._last_page = None  # رقم آخر صفحة عند معرفة نهاية النتائج
+        self._loading = False
+        self._sort_columns = {}  # عمود Treeview -> اسم عمود الفرز في الواجهة الخلفية
+        self._heading_texts = {}
+        self._sort_column = None
+        self._sort_descending = False
+
+        self.tree.configure(yscrollcommand=self._on_yscroll)
+        self.tree.bind("<Map>", self._check_fill, add="+")
+
+    # --- الخصائص ---
+    @property
+    def loaded_count(self):
+        """عدد الصفوف المعروضة حاليًا في الجدول."""
+        return sum(len(items) for _, items in self._pages)
+
+    @property
+    def end_reached(self):
+        """True إذا تم تحميل آخر صفحة من النتائج."""
+        return self._last_page is not None and bool(self._pages) and self._pages[-1][0] == self._last_page
+
+    def row(self, item):
+        """يعيد الصف الأصلي (كما أعادته fetch_page) لعنصر معروض، أو None."""
+        return self._rows.get(item)
+
+    # --- الفرز ---
+    def enable_sorting(self, sort_columns):
+        """
+        يربط عناوين الأعمدة بالفرز من قاعدة البيانات.
+        sort_columns: قاموس {معرف عمود Treeview: اسم عمود الفرز في الواجهة الخلفية}.
+        """
+        self._sort_columns = dict(sort_columns)
+        for column in self._sort_columns:
+            self._heading_texts[column] = self.tree.heading(column, "text")
+            self.tree.heading(column, command=lambda c=column: self.sort_by(c))
+
+    def sort_by(self, column, descending=None):
+        """يفرز حسب العمود (النقر مرة أخرى يعكس الاتجاه) ويعيد تحميل الصفحة الأولى."""
+        if descending is None:
+            descending = not self._sort_descending if column == self._sort_column else False
+        self._sort_column = column
+        self._sort_descending = descending
+        for col, text in self._heading_texts.items():
+            arrow = (" ▼" if descending else " ▲") if col == column else ""
+            self.tree.heading(col, text=text + arrow)
+        self.reset()
+
+    def _sort_kwargs(self):
+        if self._sort_column is None:
+            return {}
+        return {"sort_by": self._sort_columns[self._sort_column], "descending": self._sort_descending}
+
+    # --- التحميل ---
+    def reset(self, fetch_page=None):
+        """يمسح الجدول ويبدأ التحميل من الصفحة الأولى (مع مصدر بيانات جديد اختياريًا)."""
+        if fetch_page is not None:
+            self.fetch_page = fetch_page
+        self.tree.delete(*self.tree.get_children())
+        self._rows.clear()
+        self._page_cursors = [None]
+        self._pages.clear()
+        self._last_page = None
+        self._loading = False
+        self._generation += 1
+        self._load_page(0, at_end=True)
+
+    def _has_next(self):
+        if not self._pages:
+            return True
+        last_index = self._pages[-1][0]
+        return self._last_page is None or last_index < self._last_page
+
+    def _has_previous(self):
+        return bool(self._pages) and self._pages[0][0] > 0
+
+    def _load_page(self, page_index, at_end):
+        """يجلب الصفحة page_index ويضيفها في نهاية الجدول أو بدايته."""
+        if self._loading or page_index < 0 or page_index >= len(self._page_cursors):
+            return
+        if self._pages and self._pages[0][0] <= page_index <= self._pages[-1][0]:
+            return  # الصفحة معروضة بالفعل (طلبات تمرير مكررة)
+        self._loading = True
+        cursor = self._page_cursors[page_index]
+        sort_kwargs = self._sort_kwargs()
+
+        if self.executor is None:
+            try:
+                rows, next_cursor = self.fetch_page(cursor, self.page_size, **sort_kwargs)
+            except Exception as e:
+                self._on_fetch_error(self._generation, e)
+                return
+            self._loading = False
+            self._apply_page(page_index, at_end, rows, next_cursor)
+            return
+
+        generation = self._generation
+        self.executor.submit(
+            self._task_key, self.fetch_page, cursor, self.page_size, **sort_kwargs,
+            on_success=lambda result: self._on_page_fetched(generation, page_index, at_end, result),
+            on_error=lambda error: self._on_fetch_error(generation, error),
+        )
+
+    def _on_page_fetched(self, generation, page_index, at_end, result):
+        if generation != self._generation:
+            return  # نتيجة طلب سابق لإعادة التحميل
+        self._loading = False
+        rows, next_cursor = result
+        self._apply_page(page_index, at_end, rows, next_cursor)
+
+    def _on_fetch_error(self, generation, error):
+        if generation != self._generation:
+            return
+        self._loading = False
+        if self.on_error:
+            self.on_error(error)
+        else:
+            raise error
+
+    def _apply_page(self, page_index, at_end, rows, next_cursor):
+        """يضيف صفوف صفحة تم جلبها إلى Treeview ويحذف الصفحات الزائدة."""
+        if next_cursor is None:
+            self._last_page = page_index
+        elif len(self._page_cursors) == page_index + 1:
+            self._page_cursors.append(next_cursor)
+
+        first_fraction = float(self.tree.yview()[0])
+        total_before = len(self.tree.get_children())
+        top_index = first_fraction * total_before
+
+        items = []
+        position = "end" if at_end else 0
+        for offset, row in enumerate(rows):
+            values, tags = self.row_to_item(row)
+            index = position if at_end else offset
+            item = self.tree.insert("", index, values=values, tags=tags)
+            self._rows[item] = row
+            items.append(item)
+
+        if at_end:
+            self._pages.append((page_index, items))
+        else:
+            self._pages.appendleft((page_index, items))
+            top_index += len(items)
+
+        # إبقاء عدد محدود من الصفحات في الذاكرة وإزالة الأبعد عن موضع العرض
+        while len(self._pages) > self.max_pages:
+            if at_end:
+                _, dropped = self._pages.popleft()
+                top_index -= len(dropped)
+            else:
+                _, dropped = self._pages.pop()
+            if dropped:
+                self.tree.delete(*dropped)
+                for item in dropped:
+                    del self._rows[item]
+
+        total_after = len(self.tree.get_children())
+        if total_after and total_after != total_before:
+            self.tree.yview_moveto(max(0.0, top_index) / total_after)
+
+        if self.on_loaded:
+            self.on_loaded(self)
+        # إذا لم تملأ الصفوف مساحة العرض (مثلاً بسبب صفحات قصيرة)، نواصل التحميل
+        self.tree.after_idle(self._check_fill)
+
+    def _check_fill(self, event=None):
+        if not self.tree.winfo_ismapped():
+            return  # الجدول مخفي (تبويب غير ظاهر)، سيتم التحقق عند ظهوره
+        first, last = (float(v) for v in self.tree.yview())
+        if last >= 1.0 - LOAD_THRESHOLD and self._has_next():
+            self._load_page(self._pages[-1][0] + 1 if self._pages else 0, at_end=True)
+
+    def _on_yscroll(self, first, last):
+        """يستدعى من Treeview عند تغير موضع العرض."""
+        if self.scrollbar is not None:
+            self.scrollbar.set(first, last)
+        if self._loading or not self._pages:
+            return
+        first, last = float(first), float(last)
+        if last >= 1.0 - LOAD_THRESHOLD and self._has_next():
+            self.tree.after_idle(self._load_page, self._pages[-1][0] + 1, True)
+        elif first <= LOAD_THRESHOLD and self._has_previous():
+            self.tree.after_idle(self._load_page, self._pages[0][0] - 1, False)
+
+
+def keyset_fetcher(fetch, **filters):
+    """يربط عوامل تصفية ثابتة بدالة صفحات من الواجهة الخلفية لتصبح fetch_page(cursor, limit)."""
+    def fetch_page(cursor, limit, **sort):
+        return fetch(after=cursor, limit=limit, **filters, **sort)
+    return fetch_page